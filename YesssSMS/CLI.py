@@ -1,61 +1,87 @@
 """Command line interface for YesssSMS."""
 import argparse
-import configparser
 import logging
 import sys
 from datetime import datetime
 from functools import wraps
 from os import getenv
 from os.path import abspath
+from os.path import exists
 from os.path import expanduser
 
-from YesssSMS import YesssSMS
 from YesssSMS.const import CONFIG_FILE_CONTENT, CONFIG_FILE_PATHS, HELP, VERSION
+from YesssSMS.const import SESSION_STORE_PATH, SPOOL_PATH
 
 MAX_MESSAGE_LENGTH_STDIN = 3 * 160
 
 
 def cli_errors_handled(func):
     """Decorate and handle cli exceptions."""
-    # pylint: disable-msg=R0911
+
     @wraps(func)
     def func_wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except YesssSMS.MissingLoginCredentialsError:
-            print("error: no username or password defined (use --help for help)")
-            sys.exit(2)
-        except YesssSMS.ConnectionError:
-            print(
-                "error: could not connect to provider. "
-                "check your Internet connection."
-            )
-            sys.exit(3)
-        except YesssSMS.AccountSuspendedError:
-            print(
-                "error: your account was suspended because of 3 failed login attempts. "
-                "try again in one hour."
-            )
-            sys.exit(4)
-        except YesssSMS.SMSSendingError:
-            print("error: could not send SMS")
-            sys.exit(5)
-        except YesssSMS.UnsupportedCharsError:
-            print("error: message contains unsupported character(s)")
-            sys.exit(6)
-        except YesssSMS.EmptyMessageError:
-            print("error: cannot send empty message.")
-            sys.exit(7)
         except CLI.MissingSettingsError:
             print("error: missing settings or invalid settings.")
             sys.exit(8)
+        except Exception as err:
+            # errors of YesssSMS are only raised once it was imported
+            if "YesssSMS.api" in sys.modules:
+                exit_on_yessssms_error(err)
+            raise
 
     return func_wrapper
 
 
+def exit_on_yessssms_error(err):
+    """Print the message of a YesssSMS error and exit, ignore other errors."""
+    # pylint: disable=import-outside-toplevel
+    from YesssSMS.api import YesssSMS
+
+    errors = (
+        (
+            YesssSMS.MissingLoginCredentialsError,
+            "error: no username or password defined (use --help for help)",
+            2,
+        ),
+        (
+            YesssSMS.TimeoutError,
+            "error: provider did not answer in time. try again later.",
+            3,
+        ),
+        (
+            YesssSMS.ConnectionError,
+            "error: could not connect to provider. check your Internet connection.",
+            3,
+        ),
+        (
+            YesssSMS.AccountSuspendedError,
+            "error: your account was suspended because of 3 failed login attempts. "
+            "try again in one hour.",
+            4,
+        ),
+        (YesssSMS.SMSSendingError, "error: could not send SMS", 5),
+        (
+            YesssSMS.UnsupportedCharsError,
+            "error: message contains unsupported character(s)",
+            6,
+        ),
+        (YesssSMS.EmptyMessageError, "error: cannot send empty message.", 7),
+    )
+    for error, message, exit_status in errors:
+        if isinstance(err, error):
+            print(message)
+            sys.exit(exit_status)
+
+
 class CLI:
     """CLI class for YesssSMS."""
 
+    # requests, sqlite3 and socket are imported on the paths using them,
+    # --version and --print-config-file start fast
+    # pylint: disable=import-outside-toplevel
+
     class MissingSettingsError(ValueError):
         """missing settings."""
 
@@ -70,13 +96,113 @@ class CLI:
     @staticmethod
     def version_info():
         """Display version information."""
-        print(f"yessssms {YesssSMS('', '').version()}")
+        print(f"yessssms {VERSION}")
 
     @staticmethod
     def print_config_file():
         """Print a sample config file, to pipe into a file."""
         print(CONFIG_FILE_CONTENT, end="")
 
+    @staticmethod
+    def read_message(args):
+        """Return the message to send, read from stdin for -m -."""
+        if args.message == "-":
+            message = ""
+            for line in sys.stdin:
+                message += line
+                if len(message) > MAX_MESSAGE_LENGTH_STDIN:
+                    break
+            # maximum of 3 SMS if pipe is used
+            message = message[:MAX_MESSAGE_LENGTH_STDIN]
+        else:
+            message = args.message
+
+        if args.test:
+            message = (
+                message
+                or f"yessssms ({VERSION}) test message at {datetime.now().isoformat()}"
+            )
+        return message
+
+    @staticmethod
+    def daemon_usable(args):
+        """Return if the SMS can be handed to a running daemon.
+
+        Not if login data or another account is given on the command line,
+        the daemon sends with its own account.
+        """
+        from YesssSMS.control import default_control_path
+
+        account_args = (args.login, args.password, args.configfile, args.provider)
+        other_modes = (args.check_login, args.daemon, args.spool)
+        return (
+            (args.message is not None or args.test)
+            and not any(account_args + other_modes)
+            and exists(args.socket or default_control_path())
+        )
+
+    @staticmethod
+    def forward_to_daemon(recipient, message, socket_path):
+        """Send the SMS with the daemon, return False if it is not running."""
+        from YesssSMS.control import ControlError, forward
+
+        try:
+            forward(recipient, message, socket_path)
+        except ControlError as err:
+            from YesssSMS.api import YesssSMS
+
+            error = getattr(YesssSMS, err.error or "", None)
+            if not isinstance(error, type) or not issubclass(error, Exception):
+                error = YesssSMS.SMSSendingError
+            raise error(str(err)) from None
+        except OSError:
+            # e.g. the socket of a killed daemon, send without it
+            logging.debug("daemon not running, sending directly")
+            return False
+        return True
+
+    @staticmethod
+    def create_yessssms(args, login, passwd, provider_args):
+        """Return the YesssSMS to send with, a SharedYesssSMS for the daemon."""
+        from YesssSMS.api import YesssSMS
+        from YesssSMS.ratelimit import LOCK_DIR
+        from YesssSMS.shared import SharedYesssSMS
+
+        if args.daemon:
+            sms = SharedYesssSMS(login, passwd, size=2, **provider_args)
+        else:
+            sms = YesssSMS(login, passwd, **provider_args)
+        if args.rate_limit:
+            # one CLI call sends one SMS, the limit is shared by the processes
+            sms.set_rate_limit(args.rate_limit, args.burst, LOCK_DIR)
+        if args.session_store and not args.daemon:
+            sms.set_session_store(args.session_store)
+        if args.login_breaker or args.daemon:
+            # a wrong password must not suspend the account of all processes
+            sms.set_login_breaker(LOCK_DIR)
+        return sms
+
+    @staticmethod
+    def run_daemon(sms, spool_path, socket_path, default_recipient):
+        """Send SMS of the control socket and the spool until SIGTERM or Ctrl-C."""
+        import signal
+        import threading
+
+        from YesssSMS.control import ControlServer
+        from YesssSMS.spool import Spool, SpoolWorker
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        with sms, Spool(spool_path) as spool:
+            with ControlServer(sms, socket_path, default_recipient) as server:
+                server.start()
+                try:
+                    SpoolWorker(sms, spool).run(stop)
+                except KeyboardInterrupt:
+                    pass
+                finally:
+                    server.shutdown()
+
     @staticmethod
     def parse_args(args):
         """Parse arguments and return namespace."""
@@ -106,6 +232,32 @@ class CLI:
             default=False,
             help=HELP["print-config-file"],
         )
+        parser.add_argument(
+            "--spool", nargs="?", const=SPOOL_PATH, metavar="PATH", help=HELP["spool"]
+        )
+        parser.add_argument(
+            "--daemon", action="store_true", default=False, help=HELP["daemon"]
+        )
+        parser.add_argument("--socket", metavar="PATH", help=HELP["socket"])
+        parser.add_argument(
+            "--rate-limit", type=float, metavar="RATE", help=HELP["rate_limit"]
+        )
+        parser.add_argument(
+            "--burst", type=int, default=1, metavar="N", help=HELP["burst"]
+        )
+        parser.add_argument(
+            "--session-store",
+            nargs="?",
+            const=SESSION_STORE_PATH,
+            metavar="PATH",
+            help=HELP["session_store"],
+        )
+        parser.add_argument(
+            "--login-breaker",
+            action="store_true",
+            default=False,
+            help=HELP["login_breaker"],
+        )
         if not args:
             parser.print_help()
             return None
@@ -134,6 +286,8 @@ class CLI:
 
     def read_config_files(self, config_file):
         """Read config files for settings."""
+        import configparser
+
         if config_file:
             self.config_files.append(config_file)
 
@@ -187,8 +341,8 @@ class CLI:
 
         return (login, passwd, default_recipient, provider, custom_provider_urls)
 
-    # inconsistent return (testing), too many branches
-    # pylint: disable-msg=R1710,R0912
+    # inconsistent return (testing), too many branches, returns and locals
+    # pylint: disable-msg=R1710,R0912,R0911,R0914
     @cli_errors_handled
     def cli(self):
         """Handle arguments for command line interface."""
@@ -206,6 +360,14 @@ class CLI:
             self.version_info()
             return 0
 
+        message = None
+        if self.daemon_usable(args):
+            message = self.read_message(args)
+            if self.forward_to_daemon(args.recipient, message, args.socket):
+                self.recipient = args.recipient
+                self.message = message
+                return 0
+
         (
             login,
             passwd,
@@ -235,11 +397,19 @@ class CLI:
 
         logging.debug("login: %s", login)
         if provider:
-            self.yessssms = YesssSMS(login, passwd, provider=provider)
+            provider_args = {"provider": provider}
         else:
-            self.yessssms = YesssSMS(
-                login, passwd, custom_provider=custom_provider_urls
+            provider_args = {"custom_provider": custom_provider_urls}
+        self.yessssms = self.create_yessssms(args, login, passwd, provider_args)
+
+        if args.daemon:
+            self.run_daemon(
+                self.yessssms,
+                args.spool or SPOOL_PATH,
+                args.socket,
+                default_recipient or login,
             )
+            return 0
 
         if args.check_login:
             valid = self.yessssms.login_data_valid()
@@ -247,26 +417,18 @@ class CLI:
             print(f"{text[0]}: login data is {text[1]}valid.")
             return 0 if valid else 1
 
-        if args.message == "-":
-            message = ""
-            for line in sys.stdin:
-                message += line
-                if len(message) > MAX_MESSAGE_LENGTH_STDIN:
-                    break
-            # maximum of 3 SMS if pipe is used
-            message = message[:MAX_MESSAGE_LENGTH_STDIN]
-        else:
-            message = args.message
-
-        if args.test:
-            message = (
-                message
-                or f"yessssms ({VERSION}) test message at {datetime.now().isoformat()}"
-            )
+        if message is None:
+            message = self.read_message(args)
         recipient = args.recipient or default_recipient or login
 
         self.recipient = recipient
         self.message = message
+        if args.spool:
+            from YesssSMS.spool import Spool
+
+            with Spool(args.spool) as spool:
+                spool.enqueue(recipient, self.message)
+            return 0
         self.yessssms.send(recipient, self.message)
         return 0
 
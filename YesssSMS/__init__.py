@@ -1,2 +1,26 @@
 """Send SMS via yesss.at web interface with your yesss login and password."""
-from .api import YesssSMS  # noqa: F401
+from importlib import import_module
+
+from . import const  # noqa: F401
+
+# imported on first use, requests is only needed to send
+_LAZY_ATTRIBUTES = {
+    "SendResult": "api",
+    "YesssSMS": "api",
+    "SharedYesssSMS": "shared",
+    "YesssSMSPool": "pool",
+}
+
+
+def __getattr__(name):
+    """Import YesssSMS, SendResult, SharedYesssSMS and YesssSMSPool on first access."""
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f"{__name__}.{_LAZY_ATTRIBUTES[name]}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    """List the lazy attributes too."""
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
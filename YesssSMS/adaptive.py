@@ -0,0 +1,223 @@
+"""Adaptive concurrency of the bulk and async send paths, with AIMD.
+
+An AIMDLimit is the number of SMS sent at once. It grows additively while
+sends succeed with low latency, and shrinks multiplicatively when the
+provider is overloaded: errors sending (the "(1)" and "(2)" errors, which
+include HTTP 5xx), connection errors, timeouts and a latency well above
+the usual. Use it as concurrency of AsyncYesssSMS or SharedYesssSMS:
+
+limit = AIMDLimit(maximum=16)
+sms = AsyncYesssSMS(login, passwd, concurrency=limit)
+...
+limit.limit  # the current limit, e.g. for a metric
+"""
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from types import SimpleNamespace
+
+import requests
+
+from YesssSMS.api import YesssSMS
+
+
+def is_overload(err):
+    """Return if the error of a send shows an overloaded provider."""
+    if isinstance(err, YesssSMS.SessionExpiredError):
+        return False
+    return isinstance(
+        err,
+        (
+            YesssSMS.SMSSendingError,
+            YesssSMS.ConnectionError,
+            requests.Timeout,
+            TimeoutError,
+            asyncio.TimeoutError,
+        ),
+    )
+
+
+class FixedLimit:
+    """Constant concurrency limit, outcomes are ignored."""
+
+    def __init__(self, limit):
+        """Initialize FixedLimit."""
+        if limit < 1:
+            raise ValueError("YesssSMS: concurrency must be at least 1")
+        self.limit = self.maximum = limit
+
+    @staticmethod
+    def now():
+        """Return the time, to pass as started to record()."""
+        return time.monotonic()
+
+    def record(self, started, latency, overloaded, cold=False):
+        """Ignore the outcome of a send."""
+
+
+class AIMDLimit:
+    """Concurrency limit with additive increase and multiplicative decrease, thread safe.
+
+    Every successful send increases the limit by increase / limit, i.e. by
+    about `increase` per round of `limit` sends. An overloaded send, or one
+    slower than latency_factor times the baseline latency, multiplies the
+    limit by decrease. Sends started before the last decrease do not
+    decrease it again, they belong to the same round. The baseline is a
+    slow moving average of the latency of sends that were not too slow.
+    cold sends (with a login first) count as success but not for latency.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        initial=1,
+        minimum=1,
+        maximum=16,
+        *,
+        increase=1.0,
+        decrease=0.5,
+        latency_factor=2.0,
+        clock=time.monotonic,
+    ):
+        """Initialize AIMDLimit."""
+        # pylint: disable=too-many-arguments
+        if not 1 <= minimum <= initial <= maximum:
+            raise ValueError("YesssSMS: needs 1 <= minimum <= initial <= maximum")
+        if not 0 < decrease < 1:
+            raise ValueError("YesssSMS: decrease must be between 0 and 1")
+        self.minimum = minimum
+        self.maximum = maximum
+        self._increase = increase
+        self._decrease = decrease
+        self._latency_factor = latency_factor
+        self._clock = clock
+        self._limit = float(initial)
+        self._baseline = None
+        self._last_decrease = float("-inf")
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        """Return the current limit."""
+        return int(self._limit)
+
+    @property
+    def baseline_latency(self):
+        """Return the baseline latency in seconds, None before the first send."""
+        return self._baseline
+
+    def now(self):
+        """Return the time of the clock, to pass as started to record()."""
+        return self._clock()
+
+    def record(self, started, latency, overloaded, cold=False):
+        """Adjust the limit to the outcome of a send started at started."""
+        with self._lock:
+            slow = (
+                not cold
+                and self._baseline is not None
+                and latency > self._baseline * self._latency_factor
+            )
+            if overloaded or slow:
+                if started >= self._last_decrease:
+                    self._limit = max(self.minimum, self._limit * self._decrease)
+                    self._last_decrease = self._clock()
+                return
+            if not cold:
+                self._baseline = (
+                    latency
+                    if self._baseline is None
+                    else 0.95 * self._baseline + 0.05 * latency
+                )
+            self._limit = min(self.maximum, self._limit + self._increase / self._limit)
+
+
+class Gate:
+    """Let up to limit.limit threads in at once, and record their outcomes."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, limit):
+        """Initialize Gate with a FixedLimit or AIMDLimit."""
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """Wait for a free slot, record the outcome of the block.
+
+        Yields the sample, set its cold to True if the send had to login.
+        Raises YesssSMS.TimeoutError if no slot is free within timeout seconds.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self.in_flight < self.limit.limit, timeout
+            ):
+                raise YesssSMS.TimeoutError("YesssSMS: deadline passed waiting to send")
+            self.in_flight += 1
+        started = self.limit.now()
+        sample = SimpleNamespace(cold=False)
+        overloaded = None
+        try:
+            yield sample
+            overloaded = False
+        except Exception as err:
+            # errors of the message or the login say nothing about the load
+            overloaded = is_overload(err) or None
+            raise
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                if overloaded is not None:
+                    latency = self.limit.now() - started
+                    self.limit.record(started, latency, overloaded, sample.cold)
+                self._condition.notify_all()
+
+
+class AsyncGate:
+    """Gate for coroutines, to use within one event loop."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, limit):
+        """Initialize AsyncGate with a FixedLimit or AIMDLimit."""
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = None
+
+    @asynccontextmanager
+    async def slot(self, timeout=None):
+        """Wait for a free slot, record the outcome of the block, like Gate."""
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            try:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self.in_flight < self.limit.limit),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                raise YesssSMS.TimeoutError(
+                    "YesssSMS: deadline passed waiting to send"
+                ) from None
+            self.in_flight += 1
+        started = self.limit.now()
+        sample = SimpleNamespace(cold=False)
+        overloaded = None
+        try:
+            yield sample
+            overloaded = False
+        except Exception as err:
+            overloaded = is_overload(err) or None
+            raise
+        finally:
+            # one event loop, no lock needed to count, only to notify
+            self.in_flight -= 1
+            if overloaded is not None:
+                latency = self.limit.now() - started
+                self.limit.record(started, latency, overloaded, sample.cold)
+            async with self._condition:
+                self._condition.notify_all()
@@ -0,0 +1,382 @@
+"""AsyncYesssSMS, send SMS via yesss.at from asyncio code.
+
+Needs aiohttp: pip install YesssSMS[async]
+"""
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from functools import wraps
+
+from YesssSMS.adaptive import AsyncGate, FixedLimit
+from YesssSMS.api import YesssSMS, _SessionSteps, phase_recorded
+from YesssSMS.const import SESSION_STORE_PATH
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+REDIRECT_STATUS_CODES = (301, 302, 303, 307, 308)
+# errors of aiohttp before a connection was made, ConnectionTimeoutError since 3.10
+_CONNECT_ERRORS = (
+    ()
+    if aiohttp is None
+    else (aiohttp.ClientConnectorError, getattr(aiohttp, "ConnectionTimeoutError", ()))
+)
+
+
+class _Response:
+    """The parts of an aiohttp response YesssSMS checks, named like requests."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, resp, text):
+        self.status_code = resp.status
+        self.url = str(resp.url)
+        self.headers = resp.headers
+        self.text = text
+        self.is_redirect = (
+            resp.status in REDIRECT_STATUS_CODES and "location" in resp.headers
+        )
+
+
+def async_connection_error_handled(func):
+    """Decorate and handle network connection issues of coroutines."""
+
+    @wraps(func)
+    async def func_wrapper(self, *args, **kwargs):
+        try:
+            return await func(self, *args, **kwargs)
+        # YesssSMS.TimeoutError is an asyncio.TimeoutError since Python 3.11
+        except YesssSMS.ConnectionError:  # pylint: disable=try-except-raise
+            raise
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError) as err:
+            if isinstance(err, asyncio.TimeoutError):
+                error = YesssSMS.TimeoutError(
+                    "YesssSMS: provider did not answer in time"
+                )
+            else:
+                error = YesssSMS.ConnectionError("YesssSMS cannot connect to provider")
+            if isinstance(err, _CONNECT_ERRORS):
+                # refused or timed out connecting, nothing reached the provider
+                error.connected = False
+            raise error from None
+
+    return func_wrapper
+
+
+class AsyncYesssSMS(YesssSMS):
+    """YesssSMS with coroutines, for use in asyncio applications.
+
+    Providers, settings and exceptions are the same as for YesssSMS, except
+    for set_session_store(), which is not supported.
+
+    Concurrent sends, e.g. with asyncio.gather(), are limited to
+    `concurrency` at once, each of them uses its own logged in session.
+    concurrency is a number, or an adaptive.AIMDLimit adjusting the limit
+    to the load of the provider. Idle sessions are kept for the next send
+    and closed with close():
+
+    async with AsyncYesssSMS(login, passwd) as sms:
+        await asyncio.gather(*(sms.send(to, message) for to in recipients))
+    """
+
+    # the blocking methods of YesssSMS are overridden by coroutines
+    # pylint: disable=invalid-overridden-method,arguments-differ
+
+    def __init__(self, *args, concurrency=4, **kwargs):
+        """Initialize AsyncYesssSMS, see YesssSMS for the arguments."""
+        if aiohttp is None:
+            raise ImportError("AsyncYesssSMS needs aiohttp: pip install aiohttp")
+        if isinstance(concurrency, int):
+            concurrency = FixedLimit(concurrency)
+        super().__init__(*args, **kwargs)
+        self._gate = AsyncGate(concurrency)
+        self._connector = None
+        self._idle_sessions = []
+        self._login_lock = None
+
+    async def __aenter__(self):
+        """Enter the context, return AsyncYesssSMS."""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Logout all sessions and close the connections."""
+        await self.close()
+
+    def _http_session(self):
+        """Return an aiohttp session with its own cookies and pooled connections."""
+        if self._connector is None or self._connector.closed:
+            self._connector = aiohttp.TCPConnector(limit=self._gate.limit.maximum)
+        return aiohttp.ClientSession(
+            connector=self._connector,
+            connector_owner=False,
+            # custom providers might use IP addresses
+            cookie_jar=aiohttp.CookieJar(unsafe=True),
+        )
+
+    def _client_timeout(self, deadline, phase):
+        """Return the aiohttp timeout of a request of phase within deadline."""
+        timeout = self._request_timeout(deadline, phase)
+        if timeout is None:
+            return aiohttp.ClientTimeout(total=None)
+        connect, total = timeout
+        return aiohttp.ClientTimeout(total=total, sock_connect=connect)
+
+    @asynccontextmanager
+    async def _async_login_guard(self):
+        """Run a login in the block, guarded by the login breaker if set.
+
+        One login of the account runs at a time, like with YesssSMS: of
+        all instances, and with a FileLoginBreaker of all processes.
+        """
+        if self._login_breaker is None:
+            yield
+            return
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        # a FileLoginBreaker blocks on its lock file, not on the event loop
+        loop = asyncio.get_running_loop()
+        async with self._login_lock:
+            exclusive = self._login_breaker.exclusive()
+            await self._enter_in_executor(loop, exclusive)
+            try:
+                await loop.run_in_executor(None, self._check_login_breaker)
+                try:
+                    yield
+                except self.LoginError as err:
+                    await loop.run_in_executor(None, self._record_login, err)
+                    raise
+                await loop.run_in_executor(None, self._record_login)
+            finally:
+                # unlocking does not block
+                exclusive.__exit__(None, None, None)
+
+    @staticmethod
+    async def _enter_in_executor(loop, context):
+        """Enter the blocking context manager context in the executor."""
+        entered = loop.run_in_executor(None, context.__enter__)
+        try:
+            await asyncio.shield(entered)
+        except asyncio.CancelledError:
+
+            def leave(future):
+                if not future.exception():
+                    context.__exit__(None, None, None)
+
+            # cancelled while waiting, leave once it is entered
+            entered.add_done_callback(leave)
+            raise
+
+    @phase_recorded("login")
+    @async_connection_error_handled
+    async def _login(self, session, follow_redirect=False, deadline=None):
+        """Login with an aiohttp session."""
+        try:
+            async with self._async_login_guard():
+                async with session.post(
+                    self._login_url,
+                    data=self._logindata,
+                    allow_redirects=follow_redirect,
+                    timeout=self._client_timeout(deadline, "login"),
+                ) as resp:
+                    self._check_login(
+                        _Response(resp, await resp.text()), follow_redirect
+                    )
+        except self.AccountSuspendedError:
+            self._suspended = True
+            raise
+        return session
+
+    @phase_recorded("logout")
+    @async_connection_error_handled
+    async def _logout(self, session, deadline=None):
+        """Logout of an aiohttp session."""
+        async with session.get(
+            self._logout_url, timeout=self._client_timeout(deadline, "logout")
+        ) as resp:
+            await resp.read()
+
+    @phase_recorded("send")
+    @async_connection_error_handled
+    async def _send(self, recipient, message, session, token=None, deadline=None):
+        """Send an SMS with a logged in aiohttp session.
+
+        Returns the CSRF token for the next SMS, or None.
+        """
+        # pylint: disable=too-many-arguments
+        self._check_message(recipient, message)
+
+        csrf_token = token or await self._get_csrf_token(session, deadline)
+
+        if self._rate_limiter is not None:
+            # a FileTokenBucket blocks on its lock file, not on the event loop
+            await asyncio.sleep(
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._rate_limit_delay, deadline
+                )
+            )
+        async with session.post(
+            self._send_sms_url,
+            data=self._sms_data(recipient, message, csrf_token),
+            timeout=self._client_timeout(deadline, "send"),
+        ) as resp:
+            return self._check_sent(_Response(resp, await resp.text()), message)
+
+    @phase_recorded("token")
+    @async_connection_error_handled
+    async def _get_csrf_token(self, sess, deadline=None):
+        """Return the CSRF token for the SMS form."""
+        async with sess.get(
+            self._sms_form_url, timeout=self._client_timeout(deadline, "token")
+        ) as resp:
+            return self._check_form(_Response(resp, await resp.text()))
+
+    @async_connection_error_handled
+    async def login_data_valid(self):
+        """Check for working login data."""
+        async with self._http_session() as sess:
+            try:
+                await self._login(sess)
+            except self.LoginError:
+                return False
+            await self._logout(sess)
+        return True
+
+    def session(self):
+        """Return an AsyncSMSSession, to send multiple SMS with one login."""
+        return AsyncSMSSession(self)
+
+    @async_connection_error_handled
+    async def send(self, recipient, message, deadline=None, transliterate=False):
+        """Send an SMS.
+
+        Waits while `concurrency` sends are running, reuses an idle logged
+        in session or logs in with a new one. With deadline, the seconds
+        the send may take, a late send raises YesssSMS.TimeoutError.
+        transliterate works like with YesssSMS.send(), the replacements
+        are returned.
+        """
+        message, changes = self._transliterate(message, transliterate)
+        self._check_message(recipient, message)
+        deadline = self._deadline(deadline)
+        async with self._gate.slot(deadline.remaining()) as sample:
+            sess = self._idle_sessions.pop() if self._idle_sessions else self.session()
+            try:
+                await self._send_in_slot(sess, sample, recipient, message, deadline)
+            finally:
+                self._idle_sessions.append(sess)
+        return changes
+
+    async def _send_in_slot(self, sess, sample, recipient, message, deadline):
+        """Send an SMS with sess in a slot of the gate, return the attempts."""
+        # pylint: disable=too-many-arguments
+        sample.cold = not sess.is_logged_in()
+        if self._retry_policy is None:
+            await sess.send(recipient, message, deadline)
+            return 1
+        return await self._retry_policy.call_async(
+            sess.send, recipient, message, deadline, deadline=deadline
+        )
+
+    async def send_many(self, messages, deadline=None, transliterate=False):
+        """Send many SMS with one session, yield a SendResult for each of them.
+
+        An async generator, else like YesssSMS.send_many(). Each SMS waits
+        for a slot of the `concurrency` limit:
+
+        async for result in sms.send_many(messages):
+            print(result.recipient, result.success)
+        """
+        sess = self._idle_sessions.pop() if self._idle_sessions else self.session()
+        try:
+            for recipient, message in messages:
+                message, changes = self._transliterate(message, transliterate)
+                with self._send_result(recipient, message, changes) as result:
+                    sms_deadline = self._deadline(deadline)
+                    async with self._gate.slot(sms_deadline.remaining()) as sample:
+                        result.attempts = await self._send_in_slot(
+                            sess, sample, recipient, message, sms_deadline
+                        )
+                yield result
+        finally:
+            self._idle_sessions.append(sess)
+
+    def set_session_store(self, path=SESSION_STORE_PATH, max_age=1800):
+        """Raise NotImplementedError, async sessions are not saved."""
+        if path is not None:
+            raise NotImplementedError(
+                "YesssSMS: AsyncYesssSMS does not save sessions, "
+                "use set_session_store() of YesssSMS"
+            )
+        super().set_session_store(None, max_age)
+
+    def concurrency_limit(self):
+        """Return the current limit of concurrent sends."""
+        return self._gate.limit.limit
+
+    async def close(self):
+        """Logout the idle sessions and close all connections."""
+        sessions, self._idle_sessions = self._idle_sessions, []
+        await asyncio.gather(*(sess.close() for sess in sessions))
+        if self._connector is not None:
+            await self._connector.close()
+
+
+class AsyncSMSSession(_SessionSteps):
+    """Logged in provider session of AsyncYesssSMS, reused for several SMS.
+
+    Works like SMSSession, with coroutines:
+
+    async with sms.session() as sess:
+        await sess.send(recipient, message)
+    """
+
+    # the session drives the private login/send/logout calls of AsyncYesssSMS
+    # pylint: disable=protected-access,invalid-overridden-method
+
+    def __init__(self, sms):
+        """Initialize AsyncSMSSession for an AsyncYesssSMS instance."""
+        self._sms = sms
+        self._session = sms._http_session()
+        self._logged_in = False
+        self._token = None
+
+    async def __aenter__(self):
+        """Enter the context, return the session."""
+        return self
+
+    async def __aexit__(self, *exc_info):
+        """Logout and close the session."""
+        await self.close()
+
+    async def send(self, recipient, message, deadline=None):
+        """Send an SMS, login first if necessary, within deadline seconds."""
+        steps = self._send_steps(recipient, message, deadline)
+        call = next(steps)
+        while call:
+            try:
+                result = await call()
+            except self._sms.SMSSendingError as err:
+                result = err
+            call = self._next_call(steps, result)
+
+    async def login(self, deadline=None):
+        """Login to the provider, the session is reused for sending."""
+        self._logged_in = False
+        self._token = None
+        await self._sms._login(self._session, deadline=deadline)
+        self._logged_in = True
+
+    async def logout(self):
+        """Logout of the provider, the next send logs in again."""
+        if self._logged_in:
+            self._logged_in = False
+            await self._sms._logout(self._session)
+
+    async def close(self):
+        """Logout and close the HTTP session."""
+        try:
+            with suppress(YesssSMS.ConnectionError):
+                await self.logout()
+        finally:
+            await self._session.close()
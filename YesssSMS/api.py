@@ -7,25 +7,44 @@
 # pylint not amused about package name
 # pylint: disable-msg=C0103
 
-from contextlib import suppress
-from functools import wraps
+import builtins
+from asyncio import iscoroutinefunction
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
+from functools import partial, wraps
 from os import getenv
+from time import monotonic, perf_counter, sleep
+from urllib.parse import urljoin, urlsplit
 
 import requests
-
-from bs4 import BeautifulSoup
+from urllib3.exceptions import NewConnectionError
 
 from YesssSMS.const import (
+    CHAR_CACHE_PATH,
+    CONNECT_TIMEOUT,
     PROVIDER_URLS,
+    READ_TIMEOUT,
+    SESSION_STORE_PATH,
     VERSION,
     _LOGIN_ERROR_STRING,
+    _LOGIN_FORM_MARKER,
     _LOGIN_LOCKED_MESS,
     _LOGIN_LOCKED_MESS_ENG,
     _SMS_FORM_ID,
-    _SMS_FORM_ID_VALUE,
     _SMS_SENDING_SUCCESSFUL_STRING,
     _UNSUPPORTED_CHARS_STRING,
 )
+from YesssSMS.breaker import LOCKOUT_TIME, account_breaker
+from YesssSMS.charset import (
+    CharCache,
+    parse_unsupported_chars,
+    positions,
+    transliterate as transliterate_message,
+)
+from YesssSMS.charset import check as check_charset
+from YesssSMS.csrf import extract_token, find_token
+from YesssSMS.ratelimit import account_bucket
+from YesssSMS.sessionstore import SessionStore
 
 
 MAX_MESSAGE_LENGTH_STDIN = 3 * 160
@@ -47,14 +66,124 @@ def connection_error_handled(func):
     def func_wrapper(self, *args, **kwargs):
         try:
             return func(self, *args, **kwargs)
-        except requests.exceptions.ConnectionError:
-            raise YesssSMS.ConnectionError(
-                "YesssSMS cannot connect to provider"
-            ) from None
+        except YesssSMS.ConnectionError:
+            raise
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as err:
+            if isinstance(err, requests.exceptions.Timeout):
+                error = YesssSMS.TimeoutError(
+                    "YesssSMS: provider did not answer in time"
+                )
+            else:
+                error = YesssSMS.ConnectionError("YesssSMS cannot connect to provider")
+            reason = getattr(err.args[0], "reason", None) if err.args else None
+            if isinstance(err, requests.exceptions.ConnectTimeout) or isinstance(
+                reason, NewConnectionError
+            ):
+                # refused or timed out connecting, nothing reached the provider
+                error.connected = False
+            raise error from None
 
     return func_wrapper
 
 
+def phase_recorded(phase):
+    """Decorate, record phase on the errors of YesssSMS a request raises.
+
+    phase is the Deadline phase of the request: login, token, send or
+    logout. Errors of nested requests keep their phase. Works for
+    methods and coroutines.
+    """
+
+    @contextmanager
+    def recording():
+        try:
+            yield
+        except (YesssSMS.SMSSendingError, YesssSMS.ConnectionError) as err:
+            if err.phase is None:
+                err.phase = phase
+            raise
+
+    def decorator(func):
+        if iscoroutinefunction(func):
+
+            @wraps(func)
+            async def coroutine_wrapper(self, *args, **kwargs):
+                with recording():
+                    return await func(self, *args, **kwargs)
+
+            return coroutine_wrapper
+
+        @wraps(func)
+        def func_wrapper(self, *args, **kwargs):
+            with recording():
+                return func(self, *args, **kwargs)
+
+        return func_wrapper
+
+    return decorator
+
+
+@dataclass
+class SendResult:
+    """Result of one SMS of YesssSMS.send_many().
+
+    error is the exception raised while sending, or None if the SMS was
+    sent. duration is the time spent on this SMS in seconds, attempts the
+    number of tries, more than 1 with a retry policy. changes are the
+    replaced (position, char, replacement) with transliterate, message is
+    the message that was sent.
+    """
+
+    recipient: str
+    message: str
+    error: Exception = None
+    duration: float = 0.0
+    attempts: int = 1
+    changes: tuple = ()
+
+    @property
+    def success(self):
+        """Return if the SMS was sent."""
+        return self.error is None
+
+
+class Deadline:
+    """Time budget of a send, split across its HTTP requests.
+
+    Every request waits at most CONNECT_TIMEOUT seconds to connect and
+    `timeout` seconds for the response, and no longer than the share of
+    its phase of the remaining budget: login and SMS form leave time for
+    sending the SMS. With seconds None there is no budget, only timeouts.
+    """
+
+    SHARES = {"login": 0.5, "token": 0.5, "send": 1.0, "logout": 1.0}
+
+    def __init__(self, seconds=None, timeout=READ_TIMEOUT):
+        """Initialize a Deadline seconds from now."""
+        self.end = None if seconds is None else monotonic() + seconds
+        self.timeout = timeout
+
+    def remaining(self):
+        """Return the seconds left, None without budget."""
+        return None if self.end is None else self.end - monotonic()
+
+    def request_timeout(self, phase):
+        """Return the timeout of a request of phase, raise if the budget is spent."""
+        remaining = self.remaining()
+        if remaining is None:
+            if self.timeout is None:
+                return None
+            return (min(CONNECT_TIMEOUT, self.timeout), self.timeout)
+        if remaining <= 0:
+            err = YesssSMS.TimeoutError(f"YesssSMS: deadline passed before {phase}")
+            err.phase, err.connected = phase, False
+            raise err
+        budget = remaining * self.SHARES[phase]
+        if self.timeout is not None:
+            budget = min(budget, self.timeout)
+        return (min(CONNECT_TIMEOUT, budget), budget)
+
+
 class YesssSMS:
     """YesssSMS class for sending SMS via yesss.at website.
 
@@ -97,19 +226,50 @@ class YesssSMS:
     class SMSSendingError(RuntimeError):
         """error during sending."""
 
+        # the HTTP status of the provider's response, if it was an error
+        status_code = None
+        # the phase of the request that failed, see Deadline
+        phase = None
+
+    class SessionExpiredError(SMSSendingError):
+        """provider session expired, login again."""
+
+    class TokenRejectedError(SMSSendingError):
+        """provider showed the SMS form again, the CSRF token was not accepted."""
+
     class UnsupportedCharsError(ValueError):
         """provider refused characters in message."""
 
+        # (position, char) of the refused characters, if they are known
+        chars = ()
+
     class UnsupportedProviderError(ValueError):
         """the provider is not in the PROVIDER_URLS dict."""
 
     class ConnectionError(requests.ConnectionError):
         """YesssSMS cannot connect to the provider."""
 
+        # the phase of the request that failed, see Deadline
+        phase = None
+        # False if no connection was made, the request was not sent
+        connected = None
+
+    class TimeoutError(ConnectionError, builtins.TimeoutError):
+        """provider did not answer in time, or the deadline passed."""
+
     def __init__(
-        self, login=LOGIN, passwd=PASSWD, provider="yesss", custom_provider=None
+        self,
+        login=LOGIN,
+        passwd=PASSWD,
+        provider="yesss",
+        custom_provider=None,
+        *,
+        timeout=READ_TIMEOUT,
     ):
-        """Initialize YesssSMS."""
+        """Initialize YesssSMS.
+
+        timeout: seconds every request waits for the provider, None for ever.
+        """
         self._version = VERSION
         self._provider = provider.lower()
 
@@ -147,19 +307,99 @@ class YesssSMS:
         self._send_sms_url = urls["SEND_SMS_URL"]
         self._suspended = False
         self._logindata = {"login_rufnummer": login, "login_passwort": passwd}
-
+        self._rate_limiter = None
+        self._retry_policy = None
+        self._login_breaker = None
+        self._session_store = None
+        self._timeout = timeout
+        self._ucs2 = True
+        self._bmp_only = False
+        self._char_cache = None
+
+    def _deadline(self, deadline=None):
+        """Return a Deadline of deadline seconds, or deadline if it is one."""
+        if isinstance(deadline, Deadline):
+            return deadline
+        return Deadline(deadline, self._timeout)
+
+    def _request_timeout(self, deadline, phase):
+        """Return the timeout of a request of phase within deadline."""
+        return self._deadline(deadline).request_timeout(phase)
+
+    @phase_recorded("login")
     @connection_error_handled
-    def _login(self, session, get_request=False):
+    def _login(self, session, get_request=False, follow_redirect=True, deadline=None):
         """Return a session for provider.
 
         return session
         If get_request is True return (session, request)
+        If follow_redirect is False, the login stops at the provider's redirect
+        and the customer data page is not downloaded.
         """
-        req = session.post(self._login_url, data=self._logindata)
+        try:
+            with self._login_guard():
+                req = session.post(
+                    self._login_url,
+                    data=self._logindata,
+                    allow_redirects=follow_redirect,
+                    timeout=self._request_timeout(deadline, "login"),
+                )
+                self._check_login(req, follow_redirect)
+        except self.AccountSuspendedError:
+            self._suspended = True
+            raise
+
+        return (session, req) if get_request else session
+
+    @contextmanager
+    def _login_guard(self):
+        """Run a login in the block, guarded by the login breaker if set."""
+        if self._login_breaker is None:
+            yield
+            return
+        with self._login_breaker.exclusive():
+            self._check_login_breaker()
+            try:
+                yield
+            except self.LoginError as err:
+                self._record_login(err)
+                raise
+            self._record_login()
+
+    def _check_login_breaker(self):
+        """Raise AccountSuspendedError if the login breaker blocks logins."""
+        blocked = self._login_breaker.blocked_for(self._logindata["login_passwort"])
+        if blocked:
+            raise self.AccountSuspendedError(
+                "YesssSMS: login blocked after a failed login, "
+                f"try again in {int(blocked) + 1}s"
+            )
+
+    def _record_login(self, error=None):
+        """Record the outcome of a login with the login breaker."""
+        self._login_breaker.record(
+            self._logindata["login_passwort"],
+            failed=error is not None,
+            suspended=isinstance(error, self.AccountSuspendedError),
+        )
+
+    def _check_login(self, req, follow_redirect):
+        """Raise if the login response shows a failed login."""
+        if req.status_code >= 500 or req.status_code == 429:
+            # the provider fails, not the credentials
+            raise self._sending_error("YesssSMS: provider error at login", req)
+        if follow_redirect:
+            back_at_login = req.url == self._login_url
+        else:
+            # a successful login redirects away from the login page
+            back_at_login = (
+                not req.is_redirect
+                or urljoin(req.url, req.headers["location"]) == self._login_url
+            )
         if (
             _LOGIN_ERROR_STRING in req.text
             or req.status_code == 403
-            or req.url == self._login_url
+            or back_at_login
         ):
             err_mess = "YesssSMS: login failed, username or password wrong"
 
@@ -171,63 +411,147 @@ class YesssSMS:
 
         self._suspended = False  # login worked
 
-        return (session, req) if get_request else session
-
+    @phase_recorded("logout")
     @connection_error_handled
-    def _logout(self, session):
+    def _logout(self, session, deadline=None):
         """Logout of a session."""
-        session.get(self._logout_url)
+        session.get(self._logout_url, timeout=self._request_timeout(deadline, "logout"))
 
+    def _check_message(self, recipient, message):
+        """Raise if recipient or message can not be sent."""
+        if not recipient:
+            raise self.NoRecipientError("YesssSMS: recipient number missing")
+        if not isinstance(recipient, str):
+            raise ValueError("YesssSMS: str expected as recipient number")
+        if not message:
+            raise self.EmptyMessageError("YesssSMS: message is empty")
+        unsupported = check_charset(message, self._ucs2, self._bmp_only).unsupported
+        if not unsupported and self._char_cache is not None:
+            learned = self._char_cache.chars(self._provider_key())
+            unsupported = positions(message, learned)
+        if unsupported:
+            raise self._unsupported_chars_error(unsupported)
+
+    def _unsupported_chars_error(self, unsupported):
+        """Return an UnsupportedCharsError of (position, char) tuples."""
+        err = self.UnsupportedCharsError(
+            "YesssSMS: message contains unsupported character(s): "
+            + ", ".join(f"{char!r} at {position}" for position, char in unsupported)
+        )
+        err.chars = unsupported
+        return err
+
+    @phase_recorded("send")
     @connection_error_handled
-    def _send(self, recipient, message, session):
+    def _send(self, recipient, message, session, token=None, deadline=None):
         """Send an SMS.
 
         Needs a session, optained by _login().
         You can use this function to send multiple SMS with an open session.
         Close this session with _logout().
+        Without a CSRF token, a token is fetched from the SMS form first.
+        Returns the CSRF token for the next SMS if the provider's response
+        contains the SMS form, else None.
         """
-        if not recipient:
-            raise self.NoRecipientError("YesssSMS: recipient number missing")
-        if not isinstance(recipient, str):
-            raise ValueError("YesssSMS: str expected as recipient number")
-        if not message:
-            raise self.EmptyMessageError("YesssSMS: message is empty")
+        # pylint: disable=too-many-arguments
+        self._check_message(recipient, message)
 
-        csrf_token = self._get_csrf_token(session)
+        csrf_token = token or self._get_csrf_token(session, deadline)
 
-        sms_data = {
-            "to_nummer": recipient,
-            "nachricht": message,
-            "token": csrf_token,
-        }
-        req = session.post(self._send_sms_url, data=sms_data)
+        if self._rate_limiter is not None:
+            sleep(self._rate_limit_delay(deadline))
+        req = session.post(
+            self._send_sms_url,
+            data=self._sms_data(recipient, message, csrf_token),
+            timeout=self._request_timeout(deadline, "send"),
+        )
+        return self._check_sent(req, message)
+
+    def _rate_limit_delay(self, deadline):
+        """Reserve a token of the rate limiter, return the seconds to wait for it.
+
+        Raises TimeoutError at once, without taking a token, if the wait
+        would pass the deadline.
+        """
+        delay = self._rate_limiter.reserve(max_wait=self._deadline(deadline).remaining())
+        if delay is None:
+            err = self.TimeoutError("YesssSMS: rate limit wait exceeds the deadline")
+            err.phase, err.connected = "send", False
+            raise err
+        return delay
+
+    @staticmethod
+    def _sms_data(recipient, message, csrf_token):
+        """Return the form data of the SMS form."""
+        return {"to_nummer": recipient, "nachricht": message, "token": csrf_token}
+
+    def _check_sent(self, req, message=""):
+        """Raise if the SMS was not sent, return the next CSRF token or None."""
+        if self._session_expired(req):
+            raise self.SessionExpiredError("YesssSMS: session expired, SMS not sent")
 
         if req.status_code not in (200, 302):
-            raise self.SMSSendingError("YesssSMS: error sending SMS (1)")
+            raise self._sending_error("YesssSMS: error sending SMS (1)", req)
 
         if _UNSUPPORTED_CHARS_STRING in req.text:
-            raise self.UnsupportedCharsError(
-                "YesssSMS: message contains unsupported character(s)"
-            )
+            refused = parse_unsupported_chars(req.text, message)
+            if not refused:
+                raise self.UnsupportedCharsError(
+                    "YesssSMS: message contains unsupported character(s)"
+                )
+            if self._char_cache is not None:
+                self._char_cache.learn(self._provider_key(), refused)
+            raise self._unsupported_chars_error(positions(message, refused))
 
         if _SMS_SENDING_SUCCESSFUL_STRING not in req.text:
+            if req.status_code == 200 and find_token(req.text):
+                raise self.TokenRejectedError("YesssSMS: token not accepted")
             raise self.SMSSendingError("YesssSMS: error sending SMS (2)")
 
-    def _get_csrf_token(self, sess):
+        # the response shows the SMS form again, with the next token. Only the
+        # fast path looks for it, without it the next SMS gets the form first
+        with suppress(KeyError):
+            return find_token(req.text) or None
+        return None
+
+    @phase_recorded("token")
+    @connection_error_handled
+    def _get_csrf_token(self, sess, deadline=None):
         """Return the CSRF token for the SMS form."""
+        resp = sess.get(
+            self._sms_form_url, timeout=self._request_timeout(deadline, "token")
+        )
+        return self._check_form(resp)
+
+    def _check_form(self, resp):
+        """Return the CSRF token of the SMS form response."""
         token = ""
-        resp = sess.get(self._sms_form_url)
+        if self._session_expired(resp):
+            raise self.SessionExpiredError("YesssSMS: session expired, no token")
         if resp.status_code != 200:
-            raise self.SMSSendingError("YesssSMS: could not get token (1)")
+            raise self._sending_error("YesssSMS: could not get token (1)", resp)
         try:
-            soup = BeautifulSoup(resp.text, "html.parser")
-            token = soup.find(id=_SMS_FORM_ID).input[_SMS_FORM_ID_VALUE]
+            token = extract_token(resp.text)
         except (KeyError, AttributeError) as err:
             raise self.SMSSendingError(f"YesssSMS: could not get token (2): {err}")
         if token == "":
             raise self.SMSSendingError("YesssSMS: could not get token (3)")
         return token
 
+    def _sending_error(self, message, resp):
+        """Return a SMSSendingError with the HTTP status of resp."""
+        err = self.SMSSendingError(message)
+        err.status_code = resp.status_code
+        return err
+
+    def _session_expired(self, resp):
+        """Return if the provider sent the login page instead of resp."""
+        location = urljoin(resp.url, resp.headers.get("location", ""))
+        for url in (resp.url, location):
+            if urlsplit(url)._replace(query="", fragment="").geturl() == self._login_url:
+                return True
+        return _SMS_FORM_ID not in resp.text and _LOGIN_FORM_MARKER in resp.text
+
     def account_is_suspended(self):
         """Return if account is suspended."""
         return self._suspended
@@ -237,23 +561,200 @@ class YesssSMS:
         """Check for working login data."""
         login_working = False
         try:
-            with self._login(requests.Session()) as sess:
-                sess.get(self._logout_url)
+            with self._login(requests.Session(), follow_redirect=False) as sess:
+                self._logout(sess)
         except self.LoginError:
             pass
         else:
             login_working = True
         return login_working
 
+    def _http_session(self):
+        """Return a new requests session for a SMSSession."""
+        return requests.Session()
+
+    def _borrow_session(self, deadline=None):
+        """Return a context manager with a SMSSession for send and send_many."""
+        sess = SMSSession(self, deadline)
+        if self._session_store is not None:
+            sess.restore()
+        return sess
+
+    def session(self):
+        """Return a SMSSession, to send multiple SMS with one login.
+
+        Use it as a context manager, the provider session is logged out on exit:
+
+        with sms.session() as sess:
+            sess.send(recipient, message)
+        """
+        return SMSSession(self)
+
     @connection_error_handled
-    def send(self, recipient, message):
+    def send(self, recipient, message, deadline=None, transliterate=False):
         """Send an SMS.
 
         This logs in to the provider website, sends the SMS and logs out.
+        With deadline, the seconds the send may take, a late send raises
+        YesssSMS.TimeoutError. The logout is skipped if no time is left.
+        With transliterate, characters outside GSM-7 are replaced first,
+        see charset.transliterate, and the replacements are returned.
         """
-        with self._login(requests.Session()) as sess:
-            self._send(recipient=recipient, message=message, session=sess)
-            self._logout(session=sess)
+        message, changes = self._transliterate(message, transliterate)
+        deadline = self._deadline(deadline)
+        with self._borrow_session(deadline) as sess:
+            self._retrying(sess.send, recipient, message, deadline)
+        return changes
+
+    def _transliterate(self, message, transliterate=True):
+        """Return message with the characters outside GSM-7 replaced, and the changes."""
+        if not transliterate:
+            return message, None
+        if not isinstance(message, str):
+            return message, []
+        refused = frozenset()
+        if self._char_cache is not None:
+            refused = self._char_cache.chars(self._provider_key())
+        return transliterate_message(message, refused)
+
+    def _retrying(self, send, recipient, message, deadline):
+        """Call send with the retry policy, return the number of attempts."""
+        if self._retry_policy is None:
+            send(recipient, message, deadline)
+            return 1
+        return self._retry_policy.call(
+            send, recipient, message, deadline, deadline=deadline
+        )
+
+    def send_many(self, messages, deadline=None, transliterate=False):
+        """Send many SMS with one login, yield a SendResult for each of them.
+
+        messages is an iterable of (recipient, message) tuples. It is read
+        one SMS at a time, so it can be a generator. Nothing is sent before
+        the results are iterated. Errors of a single SMS are returned in its
+        SendResult and sending goes on, login errors are raised.
+        deadline is the seconds each SMS may take, including a login.
+        transliterate works like with send().
+        """
+        with self._borrow_session() as sess:
+            for recipient, message in messages:
+                message, changes = self._transliterate(message, transliterate)
+                with self._send_result(recipient, message, changes) as result:
+                    result.attempts = self._retrying(
+                        sess.send, recipient, message, self._deadline(deadline)
+                    )
+                yield result
+
+    @contextmanager
+    def _send_result(self, recipient, message, changes):
+        """Yield the SendResult of an SMS sent in the block, for send_many.
+
+        The block sets its attempts. Errors of the SMS are kept in the
+        result, login errors are raised.
+        """
+        result = SendResult(recipient, message, changes=changes or ())
+        start = perf_counter()
+        try:
+            yield result
+        except self.LoginError:
+            raise
+        except (ValueError, self.SMSSendingError, self.ConnectionError) as err:
+            result.error, result.attempts = err, getattr(err, "attempts", 1)
+        finally:
+            result.duration = perf_counter() - start
+
+    def set_rate_limit(self, rate, burst=1, lock_dir=None):
+        """Send at most rate SMS per second, with bursts of up to burst SMS.
+
+        The limit is shared by all instances for the same account and
+        provider in this process, with lock_dir (e.g. ratelimit.LOCK_DIR)
+        by all processes of the host. Senders wait for their turn. rate
+        None removes the limit.
+        """
+        if rate is None:
+            self._rate_limiter = None
+            return
+        self._rate_limiter = account_bucket(
+            self._provider_key(),
+            self._logindata["login_rufnummer"],
+            rate,
+            burst,
+            lock_dir,
+        )
+
+    def set_charset(self, ucs2=True, bmp_only=False):
+        """Set the characters a message may contain, see charset.check.
+
+        Messages are checked before the login, unsupported characters raise
+        UnsupportedCharsError. By default these are only the characters
+        UTF-16 can not encode, what else the provider refuses fails with
+        the request, see set_char_cache(). With ucs2 False only GSM-7
+        characters are sent, a message never needs the 70 character UCS-2
+        segments. With bmp_only, characters above U+FFFF like emoji are
+        refused too.
+        """
+        self._ucs2 = ucs2
+        self._bmp_only = bmp_only
+
+    def set_char_cache(self, path=CHAR_CACHE_PATH, max_age=30 * 24 * 3600):
+        """Learn the characters the provider refuses, see charset.CharCache.
+
+        Characters listed on the provider's error page are kept per provider
+        in path (None: in memory only) for max_age seconds. Messages with
+        them raise UnsupportedCharsError before the login. path False
+        removes the cache.
+        """
+        if path is False:
+            self._char_cache = None
+            return
+        self._char_cache = CharCache(path, max_age)
+
+    def _provider_key(self):
+        """Return the name of the provider, the host of a custom provider."""
+        if PROVIDER_URLS.get(self._provider, {}).get("LOGIN_URL") == self._login_url:
+            return self._provider
+        return urlsplit(self._login_url).netloc
+
+    def set_login_breaker(self, lock_dir=None, lockout_time=None):
+        """Guard the account against suspension for failed logins.
+
+        After a failed login, further logins fail with AccountSuspendedError
+        for lockout_time seconds (default: an hour) without reaching the
+        provider, see breaker.LoginBreaker. The breaker is shared by all
+        instances for the account in this process, with lock_dir (e.g.
+        ratelimit.LOCK_DIR) by all processes of the host. lock_dir False
+        removes it.
+        """
+        if lock_dir is False:
+            self._login_breaker = None
+            return
+        self._login_breaker = account_breaker(
+            self._provider_key(),
+            self._logindata["login_rufnummer"],
+            lock_dir,
+            LOCKOUT_TIME if lockout_time is None else lockout_time,
+        )
+
+    def set_retry_policy(self, policy):
+        """Retry sends failing with transient errors, see retry.RetryPolicy.
+
+        policy None sends every SMS once.
+        """
+        self._retry_policy = policy
+
+    def set_session_store(self, path=SESSION_STORE_PATH, max_age=1800):
+        """Keep the provider session in a file, to resume it in the next process.
+
+        send() and send_many() restore a session saved at most max_age
+        seconds ago instead of logging in, and do not logout, so the
+        session stays valid. Logins save their session. path None removes
+        the store. See sessionstore.SessionStore.
+        """
+        self._session_store = None if path is None else SessionStore(path, max_age)
+
+    def _session_key(self):
+        """Return the key of the account in the session store."""
+        return f"{self._provider_key()}:{self._logindata['login_rufnummer']}"
 
     def get_login_url(self):
         """Get provider's login URL."""
@@ -266,3 +767,160 @@ class YesssSMS:
     def version(self):
         """Get version of YesssSMS package."""
         return self._version
+
+
+class _SessionSteps:
+    """Decisions of a session send, shared by SMSSession and AsyncSMSSession.
+
+    _send_steps() yields the calls of a send, login() or a send with the
+    cached or a fresh CSRF token. The session makes them, blocking or with
+    await, and passes back the result, or the SMSSendingError of the call.
+    """
+
+    # the steps drive the private login/send calls of YesssSMS
+    # pylint: disable=protected-access,too-few-public-methods
+
+    _sms = None
+    _session = None
+    _logged_in = False
+    _token = None
+
+    def is_logged_in(self):
+        """Return if the session is logged in."""
+        return self._logged_in
+
+    def login(self, deadline=None):
+        """Login to the provider, the session is reused for sending."""
+        raise NotImplementedError
+
+    def _send_steps(self, recipient, message, deadline):
+        """Yield the calls of a send, logging in again after an expiry."""
+        self._sms._check_message(recipient, message)
+        deadline = self._sms._deadline(deadline)
+        reused = self._logged_in
+        if not reused:
+            yield partial(self.login, deadline)
+        try:
+            yield from self._token_steps(recipient, message, deadline)
+        except self._sms.SessionExpiredError:
+            if not reused:
+                raise
+            yield partial(self.login, deadline)
+            yield from self._token_steps(recipient, message, deadline)
+
+    def _token_steps(self, recipient, message, deadline):
+        """Yield the send with the cached token, then with a fresh one if rejected."""
+        token, self._token = self._token, None
+        send = partial(self._sms._send, recipient, message, self._session)
+        try:
+            try:
+                self._token = yield partial(send, token, deadline)
+            except self._sms.TokenRejectedError:
+                if token is None:
+                    raise
+                # the cached token was rejected, nothing was sent, get a fresh one
+                self._token = yield partial(send, None, deadline)
+        except self._sms.SMSSendingError:
+            # the provider session might have expired, login on next send
+            self._logged_in = False
+            raise
+
+    @staticmethod
+    def _next_call(steps, result):
+        """Pass result to steps, or raise it there if it is an error.
+
+        Returns the next call of steps, None after the last one.
+        """
+        try:
+            if isinstance(result, Exception):
+                return steps.throw(result)
+            return steps.send(result)
+        except StopIteration:
+            return None
+
+
+class SMSSession(_SessionSteps):
+    """Logged in provider session, reused for several SMS.
+
+    Get one with YesssSMS.session(). The login happens with the first send()
+    and the HTTP connection and the Kontomanager cookie are kept between
+    sends. If the provider session expired, send() logs in again and sends
+    the SMS once more. After other sending errors the session logs in again
+    on the next send().
+    The CSRF token for the next SMS is taken from the provider's response,
+    so following SMS need no extra request for the SMS form.
+    The logout uses what is left of deadline, a Deadline, if it is given.
+    With a session store, see YesssSMS.set_session_store(), logins are saved
+    and close() does not logout.
+    """
+
+    # the session drives the private login/send/logout calls of YesssSMS
+    # pylint: disable=protected-access
+
+    def __init__(self, sms, deadline=None):
+        """Initialize SMSSession for a YesssSMS instance."""
+        self._sms = sms
+        self._session = sms._http_session()
+        self._logged_in = False
+        self._token = None
+        self._deadline = deadline
+
+    def __enter__(self):
+        """Enter the context, return the session."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Logout and close the session."""
+        self.close()
+
+    def login(self, deadline=None):
+        """Login to the provider, the session is reused for sending."""
+        self._logged_in = False
+        self._token = None
+        self._sms._login(self._session, follow_redirect=False, deadline=deadline)
+        self._logged_in = True
+        store = self._sms._session_store
+        if store is not None:
+            store.save(self._sms._session_key(), self._session.cookies)
+
+    def restore(self):
+        """Resume the session of the session store, return if there was one.
+
+        The session counts as logged in, if it expired the next send logs in.
+        """
+        self._logged_in = self._sms._session_store.restore(
+            self._sms._session_key(), self._session.cookies
+        )
+        return self._logged_in
+
+    def send(self, recipient, message, deadline=None):
+        """Send an SMS, login first if necessary, within deadline seconds."""
+        steps = self._send_steps(recipient, message, deadline)
+        call = next(steps)
+        while call:
+            try:
+                result = call()
+            except self._sms.SMSSendingError as err:
+                result = err
+            call = self._next_call(steps, result)
+
+    def logout(self):
+        """Logout of the provider, the next send logs in again."""
+        if self._logged_in:
+            self._logged_in = False
+            if self._sms._session_store is not None:
+                self._sms._session_store.delete(self._sms._session_key())
+            self._sms._logout(session=self._session, deadline=self._deadline)
+
+    def close(self):
+        """Logout and close the HTTP connection."""
+        if self._sms._session_store is not None:
+            # keep the provider session for the next process
+            self._session.close()
+            return
+        try:
+            # a TimeoutError, too: no time left, the provider session expires
+            with suppress(YesssSMS.ConnectionError):
+                self.logout()
+        finally:
+            self._session.close()
@@ -0,0 +1,172 @@
+"""Login circuit breaker, guards accounts against the 3 strike suspension.
+
+The provider suspends an account for an hour after 3 failed logins. A
+LoginBreaker lets one login of an account run at a time and opens after a
+failed login: for lockout_time seconds logins fail at once with
+AccountSuspendedError instead of reaching the provider. Only a changed
+password may try once, while fewer than max_failures logins failed. A
+suspension reported by the provider blocks all logins. A successful login
+closes the breaker.
+
+LoginBreaker is shared by the threads of a process, FileLoginBreaker by
+all processes of a host, it keeps its state in a file locked with flock.
+Only a salted hash of a failed password is kept.
+"""
+import hashlib
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from os.path import expanduser, join
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+LOCKOUT_TIME = 3600
+
+_BREAKERS = {}
+_BREAKERS_LOCK = threading.Lock()
+
+
+def _digest(salt, passwd):
+    return hashlib.sha256(f"{salt}:{passwd}".encode("utf-8")).hexdigest()
+
+
+class LoginBreaker:
+    """Circuit breaker of the logins of one account, thread safe.
+
+    with breaker.exclusive():
+        if not breaker.blocked_for(passwd):
+            ...  # login
+            breaker.record(passwd, failed=not logged_in)
+    """
+
+    def __init__(self, lockout_time=LOCKOUT_TIME, max_failures=2, clock=time.time):
+        """Initialize a closed LoginBreaker."""
+        self.lockout_time = lockout_time
+        self.max_failures = max_failures
+        self._clock = clock
+        # (failures, until, salt, digest of the failed password) or None
+        self._state = None
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+
+    @contextmanager
+    def _locked_state(self):
+        """Yield a function to read and one to write the state, exclusively."""
+
+        def write(state):
+            self._state = state
+
+        with self._lock:
+            yield (lambda: self._state), write
+
+    @contextmanager
+    def exclusive(self):
+        """Let one login run at a time."""
+        with self._login_lock:
+            yield
+
+    def blocked_for(self, passwd):
+        """Return the seconds logins with passwd are blocked, 0 if they are not."""
+        with self._locked_state() as (read, _):
+            state = read()
+        if state is None:
+            return 0
+        failures, until, salt, digest = state
+        remaining = until - self._clock()
+        if remaining <= 0:
+            return 0
+        if failures < self.max_failures and _digest(salt, passwd) != digest:
+            # a changed password may try
+            return 0
+        return remaining
+
+    def record(self, passwd, failed=False, suspended=False):
+        """Record the outcome of a login with passwd, suspended if it says so."""
+        with self._locked_state() as (read, write):
+            if not failed:
+                write(None)
+                return
+            state = read()
+            failures = 1 if state is None else state[0] + 1
+            if suspended:
+                failures = max(failures, self.max_failures)
+            salt = secrets.token_hex(8)
+            until = self._clock() + self.lockout_time
+            write((failures, until, salt, _digest(salt, passwd)))
+
+
+class FileLoginBreaker(LoginBreaker):
+    """LoginBreaker shared by processes, with its state in a locked file.
+
+    Processes using the same path share the breaker, a second file at
+    path + ".lock" lets one of them login at a time. Needs fcntl.
+    """
+
+    def __init__(self, path, lockout_time=LOCKOUT_TIME, max_failures=2):
+        """Initialize a FileLoginBreaker with its state at path."""
+        if fcntl is None:
+            raise NotImplementedError("FileLoginBreaker needs fcntl (POSIX)")
+        super().__init__(lockout_time, max_failures)
+        self.path = expanduser(path)
+        os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+
+    @contextmanager
+    def _flock(self, path):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+", encoding="ascii") as locked:
+            fcntl.flock(locked, fcntl.LOCK_EX)
+            yield locked
+
+    @contextmanager
+    def _locked_state(self):
+        """Yield a function to read and one to write the state, exclusively."""
+
+        def read():
+            try:
+                failures, until, salt, digest = state_file.read().split()
+                return int(failures), float(until), salt, digest
+            except ValueError:
+                # empty (closed) or damaged
+                return None
+
+        def write(state):
+            state_file.seek(0)
+            state_file.truncate()
+            if state is not None:
+                failures, until, salt, digest = state
+                state_file.write(f"{failures} {until!r} {salt} {digest}")
+            state_file.flush()
+
+        # one open file per call, flock excludes threads and processes alike
+        with self._flock(self.path) as state_file:
+            yield read, write
+
+    @contextmanager
+    def exclusive(self):
+        """Let one login of all processes run at a time."""
+        with self._flock(self.path + ".lock"):
+            yield
+
+
+def account_breaker(provider, login, lock_dir=None, lockout_time=LOCKOUT_TIME):
+    """Return the login breaker of an account of a provider.
+
+    Without lock_dir the breaker is shared by the threads of this process,
+    else by all processes using lock_dir. The account keeps its breaker,
+    another lockout_time applies to the next failed login.
+    """
+    if lock_dir is not None:
+        name = "".join(c if c.isalnum() else "_" for c in f"{provider}-{login}")
+        return FileLoginBreaker(join(lock_dir, f"breaker-{name}"), lockout_time)
+    with _BREAKERS_LOCK:
+        breaker = _BREAKERS.get((provider, login))
+        if breaker is None:
+            breaker = _BREAKERS[(provider, login)] = LoginBreaker(lockout_time)
+        else:
+            breaker.lockout_time = lockout_time
+        return breaker
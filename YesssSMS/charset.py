@@ -0,0 +1,258 @@
+"""Characters an SMS can carry, checked before anything is sent.
+
+SMS are encoded in the GSM 03.38 alphabet (GSM-7), characters of its
+extension table take two septets. Messages with other characters are sent
+as UCS-2, in practice UTF-16: emoji and other characters above U+FFFF
+take two units. Only lone surrogates can not be encoded at all. Phones
+too old for UTF-16 show characters above U+FFFF wrong, with bmp_only they
+are refused too.
+
+YesssSMS checks every message before the login, a message with
+unsupported characters fails with UnsupportedCharsError without a
+request to the provider:
+
+check(message).unsupported  # [(position, char), ...]
+
+Which characters the provider refuses is not known in advance, so by
+default only what can not be encoded at all fails early. Other refused
+characters cost a login and a request, the provider lists them on its
+error page. Messages fail early with ucs2 False (GSM-7 only), with
+bmp_only, and with the characters a CharCache learned from the error
+pages.
+
+transliterate() makes a message GSM-7 instead, it replaces the other
+characters with TRANSLITERATIONS or "?".
+"""
+import html
+import os
+import string
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from os.path import expanduser
+
+from YesssSMS.const import CHAR_CACHE_PATH, _UNSUPPORTED_CHARS_STRING
+from YesssSMS.sessionstore import fcntl, locked_json
+
+GSM7_BASIC = (
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞ\x1bÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+# escaped with \x1b, two septets each
+GSM7_EXTENSION = "\x0c^{}\\[~]|€"
+
+# deletes the GSM-7 characters, what is left needs UCS-2
+_GSM7_TABLE = str.maketrans(
+    dict.fromkeys(GSM7_BASIC.replace("\x1b", "") + GSM7_EXTENSION)
+)
+
+# replacements that NFKD does not find
+_EXTRA_TRANSLITERATIONS = {
+    "‘": "'",
+    "’": "'",
+    "‚": ",",
+    "‛": "'",
+    "“": '"',
+    "”": '"',
+    "„": '"',
+    "«": '"',
+    "»": '"',
+    "‹": "<",
+    "›": ">",
+    "–": "-",
+    "—": "-",
+    "−": "-",
+    "•": "*",
+    "·": ".",
+    "×": "x",
+    "÷": ":",
+    "°": "o",
+    "©": "(c)",
+    "®": "(R)",
+    "™": "TM",
+    "đ": "d",
+    "Đ": "D",
+    "ł": "l",
+    "Ł": "L",
+    "œ": "oe",
+    "Œ": "OE",
+    "þ": "th",
+    "☺": ":)",
+    "🙂": ":)",
+    "😀": ":D",
+    "😉": ";)",
+    "🙁": ":(",
+    "❤": "<3",
+    "👍": "(y)",
+}
+
+
+def _transliterations():
+    """Return the GSM-7 replacements of Latin letters, punctuation and more."""
+    table = {}
+    for start, end in (
+        (0xA0, 0x250),  # Latin-1, Latin Extended-A and B
+        (0x1E00, 0x1F00),  # Latin Extended Additional
+        (0x2000, 0x2070),  # spaces and punctuation
+        (0xFB00, 0xFB07),  # ligatures
+        (0xFF01, 0xFF5F),  # full width forms
+    ):
+        for code in range(start, end):
+            char = chr(code)
+            folded = "".join(
+                part
+                for part in unicodedata.normalize("NFKD", char)
+                if not unicodedata.combining(part)
+            )
+            if folded and folded != char and is_gsm7(folded):
+                table[char] = folded
+    table.update(_EXTRA_TRANSLITERATIONS)
+    # characters of GSM-7 are kept
+    return {char: text for char, text in table.items() if not is_gsm7(char)}
+
+
+@dataclass
+class CharsetCheck:
+    """Result of check(), the encoding and the unsupported characters."""
+
+    encoding: str
+    unsupported: list
+
+
+def _ucs2_char(char, bmp_only=False):
+    """Return if char can be sent as UCS-2, not a lone surrogate."""
+    if bmp_only and char > "\uffff":
+        return False
+    return not "\ud800" <= char <= "\udfff"
+
+
+def is_gsm7(message):
+    """Return if message can be sent in the GSM-7 alphabet."""
+    return not message.translate(_GSM7_TABLE)
+
+
+# precompiled once, only characters outside GSM-7
+TRANSLITERATIONS = _transliterations()
+
+
+def transliterate(message, refused=frozenset()):
+    """Replace the characters of message outside GSM-7, and the refused ones.
+
+    The message is sent as GSM-7 with one attempt, whatever set_charset
+    allows. Returns the message and a list of (position, char,
+    replacement) of the replaced characters, replaced by their
+    TRANSLITERATIONS, or "?".
+    """
+    chars = set(message.translate(_GSM7_TABLE)) | set(refused).intersection(message)
+    if not chars:
+        return message, []
+    replacements = {char: TRANSLITERATIONS.get(char, "?") for char in chars}
+    changes = [
+        (position, char, replacements[char])
+        for position, char in positions(message, chars)
+    ]
+    return message.translate(str.maketrans(replacements)), changes
+
+
+def check(message, ucs2=True, bmp_only=False):
+    """Return a CharsetCheck of message.
+
+    encoding is "gsm7" or "ucs2", the encoding the message is sent with.
+    unsupported lists (position, char) of the characters that can not be
+    sent: lone surrogates, with bmp_only characters above U+FFFF too, with
+    ucs2 False all characters outside GSM-7.
+    """
+    rest = message.translate(_GSM7_TABLE)
+    if not rest:
+        return CharsetCheck("gsm7", [])
+    if ucs2 and all(_ucs2_char(char, bmp_only) for char in rest):
+        return CharsetCheck("ucs2", [])
+    refused = {char for char in rest if not (ucs2 and _ucs2_char(char, bmp_only))}
+    return CharsetCheck("ucs2", positions(message, refused))
+
+
+def positions(message, chars):
+    """Return (position, char) of the characters of message in chars."""
+    return [(position, char) for position, char in enumerate(message) if char in chars]
+
+
+def parse_unsupported_chars(text, message):
+    """Return the characters of message the provider's error page lists."""
+    start = text.find(_UNSUPPORTED_CHARS_STRING)
+    if start < 0:
+        return set()
+    listed = text[start + len(_UNSUPPORTED_CHARS_STRING):].split("<", 1)[0]
+    # only what is in message, not the blanks, quotes and other text around
+    # the list: GSM-7 and ASCII punctuation are never refused
+    return {
+        char
+        for char in set(html.unescape(listed)).intersection(message)
+        if not is_gsm7(char) and char not in string.punctuation
+    }
+
+
+class CharCache:
+    """Characters refused by providers, learned from their error pages.
+
+    The characters are kept per provider in a JSON file (path None: in
+    memory only) and forgotten after max_age seconds, in case the provider
+    accepts them again. A file of another VERSION is started over.
+    """
+
+    # 2: no GSM-7 characters and punctuation learned from the page around the list
+    VERSION = 2
+
+    def __init__(self, path=CHAR_CACHE_PATH, max_age=30 * 24 * 3600):
+        """Initialize a CharCache at path."""
+        if path is not None and fcntl is None:
+            raise NotImplementedError("CharCache needs fcntl (POSIX)")
+        self.path = expanduser(path) if path is not None else None
+        self.max_age = max_age
+        self._learned = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        if self.path is not None:
+            os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+
+    def _update(self, learn=None):
+        """Read the file if it changed, add learn, a (provider, chars) tuple."""
+        if self.path is None:
+            if learn is not None:
+                self._merge(self._learned, *learn)
+            return
+        if learn is None:
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                return
+            if mtime == self._mtime:
+                return
+        with locked_json(self.path) as data:
+            if data.get("version") != self.VERSION:
+                data.clear()
+                data.update(version=self.VERSION, providers={})
+            if learn is not None:
+                self._merge(data["providers"], *learn)
+            self._learned = data["providers"]
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    @staticmethod
+    def _merge(learned, provider, chars):
+        """Add chars to the learned characters of provider, now."""
+        now = time.time()
+        learned.setdefault(provider, {}).update(dict.fromkeys(chars, now))
+
+    def chars(self, provider):
+        """Return the characters provider refused within max_age."""
+        with self._lock:
+            self._update()
+            learned = self._learned.get(provider, {})
+        oldest = time.time() - self.max_age
+        return {char for char, when in learned.items() if when >= oldest}
+
+    def learn(self, provider, chars):
+        """Remember that provider refused chars."""
+        if chars:
+            with self._lock:
+                self._update((provider, chars))
@@ -0,0 +1,159 @@
+"""Coalescer, merging bursts of SMS to the same recipient.
+
+During an incident, monitoring sends many SMS to the same on-call number.
+A Coalescer in front of YesssSMS.send collects the messages to a
+recipient for `window` seconds after the first one and sends them as one
+SMS, one message per line:
+
+coalescer = Coalescer(sms, window=60, max_segments=3)
+coalescer.send(recipient, message)  # returns at once
+
+At most max_segments SMS segments are sent per recipient and window. A
+message that does not fit in the SMS anymore sends it at once, if
+segments are left for another one. Once the budget is spent, messages are
+only counted, the last SMS of the window ends with "+N more".
+"""
+import logging
+import threading
+from time import perf_counter
+
+from YesssSMS.api import SendResult, YesssSMS
+from YesssSMS.pool import normalize_recipient
+from YesssSMS.segments import pack, segments
+
+SEPARATOR = "\n"
+# room kept in each SMS for the summary
+_SUMMARY_ROOM = SEPARATOR + "+999 more"
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class _Batch:
+    """Messages to a recipient within one window."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, recipient):
+        """Start an empty batch."""
+        self.recipient = recipient
+        self.messages = []
+        self.used = 0  # segments sent in this window
+        self.more = 0  # messages left out
+        self.timer = None
+
+
+class Coalescer:
+    """Merge SMS to the same recipient within a time window, safe to use from threads.
+
+    sms is a YesssSMS, SharedYesssSMS or YesssSMSPool. SMS of a window are
+    sent by a timer thread, errors are logged.
+    """
+
+    def __init__(self, sms, window=60.0, max_segments=3):
+        """Initialize Coalescer."""
+        if max_segments < 1:
+            raise ValueError("YesssSMS: max_segments must be at least 1")
+        self._sms = sms
+        self.window = window
+        self.max_segments = max_segments
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        """Enter the context, return Coalescer."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Send the pending SMS."""
+        self.close()
+
+    def _fits(self, batch, messages):
+        """Return if messages fit in the segments left, with a summary."""
+        text = SEPARATOR.join(messages) + _SUMMARY_ROOM
+        return segments(text).count <= self.max_segments - batch.used
+
+    def send(self, recipient, message):
+        """Add an SMS to the window of recipient.
+
+        Invalid messages raise at once with a YesssSMS. Returns the
+        SendResult of an SMS that had to be sent right away, else None.
+        """
+        if isinstance(self._sms, YesssSMS):
+            # pylint: disable=protected-access
+            self._sms._check_message(recipient, message)
+        key = normalize_recipient(recipient)
+        with self._lock:
+            batch = self._batches.get(key)
+            if batch is None:
+                batch = self._batches[key] = _Batch(recipient)
+                batch.timer = threading.Timer(self.window, self._expire, (key, batch))
+                batch.timer.daemon = True
+                batch.timer.start()
+            full = self._add(batch, message)
+        if full:
+            return self._send(recipient, SEPARATOR.join(full))
+        return None
+
+    def _add(self, batch, message):
+        """Add message to batch, return the messages to send now, if any."""
+        first = not batch.messages and batch.more == 0
+        if first or self._fits(batch, batch.messages + [message]):
+            # the first message is sent in any case, shortened if necessary
+            batch.messages.append(message)
+            return None
+        full = batch.messages
+        count = segments(SEPARATOR.join(full)).count
+        if full and batch.used + count < self.max_segments:
+            # the SMS is full and segments are left, send it now
+            batch.used += count
+            batch.messages = []
+            if self._fits(batch, [message]):
+                batch.messages.append(message)
+            else:
+                batch.more += 1
+            return full
+        batch.more += 1
+        return None
+
+    def _expire(self, key, batch):
+        """Send the SMS of batch at the end of its window."""
+        with self._lock:
+            if self._batches.get(key) is not batch:
+                return
+            del self._batches[key]
+        self._send_last(batch)
+
+    def _send_last(self, batch):
+        """Send the messages of batch and the summary, return the SendResult."""
+        summary = f"+{batch.more} more" if batch.more else ""
+        if not batch.messages:
+            return self._send(batch.recipient, summary)
+        text = pack(
+            SEPARATOR.join(batch.messages),
+            max(1, self.max_segments - batch.used),
+            suffix=SEPARATOR + summary if summary else "",
+        )
+        return self._send(batch.recipient, text)
+
+    def _send(self, recipient, message):
+        """Send an SMS, return its SendResult."""
+        error = None
+        start = perf_counter()
+        try:
+            self._sms.send(recipient, message)
+        except (ValueError, YesssSMS.SMSSendingError, YesssSMS.ConnectionError) as err:
+            _LOGGER.error("SMS to %s failed: %s", recipient, err)
+            error = err
+        return SendResult(recipient, message, error, perf_counter() - start)
+
+    def flush(self):
+        """Send the pending SMS of all recipients now, return their SendResults."""
+        with self._lock:
+            batches, self._batches = list(self._batches.values()), {}
+        for batch in batches:
+            batch.timer.cancel()
+        return [self._send_last(batch) for batch in batches]
+
+    def close(self):
+        """Send the pending SMS."""
+        self.flush()
@@ -1,12 +1,6 @@
 """constants for YesssSMS."""
-import json
-import os
+from YesssSMS.version import VERSION  # noqa: F401 pylint: disable=unused-import
 
-VERSION = ""
-with open(
-    os.path.dirname(os.path.realpath(__file__)) + "/version.json", encoding="utf-8"
-) as f:
-    VERSION = json.loads(f.read())["version"]
 _UNSUPPORTED_CHARS_STRING = "<strong>Achtung:</strong> Ihre SMS konnte nicht \
 versendet werden, da sie folgende ungültige Zeichen enthält:"
 _LOGIN_ERROR_STRING = "<strong>Login nicht erfolgreich"
@@ -18,6 +12,9 @@ _UNSUPPORTED_CHARS_STRING = "<strong>Achtung:</strong> Ihre SMS konnte nicht \
 versendet werden, da sie folgende ungültige Zeichen enthält:"
 _SMS_SENDING_SUCCESSFUL_STRING = ">Ihre SMS wurde erfolgreich verschickt!<"
 
+# the login form is shown instead of the requested page if the session expired
+_LOGIN_FORM_MARKER = "login_rufnummer"
+
 _SMS_FORM_ID = "smsform"
 _SMS_FORM_ID_VALUE = "value"
 
@@ -144,6 +141,22 @@ HELP = {
     "test": "send a test message to yourself",
     "print-config-file": "prints a sample config file, that can be piped \
           into eg. ~/.config/yessssms.conf.",
+    "spool": "queue the SMS in a spool file instead of sending it, \
+          the daemon sends it (default: ~/.local/share/yessssms/spool.db)",
+    "daemon": "keep a logged in session for other calls of yessssms and \
+          send the SMS queued in the spool (see --spool), runs until it \
+          is stopped",
+    "rate_limit": "send at most RATE SMS per second, shared by all yessssms \
+          processes of the account on this host",
+    "burst": "with --rate-limit, allow bursts of up to N SMS (default: 1)",
+    "session_store": "keep the provider session in a file (default: \
+          ~/.cache/yessssms/sessions.json) and resume it in the next call \
+          of yessssms, without a login",
+    "login_breaker": "after a failed login, do not login again with the same \
+          password for an hour, shared by all yessssms processes of the \
+          account on this host (always on with --daemon)",
+    "socket": "control socket of the daemon, SMS are sent by the daemon \
+          if it is running (default: $XDG_RUNTIME_DIR/yessssms/control.sock)",
 }
 CONFIG_FILE_CONTENT = """\
 # place this file, with correct credentials, at /etc/yessssms.conf
@@ -167,6 +180,14 @@ PASSWD = MySecre3tPassw0rd
 # WEBSMS_FORM_URL = https://educom.kontomanager.at/websms.php
 # SEND_SMS_URL = https://educom.kontomanager.at/websms_send.php
 """
+SPOOL_PATH = "~/.local/share/yessssms/spool.db"
+SESSION_STORE_PATH = "~/.cache/yessssms/sessions.json"
+CHAR_CACHE_PATH = "~/.cache/yessssms/chars.json"
+
+# seconds a request waits for the provider's connection and response
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+
 # CONFIG_FILE_PATHS = []
 CONFIG_FILE_PATHS = ["/etc/yessssms.conf", "~/.config/yessssms.conf"]
 
@@ -0,0 +1,171 @@
+"""Control socket of the yessssms daemon, like the ControlMaster of ssh.
+
+The daemon (`yessssms --daemon`) keeps a logged in session and listens on
+a Unix domain socket. `yessssms -t ... -m ...` hands the SMS to it instead
+of logging in itself, if the socket exists.
+
+The protocol is one JSON object per line, request and response:
+{"to": "0650...", "message": "..."}  ->  {"ok": true}
+                                     ->  {"ok": false, "error": "LoginError",
+                                          "message": "..."}
+
+The client functions only need the standard library.
+"""
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from os.path import dirname, exists, expanduser, join
+
+MAX_REQUEST_SIZE = 64 * 1024
+
+
+def default_control_path():
+    """Return the default path of the control socket."""
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR") or expanduser("~/.cache")
+    return join(runtime_dir, "yessssms", "control.sock")
+
+
+class ControlError(Exception):
+    """the daemon could not send the SMS, error is the name of the exception."""
+
+    def __init__(self, error, message):
+        """Initialize ControlError."""
+        super().__init__(message)
+        self.error = error
+
+
+def forward(recipient, message, path=None, timeout=120):
+    """Send an SMS with the daemon listening at path.
+
+    recipient None uses the default recipient of the daemon. Raises OSError
+    if no daemon listens at path, nothing was sent then. Raises
+    ControlError if the daemon could not send the SMS.
+    """
+    request = json.dumps({"to": recipient, "message": message}) + "\n"
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or default_control_path())
+        # the daemon might have sent the SMS, errors must not lead to a resend
+        try:
+            sock.sendall(request.encode("utf-8"))
+            with sock.makefile("r", encoding="utf-8") as stream:
+                line = stream.readline()
+        except OSError as err:
+            raise ControlError("SMSSendingError", f"YesssSMS: daemon: {err}") from err
+    if not line:
+        raise ControlError("SMSSendingError", "YesssSMS: daemon closed the connection")
+    response = json.loads(line)
+    if not response.get("ok"):
+        raise ControlError(response.get("error"), response.get("message"))
+
+
+def _probe(path):
+    """Connect to the socket at path, raises OSError if nothing listens."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+
+
+class ControlServer:
+    """Serve sends of the CLI on a Unix domain socket, with a YesssSMS instance.
+
+    sms should be thread safe, e.g. a SharedYesssSMS, requests are handled
+    in threads. The socket is only accessible by the owner (mode 0600) and
+    only connections of processes of the same user are accepted.
+
+    with ControlServer(SharedYesssSMS(login, passwd)) as server:
+        server.serve_forever()
+    """
+
+    def __init__(self, sms, path=None, default_recipient=None):
+        """Create the socket at path, fails if a daemon is listening there."""
+        self._sms = sms
+        self._default_recipient = default_recipient
+        self.path = path or default_control_path()
+        os.makedirs(dirname(self.path), mode=0o700, exist_ok=True)
+        if exists(self.path):
+            try:
+                _probe(self.path)
+            except ConnectionRefusedError:
+                # left over of a daemon that was killed
+                os.unlink(self.path)
+            else:
+                raise OSError(f"a yessssms daemon is listening at {self.path}")
+        umask = os.umask(0o177)
+        try:
+            self._server = _Server(self.path, _Handler)
+        finally:
+            os.umask(umask)
+        os.chmod(self.path, 0o600)
+        self._server.control = self
+
+    def __enter__(self):
+        """Enter the context, return the server."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the server and remove the socket."""
+        self.close()
+
+    def serve_forever(self):
+        """Handle requests until shutdown() is called."""
+        self._server.serve_forever(poll_interval=0.2)
+
+    def start(self):
+        """Handle requests in a background thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        """Stop serve_forever(), from another thread."""
+        self._server.shutdown()
+
+    def close(self):
+        """Close the socket and remove its file."""
+        self._server.server_close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def handle(self, request):
+        """Send the SMS of a request, return the response."""
+        try:
+            recipient = request.get("to") or self._default_recipient
+            self._sms.send(recipient, request.get("message"))
+        except (ValueError, self._sms.LoginError, self._sms.SMSSendingError) as err:
+            return {"ok": False, "error": type(err).__name__, "message": str(err)}
+        except self._sms.ConnectionError as err:
+            return {"ok": False, "error": "ConnectionError", "message": str(err)}
+        return {"ok": True}
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    control = None
+
+    def verify_request(self, request, client_address):
+        """Accept connections of processes of the same user only."""
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        creds = request.getsockopt(
+            socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+        )
+        return struct.unpack("3i", creds)[1] == os.getuid()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline(MAX_REQUEST_SIZE)
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("request is not an object")
+        except ValueError as err:
+            response = {"ok": False, "error": "ValueError", "message": str(err)}
+        else:
+            response = self.server.control.handle(request)
+        self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
@@ -0,0 +1,74 @@
+"""Extract the CSRF token of the SMS form without building a HTML tree."""
+import re
+from html import unescape
+
+from YesssSMS.const import _SMS_FORM_ID, _SMS_FORM_ID_VALUE
+
+# a start tag, quoted attribute values may contain '>'
+_TAG_RE = re.compile(r"""<([a-zA-Z][\w:-]*)((?:[^>"']|"[^"]*"|'[^']*')*)>""")
+_INPUT_RE = re.compile(r"""<input\b((?:[^>"']|"[^"]*"|'[^']*')*)>""", re.IGNORECASE)
+_ATTR_RE = re.compile(
+    r"""([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?"""
+)
+
+
+def _attributes(attr_text):
+    """Return a dict of the attributes of a start tag."""
+    attrs = {}
+    for match in _ATTR_RE.finditer(attr_text):
+        name, double, single, unquoted = match.groups()
+        value = double if double is not None else single
+        value = value if value is not None else unquoted
+        attrs.setdefault(name.lower(), None if value is None else unescape(value))
+    return attrs
+
+
+def find_token(text):
+    """Return the value of the first input after the SMS form tag.
+
+    Scans only the tags at the SMS form id and stops at the first input.
+    Returns None if no SMS form with an input is found, raises KeyError if
+    the input has no value.
+    """
+    pos = text.find(_SMS_FORM_ID)
+    while pos != -1:
+        start = text.rfind("<", 0, pos)
+        tag = _TAG_RE.match(text, start) if start != -1 else None
+        if (
+            tag is not None
+            and tag.end() > pos
+            and _attributes(tag.group(2)).get("id") == _SMS_FORM_ID
+        ):
+            field = _INPUT_RE.search(text, tag.end())
+            if field is None:
+                return None
+            value = _attributes(field.group(1)).get(_SMS_FORM_ID_VALUE)
+            if value is None:
+                raise KeyError(_SMS_FORM_ID_VALUE)
+            return value
+        pos = text.find(_SMS_FORM_ID, pos + len(_SMS_FORM_ID))
+    return None
+
+
+def soup_token(text):
+    """Return the CSRF token of the SMS form, parsed by BeautifulSoup."""
+    try:
+        # pylint: disable=import-outside-toplevel
+        from bs4 import BeautifulSoup
+    except ImportError:
+        raise AttributeError("no SMS form found, bs4 is not installed") from None
+    soup = BeautifulSoup(text, "html.parser")
+    return soup.find(id=_SMS_FORM_ID).input[_SMS_FORM_ID_VALUE]
+
+
+def extract_token(text):
+    """Return the CSRF token of the SMS form in text.
+
+    Uses find_token() and falls back to BeautifulSoup for markup the fast
+    path doesn't understand. Raises KeyError or AttributeError like the
+    BeautifulSoup lookup if there is no token.
+    """
+    token = find_token(text)
+    if token is None:
+        token = soup_token(text)
+    return token
@@ -0,0 +1,178 @@
+"""YesssSMSPool, sends spread across several accounts.
+
+Every account has its own logged in sessions, rate limit and suspension
+state, so the throughput grows with the number of SIMs:
+
+pool = YesssSMSPool(
+    [("06641234567", "secret"), ("06761234567", "secret", "educom")],
+    strategy="hash",
+)
+pool.send(recipient, message)
+
+Strategies:
+* round_robin: the accounts take turns.
+* least_loaded: the account with the fewest sends running.
+* hash: rendezvous hash of the recipient, a recipient always gets its
+  SMS from the same number, adding an account moves few recipients.
+
+A send failing with AccountSuspendedError is sent with the next account,
+the suspended account is skipped for an hour, or until all are suspended.
+"""
+import hashlib
+import itertools
+import re
+import threading
+from time import monotonic, perf_counter
+
+from YesssSMS.api import SendResult, YesssSMS
+from YesssSMS.breaker import LOCKOUT_TIME
+from YesssSMS.shared import SharedYesssSMS
+
+STRATEGIES = ("round_robin", "least_loaded", "hash")
+
+
+def normalize_recipient(recipient):
+    """Return the national form of a number, "+43 664 1" is "06641".
+
+    Raises like YesssSMS.send if recipient is missing or not a str.
+    """
+    if not recipient:
+        raise YesssSMS.NoRecipientError("YesssSMS: recipient number missing")
+    if not isinstance(recipient, str):
+        raise ValueError("YesssSMS: str expected as recipient number")
+    number = re.sub(r"[^\d+]", "", recipient)
+    for prefix in ("+43", "0043"):
+        if number.startswith(prefix):
+            return "0" + number[len(prefix):]
+    return number
+
+
+class YesssSMSPool:
+    """Route SMS to one of several accounts, safe to use from threads.
+
+    accounts are YesssSMS instances, or (login, passwd) and (login, passwd,
+    provider) tuples or dicts of YesssSMS arguments, which become a
+    SharedYesssSMS with `size` sessions each.
+    """
+
+    def __init__(self, accounts, strategy="round_robin", size=2):
+        """Initialize YesssSMSPool."""
+        if strategy not in STRATEGIES:
+            raise ValueError(f"YesssSMS: strategy must be one of {STRATEGIES}")
+        self.accounts = [self._account(account, size) for account in accounts]
+        if not self.accounts:
+            raise ValueError("YesssSMS: at least one account is needed")
+        self.strategy = strategy
+        self._turns = itertools.count()
+        self._in_flight = [0] * len(self.accounts)
+        self._suspended_until = [0.0] * len(self.accounts)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _account(account, size):
+        """Return a YesssSMS of an account."""
+        if isinstance(account, YesssSMS):
+            return account
+        if isinstance(account, dict):
+            return SharedYesssSMS(size=size, **account)
+        return SharedYesssSMS(*account, size=size)
+
+    def __enter__(self):
+        """Enter the context, return YesssSMSPool."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Logout all accounts."""
+        self.close()
+
+    def _key(self, index, recipient):
+        """Return the rendezvous hash weight of an account for a recipient."""
+        account = self.accounts[index]
+        # pylint: disable=protected-access
+        name = f"{account._provider_key()}:{account._logindata['login_rufnummer']}"
+        digest = hashlib.sha256(f"{name}|{recipient}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big")
+
+    def candidates(self, recipient):
+        """Return the indexes of the accounts to try for recipient, in order."""
+        count = len(self.accounts)
+        if self.strategy == "hash":
+            recipient = normalize_recipient(recipient)
+            order = sorted(range(count), key=lambda i: self._key(i, recipient))[::-1]
+        elif self.strategy == "least_loaded":
+            with self._lock:
+                loads = list(self._in_flight)
+            start = next(self._turns)
+            # ties are taken in turns
+            order = sorted(range(count), key=lambda i: (loads[i], (i - start) % count))
+        else:
+            start = next(self._turns)
+            order = [(start + i) % count for i in range(count)]
+        now = monotonic()
+        healthy = [i for i in order if self._suspended_until[i] <= now]
+        return healthy or order
+
+    def account_for(self, recipient):
+        """Return the account the next SMS to recipient is sent with."""
+        return self.accounts[self.candidates(recipient)[0]]
+
+    def _send_with(self, index, recipient, message, deadline):
+        with self._lock:
+            self._in_flight[index] += 1
+        try:
+            self.accounts[index].send(recipient, message, deadline)
+        finally:
+            with self._lock:
+                self._in_flight[index] -= 1
+
+    def send(self, recipient, message, deadline=None):
+        """Send an SMS with one of the accounts, return that account."""
+        error = None
+        for index in self.candidates(recipient):
+            try:
+                self._send_with(index, recipient, message, deadline)
+                return self.accounts[index]
+            except YesssSMS.AccountSuspendedError as err:
+                self._suspended_until[index] = monotonic() + LOCKOUT_TIME
+                error = err
+        raise error
+
+    def send_many(self, messages, deadline=None):
+        """Send many SMS, yield a SendResult for each of them, like YesssSMS."""
+        for recipient, message in messages:
+            error = None
+            start = perf_counter()
+            try:
+                self.send(recipient, message, deadline)
+            except YesssSMS.LoginError:
+                raise
+            except (
+                ValueError,
+                YesssSMS.SMSSendingError,
+                YesssSMS.ConnectionError,
+            ) as err:
+                error = err
+            yield SendResult(
+                recipient,
+                message,
+                error,
+                perf_counter() - start,
+                getattr(error, "attempts", 1),
+            )
+
+    def set_rate_limit(self, rate, burst=1, lock_dir=None):
+        """Limit the SMS per second of every account, like YesssSMS does."""
+        for account in self.accounts:
+            account.set_rate_limit(rate, burst, lock_dir)
+
+    def login(self):
+        """Login all accounts, raise the first login error."""
+        for account in self.accounts:
+            if isinstance(account, SharedYesssSMS):
+                account.login()
+
+    def close(self):
+        """Logout all accounts."""
+        for account in self.accounts:
+            if isinstance(account, SharedYesssSMS):
+                account.close()
@@ -0,0 +1,155 @@
+"""Token bucket rate limiting of SMS per account and provider.
+
+A bucket holds up to `burst` tokens and gains `rate` tokens per second,
+every SMS takes one. Waiting senders reserve their token, so they are
+served in order and the sustained rate never exceeds `rate`.
+
+TokenBucket is shared by the threads of a process, FileTokenBucket by
+all processes of a host, it keeps its state in a file locked with flock.
+"""
+import os
+import threading
+import time
+from os.path import expanduser, join
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+LOCK_DIR = "~/.cache/yessssms"
+
+_BUCKETS = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def _check_parameters(rate, burst):
+    """Raise ValueError for an invalid rate or burst."""
+    if rate <= 0:
+        raise ValueError("YesssSMS: rate must be positive")
+    if burst < 1:
+        raise ValueError("YesssSMS: burst must be at least 1")
+
+
+class TokenBucket:
+    """Token bucket of `rate` tokens per second and up to `burst` tokens, thread safe.
+
+    bucket = TokenBucket(rate=0.5, burst=3)
+    bucket.acquire()  # sleeps until a token is free
+    """
+
+    def __init__(self, rate, burst=1, clock=time.monotonic):
+        """Initialize a full TokenBucket."""
+        _check_parameters(rate, burst)
+        self.rate = rate
+        self.burst = burst
+        self._clock = clock
+        self._tokens = burst
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def _update(self, change):
+        """Refill the bucket, apply change(tokens) -> (tokens, result), return result."""
+        with self._lock:
+            now = self._clock()
+            self._tokens, result = change(self._refill(self._tokens, self._stamp, now))
+            self._stamp = now
+        return result
+
+    def _refill(self, tokens, stamp, now):
+        """Return the tokens at now, of tokens at stamp."""
+        return min(self.burst, tokens + max(0.0, now - stamp) * self.rate)
+
+    def reserve(self, count=1, max_wait=None):
+        """Take count tokens, return the seconds to wait before using them.
+
+        If that is longer than max_wait seconds, no tokens are taken and
+        None is returned.
+        """
+
+        def change(tokens):
+            delay = max(0.0, (count - tokens) / self.rate)
+            if max_wait is not None and delay > max_wait:
+                return tokens, None
+            return tokens - count, delay
+
+        return self._update(change)
+
+    def try_acquire(self, count=1):
+        """Take count tokens if they are free now, return if they were."""
+        return self._update(
+            lambda tokens: (tokens - count, True) if tokens >= count else (tokens, False)
+        )
+
+    def configure(self, rate, burst=1):
+        """Change rate and burst, the tokens are kept up to burst."""
+        _check_parameters(rate, burst)
+
+        def change(tokens):
+            # refilled with the old rate up to now
+            self.rate, self.burst = rate, burst
+            return min(tokens, burst), None
+
+        self._update(change)
+
+    def acquire(self, count=1):
+        """Take count tokens, sleep until they are free, return the seconds slept."""
+        delay = self.reserve(count)
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+class FileTokenBucket(TokenBucket):
+    """TokenBucket shared by processes, with its state in a locked file.
+
+    Processes using the same path share the bucket, the parameters of the
+    bucket are not stored and should be the same for all of them.
+    Needs fcntl, i.e. a POSIX system.
+    """
+
+    def __init__(self, path, rate, burst=1):
+        """Initialize a FileTokenBucket with its state at path."""
+        if fcntl is None:
+            raise NotImplementedError("FileTokenBucket needs fcntl (POSIX)")
+        super().__init__(rate, burst, clock=time.time)
+        self.path = expanduser(path)
+        os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+
+    def _update(self, change):
+        """Refill the bucket, apply change(tokens) -> (tokens, result), return result."""
+        # one open file per call, flock excludes threads and processes alike
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(fd, "r+", encoding="ascii") as state:
+            fcntl.flock(state, fcntl.LOCK_EX)
+            now = self._clock()
+            try:
+                tokens, stamp = (float(value) for value in state.read().split())
+            except ValueError:
+                # new or damaged file, start full
+                tokens, stamp = self.burst, now
+            tokens, result = change(self._refill(tokens, stamp, now))
+            state.seek(0)
+            state.truncate()
+            state.write(f"{tokens!r} {now!r}")
+            state.flush()
+        return result
+
+
+def account_bucket(provider, login, rate, burst=1, lock_dir=None):
+    """Return the token bucket of an account of a provider.
+
+    Without lock_dir the bucket is shared by the threads of this process,
+    else by all processes using lock_dir. The account keeps its bucket,
+    another rate or burst changes it for all users of the bucket.
+    """
+    if lock_dir is not None:
+        name = "".join(c if c.isalnum() else "_" for c in f"{provider}-{login}")
+        return FileTokenBucket(join(lock_dir, f"ratelimit-{name}"), rate, burst)
+    with _BUCKETS_LOCK:
+        bucket = _BUCKETS.get((provider, login))
+        if bucket is None:
+            bucket = _BUCKETS[(provider, login)] = TokenBucket(rate, burst)
+        elif (bucket.rate, bucket.burst) != (rate, burst):
+            bucket.configure(rate, burst)
+        return bucket
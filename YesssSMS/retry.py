@@ -0,0 +1,185 @@
+"""Retries of sends failing with transient errors.
+
+Errors are transient if sending again later might work: connection
+errors, timeouts, HTTP 408, 429 and 5xx, and sending errors without an
+HTTP status. Everything the provider refuses for good is permanent: wrong
+credentials, suspended accounts, empty messages and unsupported
+characters.
+
+The request sending the SMS is not idempotent: after a timeout or an
+error response it might have been sent anyway. By default only errors
+before it are retried, of the login and the SMS form, and errors of the
+SMS request that surely did not send it, e.g. a refused connection.
+RetryPolicy(after_send=True) retries the others too, recipients might get
+an SMS twice.
+
+Retries wait with exponential backoff and full jitter, a random time up to
+base_delay * 2 ** retry seconds. A RetryBudget limits the retries to a
+share of the sends, so a failing provider does not get more load:
+
+policy = RetryPolicy(max_attempts=4, budget=RetryBudget(ratio=0.1))
+sms.set_retry_policy(policy)
+"""
+import asyncio
+import random
+import threading
+import time
+from functools import partial
+
+from YesssSMS.api import YesssSMS
+from YesssSMS.shared import SharedYesssSMS
+
+# request timeout, too early, too many requests and the 5xx the provider sends
+TRANSIENT_STATUS_CODES = frozenset((408, 425, 429, 500, 502, 503, 504))
+
+
+def is_transient(err, after_send=False):
+    """Return if sending again might succeed after err.
+
+    Errors of the send phase, the SMS request, are only transient with
+    after_send, unless the SMS was surely not sent.
+    """
+    if isinstance(err, SharedYesssSMS.PoolTimeoutError):
+        # busy on our side, the provider is fine
+        return False
+    if isinstance(err, YesssSMS.SMSSendingError):
+        status_code = err.status_code
+        transient = status_code is None or status_code in TRANSIENT_STATUS_CODES
+    elif isinstance(err, YesssSMS.ConnectionError):
+        transient = True
+    else:
+        return False
+    return transient and (after_send or err.phase != "send" or _not_sent(err))
+
+
+def _not_sent(err):
+    """Return if the error of the SMS request says the SMS was not sent."""
+    if isinstance(err, (YesssSMS.SessionExpiredError, YesssSMS.TokenRejectedError)):
+        # the provider answered without sending
+        return True
+    return isinstance(err, YesssSMS.ConnectionError) and err.connected is False
+
+
+class RetryBudget:
+    """Retries allowed as a share of the sends, thread safe.
+
+    Every send adds ratio to the budget, every retry takes one from it.
+    The budget starts with and holds up to `reserve` retries.
+    """
+
+    def __init__(self, ratio=0.1, reserve=10):
+        """Initialize a full RetryBudget."""
+        if ratio < 0 or reserve < 0:
+            raise ValueError("YesssSMS: ratio and reserve must not be negative")
+        self.ratio = ratio
+        self.reserve = reserve
+        self._balance = float(reserve)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        """Add the share of a send."""
+        with self._lock:
+            self._balance = min(self.reserve, self._balance + self.ratio)
+
+    def withdraw(self):
+        """Take a retry from the budget, return if there was one."""
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class RetryPolicy:
+    """Retries of transient errors with jittered exponential backoff.
+
+    A send is tried up to max_attempts times. The retry after attempt n
+    waits random() * min(max_delay, base_delay * 2 ** (n - 1)) seconds.
+    Without budget the retries are not limited, but by max_attempts.
+    classify(err) returns if err is retried, is_transient by default;
+    after_send retries errors of the SMS request too, see is_transient.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        max_attempts=3,
+        base_delay=0.5,
+        max_delay=30.0,
+        budget=None,
+        *,
+        after_send=False,
+        classify=None,
+        sleep=time.sleep,
+        rand=random.random,
+    ):
+        """Initialize RetryPolicy."""
+        # pylint: disable=too-many-arguments
+        if max_attempts < 1:
+            raise ValueError("YesssSMS: max_attempts must be at least 1")
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        if classify is None:
+            classify = partial(is_transient, after_send=after_send)
+        self._classify = classify
+        self._sleep = sleep
+        self._rand = rand
+
+    def delay(self, attempt):
+        """Return the seconds to wait before the retry after attempt."""
+        return self._rand() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def _retry_delay(self, err, attempt, deadline):
+        """Return the delay of the retry after err, None to give up."""
+        if attempt >= self.max_attempts or not self._classify(err):
+            return None
+        delay = self.delay(attempt)
+        remaining = None if deadline is None else deadline.remaining()
+        if remaining is not None and remaining <= delay:
+            return None
+        if self.budget is not None and not self.budget.withdraw():
+            return None
+        return delay
+
+    def call(self, func, *args, deadline=None):
+        """Call func(*args) until it succeeds or fails for good, return attempts.
+
+        The error of the last attempt is raised, with an `attempts` attribute.
+        Errors other than those of YesssSMS (ValueError, RuntimeError,
+        OSError) are raised at once.
+        Retries are given up if the Deadline deadline would pass waiting.
+        """
+        if self.budget is not None:
+            self.budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                func(*args)
+                return attempt
+            except (ValueError, RuntimeError, OSError) as err:
+                delay = self._retry_delay(err, attempt, deadline)
+                if delay is None:
+                    err.attempts = attempt
+                    raise
+            self._sleep(delay)
+            attempt += 1
+
+    async def call_async(self, func, *args, deadline=None):
+        """Await func(*args) until it succeeds or fails for good, like call()."""
+        if self.budget is not None:
+            self.budget.deposit()
+        attempt = 1
+        while True:
+            try:
+                await func(*args)
+                return attempt
+            except (ValueError, RuntimeError, OSError) as err:
+                delay = self._retry_delay(err, attempt, deadline)
+                if delay is None:
+                    err.attempts = attempt
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
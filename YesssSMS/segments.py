@@ -0,0 +1,151 @@
+"""SMS segments of a message, and a packer to send fewer of them.
+
+A single SMS holds 160 GSM-7 septets or 70 UCS-2 characters. Longer
+messages are split into segments behind a concatenation header, which
+leaves 153 septets or 67 characters each. Characters of the GSM-7
+extension table take two septets, one character outside GSM-7 makes the
+whole message UCS-2:
+
+segments("x" * 161).count  # 2
+pack(message, max_segments=1)  # shortened to a single SMS
+"""
+import re
+from dataclasses import dataclass
+
+from YesssSMS.charset import GSM7_EXTENSION, TRANSLITERATIONS, is_gsm7
+
+SINGLE = {"gsm7": 160, "ucs2": 70}
+CONCATENATED = {"gsm7": 153, "ucs2": 67}
+ELLIPSIS = "..."
+
+# shorter words for alerts, replaced at word boundaries
+ABBREVIATIONS = {
+    "Critical": "Crit",
+    "critical": "crit",
+    "Warning": "Warn",
+    "warning": "warn",
+    "Error": "Err",
+    "error": "err",
+    "Information": "Info",
+    "information": "info",
+    "Database": "DB",
+    "database": "DB",
+    "Server": "Srv",
+    "server": "srv",
+    "message": "msg",
+    "minutes": "min",
+    "seconds": "s",
+    "hours": "h",
+    "please": "pls",
+    "Warnung": "Warn.",
+    "Minuten": "Min.",
+    "Sekunden": "Sek.",
+    "Stunden": "Std.",
+    "zum Beispiel": "z.B.",
+}
+
+_GSM7_TRANSLITERATIONS = str.maketrans(TRANSLITERATIONS)
+
+
+@dataclass
+class Segments:
+    """SMS needed for a message.
+
+    encoding is "gsm7" or "ucs2", count the number of SMS, units the
+    septets or UCS-2 characters of the message and free the units left
+    in the last SMS.
+    """
+
+    encoding: str
+    count: int
+    units: int
+    free: int
+
+
+def segments(message):
+    """Return the Segments of message."""
+    encoding = "gsm7" if is_gsm7(message) else "ucs2"
+    if encoding == "gsm7":
+        units = [2 if char in GSM7_EXTENSION else 1 for char in message]
+    else:
+        # characters above U+FFFF take two UTF-16 units
+        units = [2 if char > "\uffff" else 1 for char in message]
+    total = sum(units)
+    if total <= SINGLE[encoding]:
+        return Segments(encoding, 1 if message else 0, total, SINGLE[encoding] - total)
+    size = CONCATENATED[encoding]
+    if total == len(units):
+        count = -(-total // size)
+        return Segments(encoding, count, total, count * size - total)
+    # an escaped character is not split across segments
+    count, used = 1, 0
+    for unit in units:
+        if used + unit > size:
+            count, used = count + 1, 0
+        used += unit
+    return Segments(encoding, count, total, size - used)
+
+
+def _compact(message):
+    """Return message without repeated blanks and empty lines."""
+    message = re.sub(r"[ \t]+", " ", message)
+    return re.sub(r" ?\n\s*", "\n", message).strip()
+
+
+def _abbreviate(message, abbreviations):
+    """Return message with the words of abbreviations replaced."""
+    if not abbreviations:
+        return message
+    words = sorted(abbreviations, key=len, reverse=True)
+    pattern = r"\b(?:" + "|".join(map(re.escape, words)) + r")\b"
+    return re.sub(pattern, lambda match: abbreviations[match.group(0)], message)
+
+
+def _gsm7(message):
+    """Return message transliterated to GSM-7, or message if it can not be."""
+    transliterated = message.translate(_GSM7_TRANSLITERATIONS)
+    return transliterated if is_gsm7(transliterated) else message
+
+
+def _truncate(message, max_segments, suffix=""):
+    """Return the longest start of message, cut after a word, that fits."""
+    low, high = 0, len(message)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if segments(message[:middle] + ELLIPSIS + suffix).count <= max_segments:
+            low = middle
+        else:
+            high = middle - 1
+    start = message[:low]
+    if low < len(message) and not message[low].isspace():
+        # do not cut in a word, unless it is the only one
+        words = start.rsplit(None, 1)
+        start = words[0] if len(words) > 1 else start
+    return start.rstrip(" \n,;:-") + ELLIPSIS + suffix
+
+
+def pack(message, max_segments=1, abbreviations=None, suffix=""):
+    """Return message shortened to at most max_segments SMS.
+
+    Only as much as needed is done, in this order: blanks and empty lines
+    are compacted, the words of abbreviations (default: ABBREVIATIONS, {}
+    for none) are abbreviated, characters that make the message UCS-2 are
+    transliterated to GSM-7 (if all of them have a replacement) and the
+    message is cut after a word, with "...". suffix, e.g. a summary, is
+    appended and never cut.
+    """
+    if max_segments < 1:
+        raise ValueError("YesssSMS: max_segments must be at least 1")
+    if abbreviations is None:
+        abbreviations = ABBREVIATIONS
+    for shorten in (
+        _compact,
+        lambda text: _abbreviate(text, abbreviations),
+        _gsm7,
+    ):
+        if segments(message + suffix).count <= max_segments:
+            return message + suffix
+        message = shorten(message)
+    if segments(message + suffix).count <= max_segments:
+        return message + suffix
+    return _truncate(message, max_segments, suffix)
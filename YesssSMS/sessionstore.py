@@ -0,0 +1,97 @@
+"""Provider sessions kept on disk, to resume them in the next process.
+
+A SessionStore saves the Kontomanager cookies of a session after its
+login. Short lived processes (the CLI, cron jobs) restore them and send
+without logging in again:
+
+sms.set_session_store()  # ~/.cache/yessssms/sessions.json
+sms.send(recipient, message)
+
+Sessions older than max_age seconds are not restored. A restored session
+that expired anyway is noticed by the first request, the SMS form, and
+the SMS is sent after a login, like with any expired session. The file is
+readable by the user only and locked with flock while it is used.
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+from os.path import expanduser
+
+import requests
+
+from YesssSMS.const import SESSION_STORE_PATH
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+_COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "expires")
+
+
+@contextmanager
+def locked_json(path):
+    """Yield the dict of a JSON file locked with flock, written back after the block.
+
+    The file is readable by the user only, a damaged file is started over.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+    os.fchmod(fd, 0o600)
+    with os.fdopen(fd, "r+", encoding="utf-8") as store:
+        fcntl.flock(store, fcntl.LOCK_EX)
+        try:
+            data = json.loads(store.read() or "{}")
+        except ValueError:
+            data = {}
+        before = json.dumps(data, sort_keys=True)
+        yield data
+        if json.dumps(data, sort_keys=True) != before:
+            store.seek(0)
+            store.truncate()
+            json.dump(data, store)
+            store.flush()
+
+
+class SessionStore:
+    """Cookies of provider sessions, per account, in a JSON file."""
+
+    def __init__(self, path=SESSION_STORE_PATH, max_age=1800):
+        """Initialize a SessionStore at path."""
+        if fcntl is None:
+            raise NotImplementedError("SessionStore needs fcntl (POSIX)")
+        self.path = expanduser(path)
+        self.max_age = max_age
+        os.makedirs(os.path.dirname(self.path) or ".", mode=0o700, exist_ok=True)
+
+    def _locked(self):
+        """Yield the sessions of the file, written back after the block."""
+        # the cookies log in to the account, keep them private
+        return locked_json(self.path)
+
+    def restore(self, key, cookies):
+        """Add the saved cookies of key to the cookie jar, return if there were."""
+        with self._locked() as sessions:
+            saved = sessions.get(key)
+        if saved is None or time.time() - saved["saved"] > self.max_age:
+            return False
+        for cookie in saved["cookies"]:
+            cookies.set_cookie(requests.cookies.create_cookie(**cookie))
+        return True
+
+    def save(self, key, cookies):
+        """Save the cookies of the cookie jar for key."""
+        saved = {
+            "saved": time.time(),
+            "cookies": [
+                {field: getattr(cookie, field) for field in _COOKIE_FIELDS}
+                for cookie in cookies
+            ],
+        }
+        with self._locked() as sessions:
+            sessions[key] = saved
+
+    def delete(self, key):
+        """Forget the session of key."""
+        with self._locked() as sessions:
+            sessions.pop(key, None)
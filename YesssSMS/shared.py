@@ -0,0 +1,134 @@
+"""SharedYesssSMS, one YesssSMS for many threads."""
+import queue
+from contextlib import contextmanager
+
+import requests
+
+from YesssSMS.adaptive import FixedLimit, Gate
+from YesssSMS.api import YesssSMS
+
+
+class SharedYesssSMS(YesssSMS):
+    """YesssSMS backed by a pool of logged in sessions, safe to use from threads.
+
+    Every send() checks out one of `size` sessions, sends with it and puts
+    it back, logged in for the next send. If all sessions are busy, send()
+    waits up to `pool_timeout` seconds for one instead of logging in again,
+    then raises PoolTimeoutError. All sessions share one connection pool of
+    `size` connections. With `concurrency`, a number or an
+    adaptive.AIMDLimit up to size, fewer sends run at once.
+
+    sms = SharedYesssSMS(login, passwd, size=4)
+    sms.login()  # optional, else sessions login with their first send
+    ...
+    sms.close()
+    """
+
+    class PoolTimeoutError(YesssSMS.SMSSendingError):
+        """no session of the pool became free in time."""
+
+    def __init__(self, *args, size=4, pool_timeout=30, concurrency=None, **kwargs):
+        """Initialize SharedYesssSMS, see YesssSMS for the arguments."""
+        if size < 1:
+            raise ValueError("YesssSMS: size must be at least 1")
+        if isinstance(concurrency, int):
+            concurrency = FixedLimit(concurrency)
+        if concurrency is not None and concurrency.maximum > size:
+            raise ValueError("YesssSMS: concurrency must not exceed size")
+        super().__init__(*args, **kwargs)
+        self._gate = None if concurrency is None else Gate(concurrency)
+        self._pool_timeout = pool_timeout
+        self._adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=size, pool_block=True
+        )
+        # last in, first out: the most recently used session is still logged in
+        self._pool = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self.session())
+
+    def __enter__(self):
+        """Enter the context, return SharedYesssSMS."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Logout all sessions."""
+        self.close()
+
+    def _http_session(self):
+        """Return a requests session using the shared connection pool."""
+        session = requests.Session()
+        session.mount("https://", self._adapter)
+        session.mount("http://", self._adapter)
+        return session
+
+    def _checkout(self, deadline=None):
+        """Return a session of the pool, wait up to pool_timeout for it.
+
+        With a Deadline, waits no longer than what is left of it.
+        """
+        timeout = self._pool_timeout
+        remaining = None if deadline is None else deadline.remaining()
+        if remaining is not None and (timeout is None or remaining < timeout):
+            timeout = max(0.0, remaining)
+            error = self.TimeoutError("YesssSMS: deadline passed waiting for a session")
+        else:
+            error = self.PoolTimeoutError("YesssSMS: no free session in the pool")
+        try:
+            return self._pool.get(timeout=timeout)
+        except queue.Empty:
+            raise error from None
+
+    @contextmanager
+    def _borrow_session(self, deadline=None):
+        """Check out a session of the pool, put it back afterwards."""
+        sess = self._checkout(deadline)
+        try:
+            yield sess
+        finally:
+            self._pool.put(sess)
+
+    @contextmanager
+    def _borrow_all_sessions(self):
+        """Check out all sessions of the pool, put them back afterwards."""
+        sessions = []
+        try:
+            for _ in range(self.size()):
+                sessions.append(self._checkout())
+            yield sessions
+        finally:
+            for sess in sessions:
+                self._pool.put(sess)
+
+    def send(self, recipient, message, deadline=None, transliterate=False):
+        """Send an SMS with a session of the pool, within deadline seconds."""
+        if self._gate is None:
+            return super().send(recipient, message, deadline, transliterate)
+        message, changes = self._transliterate(message, transliterate)
+        deadline = self._deadline(deadline)
+        with self._gate.slot(deadline.remaining()) as sample, self._borrow_session(
+            deadline
+        ) as sess:
+            sample.cold = not sess.is_logged_in()
+            self._retrying(sess.send, recipient, message, deadline)
+        return changes
+
+    def concurrency_limit(self):
+        """Return the current limit of concurrent sends."""
+        return self.size() if self._gate is None else self._gate.limit.limit
+
+    def size(self):
+        """Return the number of sessions in the pool."""
+        return self._pool.maxsize
+
+    def login(self):
+        """Login all sessions of the pool that are not logged in."""
+        with self._borrow_all_sessions() as sessions:
+            for sess in sessions:
+                if not sess.is_logged_in():
+                    sess.login()
+
+    def close(self):
+        """Logout all sessions of the pool, waits for running sends."""
+        with self._borrow_all_sessions() as sessions:
+            for sess in sessions:
+                sess.close()
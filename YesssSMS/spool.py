@@ -0,0 +1,271 @@
+"""Spool, a durable outbound SMS queue in SQLite, and SpoolWorker sending it.
+
+Producers only write to the spool, a worker (`yessssms --daemon`) sends:
+
+spool = Spool("~/.local/share/yessssms/spool.db")
+spool.enqueue(recipient, message)
+
+The spool uses WAL mode with synchronous=NORMAL: enqueue() is one
+INSERT without an fsync and survives crashes of the application, the
+last transactions might be lost on a power failure. Sending is at least
+once, an SMS sent right before a crash of the worker is sent again.
+"""
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from os import makedirs
+from os.path import abspath, dirname, expanduser
+
+from YesssSMS.api import YesssSMS
+from YesssSMS.const import SPOOL_PATH
+from YesssSMS.retry import is_transient
+
+QUEUED = "queued"
+SENDING = "sending"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    message TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created REAL NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt);
+"""
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Spool:
+    """Durable queue of outbound SMS in a SQLite database, safe to use from threads.
+
+    SMS are queued, claimed by a worker (status sending) and deleted when
+    they are sent, or stay in the spool with status failed.
+    """
+
+    def __init__(self, path=SPOOL_PATH, timeout=30):
+        """Open or create the spool at path."""
+        if path != ":memory:":
+            path = abspath(expanduser(path))
+            makedirs(dirname(path), exist_ok=True)
+        # transactions are started explicitly, single statements autocommit
+        self._db = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(_SCHEMA)
+
+    def __enter__(self):
+        """Enter the context, return the spool."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Close the spool."""
+        self.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Run the block in one write transaction, yield the connection."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def enqueue(self, recipient, message, delay=0):
+        """Queue an SMS, return its id.
+
+        Raises the errors of YesssSMS.send() for a missing recipient or an
+        empty message, nothing is sent here.
+        """
+        if not recipient:
+            raise YesssSMS.NoRecipientError("YesssSMS: recipient number missing")
+        if not isinstance(recipient, str):
+            raise ValueError("YesssSMS: str expected as recipient number")
+        if not message:
+            raise YesssSMS.EmptyMessageError("YesssSMS: message is empty")
+        now = time.time()
+        with self._lock:
+            return self._db.execute(
+                "INSERT INTO outbox (recipient, message, next_attempt, created)"
+                " VALUES (?, ?, ?, ?)",
+                (recipient, message, now + delay, now),
+            ).lastrowid
+
+    def claim(self, limit):
+        """Mark up to limit due SMS as sending, return them.
+
+        Returns a list of (id, recipient, message, attempts) tuples.
+        """
+        with self._transaction() as db:
+            rows = db.execute(
+                "SELECT id, recipient, message, attempts FROM outbox"
+                " WHERE status = ? AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (QUEUED, time.time(), limit),
+            ).fetchall()
+            db.executemany(
+                "UPDATE outbox SET status = ? WHERE id = ?",
+                [(SENDING, row[0]) for row in rows],
+            )
+        return rows
+
+    def finish(self, sent=(), failed=(), retry=(), release=()):
+        """Store the outcome of claimed SMS, in one transaction.
+
+        sent: ids of sent SMS, they are deleted
+        failed: (id, error) of SMS that will not be sent
+        retry: (id, error, delay) of SMS to send again after delay seconds
+        release: (id, delay) of SMS that were not tried
+        """
+        now = time.time()
+        with self._transaction() as db:
+            db.executemany(
+                "DELETE FROM outbox WHERE id = ?", [(row_id,) for row_id in sent]
+            )
+            db.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, error = ?"
+                " WHERE id = ?",
+                [(FAILED, str(error), row_id) for row_id, error in failed],
+            )
+            db.executemany(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, error = ?,"
+                " next_attempt = ? WHERE id = ?",
+                [
+                    (QUEUED, str(error), now + delay, row_id)
+                    for row_id, error, delay in retry
+                ],
+            )
+            db.executemany(
+                "UPDATE outbox SET status = ?, next_attempt = ? WHERE id = ?",
+                [(QUEUED, now + delay, row_id) for row_id, delay in release],
+            )
+
+    def recover(self):
+        """Queue SMS again that were claimed by a stopped worker, return their number.
+
+        Only call this while no worker is running on the spool.
+        """
+        with self._lock:
+            return self._db.execute(
+                "UPDATE outbox SET status = ? WHERE status = ?", (QUEUED, SENDING)
+            ).rowcount
+
+    def stats(self):
+        """Return the number of SMS by status."""
+        with self._lock:
+            return dict(
+                self._db.execute(
+                    "SELECT status, COUNT(*) FROM outbox GROUP BY status"
+                ).fetchall()
+            )
+
+    def failed(self):
+        """Return (id, recipient, message, attempts, error) of failed SMS."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT id, recipient, message, attempts, error FROM outbox"
+                " WHERE status = ? ORDER BY id",
+                (FAILED,),
+            ).fetchall()
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+
+class SpoolWorker:
+    """Send the SMS of a Spool with one persistent, logged in session.
+
+    Claims batches of due SMS, sends them and stores the outcome of a
+    batch in one transaction. Transient errors, see retry.is_transient,
+    are retried with exponential backoff up to max_attempts. Other errors
+    fail at once, like those of the request sending the SMS: it might
+    have been sent. After a login error the worker waits login_retry_delay seconds,
+    to not lock the account with failed logins.
+
+    worker = SpoolWorker(YesssSMS(login, passwd), Spool())
+    worker.run(stop_event)
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        sms,
+        spool,
+        *,
+        batch_size=20,
+        poll_interval=1.0,
+        max_attempts=5,
+        retry_delay=30,
+        login_retry_delay=600,
+    ):
+        """Initialize SpoolWorker, sending the SMS of spool with sms."""
+        # pylint: disable=too-many-arguments
+        self._sms = sms
+        self._spool = spool
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._max_attempts = max_attempts
+        self._retry_delay = retry_delay
+        self._login_retry_delay = login_retry_delay
+
+    def run(self, stop=None):
+        """Send SMS of the spool until the threading.Event stop is set."""
+        stop = stop or threading.Event()
+        recovered = self._spool.recover()
+        if recovered:
+            _LOGGER.info("queued %d SMS of a stopped worker again", recovered)
+        with self._sms.session() as sess:
+            while not stop.is_set():
+                try:
+                    if not self.run_once(sess):
+                        stop.wait(self._poll_interval)
+                except self._sms.LoginError as err:
+                    _LOGGER.error("login failed, waiting: %s", err)
+                    stop.wait(self._login_retry_delay)
+
+    def run_once(self, sess):
+        """Send one batch of due SMS with the SMSSession sess, return its size."""
+        rows = self._spool.claim(self._batch_size)
+        if not rows:
+            return 0
+        sent, failed, retry, release = [], [], [], []
+        try:
+            for index, (row_id, recipient, message, attempts) in enumerate(rows):
+                try:
+                    sess.send(recipient, message)
+                except self._sms.LoginError:
+                    # not tried, send them when the login works again
+                    delay = self._login_retry_delay
+                    release = [(row[0], delay) for row in rows[index:]]
+                    raise
+                except ValueError as err:
+                    failed.append((row_id, err))
+                except (self._sms.SMSSendingError, self._sms.ConnectionError) as err:
+                    if not is_transient(err) or attempts + 1 >= self._max_attempts:
+                        failed.append((row_id, err))
+                    else:
+                        retry.append((row_id, err, self._retry_delay * 2**attempts))
+                else:
+                    sent.append(row_id)
+        finally:
+            # SMS claimed but not tried when interrupted are queued by recover()
+            self._spool.finish(sent, failed, retry, release)
+        for row_id, error in failed:
+            _LOGGER.error("SMS %d failed: %s", row_id, error)
+        return len(rows)
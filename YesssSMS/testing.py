@@ -0,0 +1,463 @@
+"""Local stand-in for the Kontomanager website, for tests and benchmarks.
+
+KontomanagerServer is a real HTTP server on localhost, it answers like the
+provider's login, customer data, SMS form and SMS sending pages. Use its
+provider_urls() as custom_provider:
+
+with KontomanagerServer(login="06641234567", passwd="secret") as server:
+    sms = YesssSMS("06641234567", "secret", custom_provider=server.provider_urls())
+    sms.send("06501234567", "hello")
+    assert server.sent == [("06501234567", "hello")]
+
+Run it standalone with: python -m YesssSMS.testing --help
+"""
+import argparse
+import random
+import secrets
+import threading
+import time
+from collections import Counter
+from contextlib import suppress
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from YesssSMS.const import (
+    _LOGIN_ERROR_STRING,
+    _LOGIN_LOCKED_MESS,
+    _SMS_SENDING_SUCCESSFUL_STRING,
+    _UNSUPPORTED_CHARS_STRING,
+)
+from YesssSMS.ratelimit import TokenBucket
+
+SESSION_COOKIE = "PHPSESSID"
+LOGIN_PAGE = (
+    "<html><body><form action='index.php' method='post'>{error}"
+    "<input type='text' name='login_rufnummer'>"
+    "<input type='password' name='login_passwort'></form></body></html>"
+)
+LOGIN_ERROR = "<div class='alert'>" + _LOGIN_ERROR_STRING + "</strong> {locked}</div>"
+CUSTOMER_PAGE = "<html><body><a href='kundendaten.php'>{login}</a></body></html>"
+SMS_FORM = (
+    "<form action='websms_send.php' name='sms' id='smsform' method='post'"
+    " onSubmit=\"return validate()\">"
+    '<input type="hidden" name="token" value="{token}">'
+    "<div class='form-group'><textarea name='nachricht'></textarea></div></form>"
+)
+SMS_PAGE = "<html><body>{notice}" + SMS_FORM + "</body></html>"
+SENT_NOTICE = "<div class='alert'" + _SMS_SENDING_SUCCESSFUL_STRING + "/div>"
+UNSUPPORTED_NOTICE = (
+    "<div class='alert'>" + _UNSUPPORTED_CHARS_STRING + " {chars}</div>"
+)
+ERROR_NOTICE = "<div class='alert'>Fehler: {error}</div>"
+SEND_REQUEST = "POST /websms_send.php"
+
+
+def default_char_supported(char):
+    """Return if the stand-in accepts char: Latin letters and the euro sign."""
+    return ord(char) < 0x250 or char == "€"
+
+
+class _Session:
+    """A logged in session of the stand-in."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, login):
+        self.login = login
+        self.token = None
+        self.created = time.monotonic()
+
+
+class KontomanagerServer:
+    """Kontomanager lookalike HTTP server, runs in a background thread.
+
+    login, passwd: the only accepted credentials.
+    latency: seconds every response is delayed, or a callable returning them.
+    error_rate: share of requests answered with HTTP 500, 0 to 1.
+    session_lifetime: seconds until a session expires, None for never.
+    max_failed_logins, lockout_time: failed logins in a row until the
+        account is locked, and for how many seconds.
+    char_supported: callable, returns if a character of a SMS is accepted.
+    throttle: (rate, burst), SMS beyond a token bucket of rate SMS per
+        second and burst SMS are rejected with HTTP 429.
+    capacity: SMS sent at once without trouble, more are answered with
+        HTTP 503, like an overloaded provider.
+
+    Sent SMS are in `sent`, the number of requests per "METHOD /path" in
+    `requests`. The statistics are reset with reset().
+    """
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+
+    def __init__(
+        self,
+        login="06641234567",
+        passwd="secret",
+        *,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        error_rate=0.0,
+        session_lifetime=None,
+        max_failed_logins=3,
+        lockout_time=3600,
+        char_supported=default_char_supported,
+        throttle=None,
+        capacity=None,
+        seed=None,
+    ):
+        """Initialize the server, start it with start()."""
+        self.login = login
+        self.passwd = passwd
+        self.latency = latency
+        self.error_rate = error_rate
+        self.session_lifetime = session_lifetime
+        self.max_failed_logins = max_failed_logins
+        self.lockout_time = lockout_time
+        self.char_supported = char_supported
+        self.throttle = TokenBucket(*throttle) if throttle else None
+        self.capacity = capacity
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._failed_logins = 0
+        self._locked_until = 0.0
+        self._injected_errors = []
+        self._in_flight = 0
+        self._sending = 0
+        self.sent = []
+        self.requests = Counter()
+        self.max_in_flight = 0
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.kontomanager = self
+        self._thread = None
+
+    def __enter__(self):
+        """Start the server."""
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop the server."""
+        self.stop()
+
+    @property
+    def url(self):
+        """Return the base URL of the server."""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def provider_urls(self):
+        """Return the URLs of the server, to use as custom_provider."""
+        return {
+            "LOGIN_URL": f"{self.url}/index.php",
+            "LOGOUT_URL": f"{self.url}/index.php?dologout=2",
+            "KONTOMANAGER_URL": f"{self.url}/kundendaten.php",
+            "WEBSMS_FORM_URL": f"{self.url}/websms.php",
+            "SEND_SMS_URL": f"{self.url}/websms_send.php",
+        }
+
+    def start(self):
+        """Serve in a background thread."""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self._thread.start()
+
+    def serve_forever(self):
+        """Serve in the current thread, until shutdown."""
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def reset(self):
+        """Reset the statistics and the failed logins."""
+        with self._lock:
+            self.sent = []
+            self.requests = Counter()
+            self.max_in_flight = 0
+            self._failed_logins = 0
+            self._locked_until = 0.0
+
+    def expire_sessions(self):
+        """Expire all sessions, like the provider does after a while."""
+        with self._lock:
+            self._sessions.clear()
+
+    def inject_errors(self, count=1, status=HTTPStatus.INTERNAL_SERVER_ERROR):
+        """Answer the next count requests with status."""
+        with self._lock:
+            self._injected_errors.extend([status] * count)
+
+    def _delay(self):
+        latency = self.latency() if callable(self.latency) else self.latency
+        if latency > 0:
+            time.sleep(latency)
+
+    def _error_status(self, name):
+        with self._lock:
+            if self._injected_errors:
+                return self._injected_errors.pop(0)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return HTTPStatus.INTERNAL_SERVER_ERROR
+            if (
+                self.capacity is not None
+                and name == SEND_REQUEST
+                and self._sending > self.capacity
+            ):
+                return HTTPStatus.SERVICE_UNAVAILABLE
+        return None
+
+    def _session(self, session_id):
+        """Return the session, None if it is unknown or expired."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if (
+                session is not None
+                and self.session_lifetime is not None
+                and time.monotonic() - session.created > self.session_lifetime
+            ):
+                del self._sessions[session_id]
+                session = None
+            return session
+
+    def _new_token(self, session):
+        with self._lock:
+            session.token = secrets.token_hex(32)
+            return session.token
+
+    def _login(self, login, passwd):
+        """Return (session_id, None) or (None, error page)."""
+        with self._lock:
+            if time.monotonic() < self._locked_until:
+                return None, LOGIN_ERROR.format(locked=_LOGIN_LOCKED_MESS)
+            if (login, passwd) != (self.login, self.passwd):
+                self._failed_logins += 1
+                locked = ""
+                if self._failed_logins >= self.max_failed_logins:
+                    self._locked_until = time.monotonic() + self.lockout_time
+                    locked = _LOGIN_LOCKED_MESS
+                return None, LOGIN_ERROR.format(locked=locked)
+            self._failed_logins = 0
+            session_id = secrets.token_hex(16)
+            self._sessions[session_id] = _Session(login)
+            return session_id, None
+
+    def _logout(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _begin(self, name):
+        """Count a request, it is in flight until _end()."""
+        with self._lock:
+            self.requests[name] += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            if name == SEND_REQUEST:
+                self._sending += 1
+
+    def _end(self, name):
+        with self._lock:
+            self._in_flight -= 1
+            if name == SEND_REQUEST:
+                self._sending -= 1
+
+    def _record_sent(self, recipient, message):
+        with self._lock:
+            self.sent.append((recipient, message))
+
+
+class _Server(ThreadingHTTPServer):
+    """HTTP server of KontomanagerServer."""
+
+    daemon_threads = True
+    # many clients connect at once in benchmarks
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler of KontomanagerServer."""
+
+    # the handler works with the state of its KontomanagerServer
+    # pylint: disable=protected-access
+
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, don't wait for ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        """Don't log requests."""
+
+    @property
+    def server_state(self):
+        """Return the KontomanagerServer."""
+        return self.server.kontomanager
+
+    def _respond(self, status=HTTPStatus.OK, body="", headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _redirect(self, location, headers=None):
+        headers = {"Location": location, **(headers or {})}
+        self._respond(HTTPStatus.FOUND, headers=headers)
+
+    def _session_id(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return cookie[SESSION_COOKIE].value if SESSION_COOKIE in cookie else None
+
+    def _form_data(self):
+        length = int(self.headers.get("Content-Length", 0))
+        data = parse_qs(self.rfile.read(length).decode("utf-8"), keep_blank_values=True)
+        return {key: values[0] for key, values in data.items()}
+
+    def _handle(self, method):
+        state = self.server_state
+        url = urlsplit(self.path)
+        form = self._form_data() if method == "POST" else {}
+        name = f"{method} {url.path}"
+        state._begin(name)
+        try:
+            self._dispatch(method, url, form)
+        finally:
+            state._end(name)
+
+    def _dispatch(self, method, url, form):
+        state = self.server_state
+        state._delay()
+        status = state._error_status(f"{method} {url.path}")
+        if status is not None:
+            self._respond(status, "<html><body>Fehler</body></html>")
+            return
+        handler = {
+            ("POST", "/index.php"): self._post_login,
+            ("GET", "/index.php"): self._get_login,
+            ("GET", "/kundendaten.php"): self._get_customer,
+            ("GET", "/websms.php"): self._get_sms_form,
+            ("POST", "/websms_send.php"): self._post_sms,
+        }.get((method, url.path))
+        if handler is None:
+            self._respond(HTTPStatus.NOT_FOUND, "not found")
+            return
+        handler(parse_qs(url.query), form)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """Handle GET requests."""
+        self._handle("GET")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """Handle POST requests."""
+        self._handle("POST")
+
+    def _post_login(self, _, form):
+        session_id, error = self.server_state._login(
+            form.get("login_rufnummer"), form.get("login_passwort")
+        )
+        if error:
+            self._respond(body=LOGIN_PAGE.format(error=error))
+            return
+        self._redirect(
+            "kundendaten.php",
+            {"Set-Cookie": f"{SESSION_COOKIE}={session_id}; path=/; HttpOnly"},
+        )
+
+    def _get_login(self, query, _):
+        if "dologout" in query:
+            self.server_state._logout(self._session_id())
+        self._respond(body=LOGIN_PAGE.format(error=""))
+
+    def _get_customer(self, *_):
+        session = self.server_state._session(self._session_id())
+        if session is None:
+            self._redirect("index.php")
+            return
+        self._respond(body=CUSTOMER_PAGE.format(login=session.login))
+
+    def _get_sms_form(self, *_):
+        session = self.server_state._session(self._session_id())
+        if session is None:
+            self._redirect("index.php")
+            return
+        token = self.server_state._new_token(session)
+        self._respond(body=SMS_PAGE.format(notice="", token=token))
+
+    def _post_sms(self, _, form):
+        state = self.server_state
+        session = state._session(self._session_id())
+        if session is None:
+            self._redirect("index.php")
+            return
+        message = form.get("nachricht", "")
+        unsupported = sorted(
+            {char for char in message if not state.char_supported(char)}
+        )
+        status = HTTPStatus.OK
+        if not session.token or form.get("token") != session.token:
+            notice = ERROR_NOTICE.format(error="Formular abgelaufen")
+        elif unsupported:
+            notice = UNSUPPORTED_NOTICE.format(chars=" ".join(unsupported))
+        elif not form.get("to_nummer"):
+            notice = ERROR_NOTICE.format(error="Empfänger fehlt")
+        elif state.throttle and not state.throttle.try_acquire():
+            notice = ERROR_NOTICE.format(error="zu viele SMS, bitte später")
+            status = HTTPStatus.TOO_MANY_REQUESTS
+        else:
+            notice = SENT_NOTICE
+            state._record_sent(form["to_nummer"], message)
+        token = state._new_token(session)
+        self._respond(status, body=SMS_PAGE.format(notice=notice, token=token))
+
+
+def main():
+    """Run a KontomanagerServer until interrupted."""
+    parser = argparse.ArgumentParser(description="Run a local Kontomanager stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--login", default="06641234567")
+    parser.add_argument("--password", default="secret")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--session-lifetime", type=float, default=None, help="seconds")
+    parser.add_argument(
+        "--throttle",
+        type=lambda text: tuple(float(value) for value in text.split(",")),
+        help="RATE,BURST: reject SMS beyond RATE per second",
+    )
+    parser.add_argument(
+        "--capacity", type=int, default=None, help="SMS sent at once, more get 503"
+    )
+    args = parser.parse_args()
+
+    server = KontomanagerServer(
+        login=args.login,
+        passwd=args.password,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        session_lifetime=args.session_lifetime,
+        throttle=args.throttle,
+        capacity=args.capacity,
+    )
+    print(f"serving Kontomanager stand-in at {server.url}/index.php")
+    with suppress(KeyboardInterrupt):
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+"""Version of YesssSMS, read by setup.py and the docs."""
+VERSION = "0.8.1"
@@ -0,0 +1,4 @@
+"""Run the benchmarks of YesssSMS: python -m benchmarks."""
+from benchmarks.suite import main
+
+main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Compare the CSRF token extraction of YesssSMS.csrf with BeautifulSoup.
+
+run: python -m benchmarks.csrf_token [--number N]
+"""
+import argparse
+import timeit
+
+from YesssSMS.const import TEST_FORM_TOKEN_SAMPLE
+from YesssSMS.csrf import find_token, soup_token
+
+# roughly the size of the Kontomanager SMS page: navigation before the form
+NAVIGATION = "".join(
+    f"<li class='nav-item'><a href='page{i}.php' title=\"Seite {i}\">Seite {i}</a></li>"
+    for i in range(300)
+)
+PAGES = {
+    "form only": TEST_FORM_TOKEN_SAMPLE,
+    "full page": (
+        "<html><head><title>Kontomanager</title></head><body><ul>"
+        + NAVIGATION
+        + "</ul>"
+        + TEST_FORM_TOKEN_SAMPLE
+        + "<textarea name='nachricht'></textarea></div></div></form></body></html>"
+    ),
+}
+
+
+def main():
+    """Run the benchmark and print µs per extraction."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    for name, page in PAGES.items():
+        assert find_token(page) == soup_token(page)
+        results = {}
+        for func in (find_token, soup_token):
+            seconds = min(
+                timeit.repeat(
+                    lambda f=func, p=page: f(p), number=args.number, repeat=5
+                )
+            )
+            results[func.__name__] = seconds / args.number * 1e6
+        print(
+            f"{name} ({len(page)} chars): "
+            + ", ".join(f"{func}: {usec:.1f} µs" for func, usec in results.items())
+            + f", speedup: {results['soup_token'] / results['find_token']:.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Startup time of the yessssms command line tool.
+
+run: python -m benchmarks.startup [--rounds N]
+
+Runs `yessssms --version`, `--print-config-file` and `--check-login`
+(against the local stand-in) in new interpreters, like the console script
+does, and prints the wall time and the number of imported modules.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from YesssSMS.testing import KontomanagerServer
+
+LOGIN = "06641234567"
+PASSWD = "secret"
+
+# what the yessssms console script runs, plus a report of the imports
+CODE = """\
+import sys
+from YesssSMS.CLI import run
+sys.argv = ["yessssms"] + sys.argv[1:]
+run()
+print(len(sys.modules), "requests" in sys.modules, file=sys.stderr)
+"""
+
+CONFIG = """\
+[YESSSSMS]
+LOGIN = {login}
+PASSWD = {passwd}
+
+[YESSSSMS_PROVIDER_URLS]
+LOGIN_URL = {LOGIN_URL}
+LOGOUT_URL = {LOGOUT_URL}
+KONTOMANAGER_URL = {KONTOMANAGER_URL}
+WEBSMS_FORM_URL = {WEBSMS_FORM_URL}
+SEND_SMS_URL = {SEND_SMS_URL}
+"""
+
+
+def run_cli(args):
+    """Run yessssms with args in a new interpreter, return (seconds, stderr)."""
+    env = {k: v for k, v in os.environ.items() if not k.startswith("YESSSSMS_")}
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", CODE] + args,
+        check=True,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return time.perf_counter() - start, proc.stderr
+
+
+def cli_startup(provider_urls, rounds):
+    """Return the wall time in ms and the imports of the CLI paths."""
+    with tempfile.TemporaryDirectory() as directory:
+        config = os.path.join(directory, "yessssms.conf")
+        with open(config, "w", encoding="utf-8") as config_file:
+            config_file.write(CONFIG.format(login=LOGIN, passwd=PASSWD, **provider_urls))
+        paths = {
+            "--version": ["--version"],
+            "--print-config-file": ["--print-config-file"],
+            "--check-login": ["-c", config, "--check-login"],
+        }
+        results = {}
+        for name, args in paths.items():
+            durations, report = [], ""
+            for _ in range(rounds):
+                duration, report = run_cli(args)
+                durations.append(duration * 1000)
+            modules, requests_imported = report.split()
+            results[name] = {
+                "median_ms": statistics.median(durations),
+                "min_ms": min(durations),
+                "modules": int(modules),
+                "imports_requests": requests_imported == "True",
+            }
+    return results
+
+
+def main():
+    """Run the benchmark and print the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    with KontomanagerServer(LOGIN, PASSWD) as server:
+        results = cli_startup(server.provider_urls(), args.rounds)
+    for name, result in results.items():
+        print(
+            f"yessssms {name}: {result['median_ms']:.1f} ms (min "
+            f"{result['min_ms']:.1f} ms), {result['modules']} modules, "
+            f"requests {'imported' if result['imports_requests'] else 'not imported'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
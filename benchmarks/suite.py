@@ -0,0 +1,251 @@
+"""Benchmarks of YesssSMS against the local Kontomanager stand-in.
+
+run: python -m benchmarks [--quick] [--output results.json]
+
+Every benchmark returns a dict, main() prints them and writes all of them
+as JSON, to compare the hot path (_login, _get_csrf_token, _send, _logout)
+between versions.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+
+from YesssSMS import SharedYesssSMS, YesssSMS
+from YesssSMS.const import VERSION
+from YesssSMS.csrf import find_token, soup_token
+from YesssSMS.spool import Spool
+from YesssSMS.testing import KontomanagerServer
+
+from benchmarks.csrf_token import PAGES
+from benchmarks.startup import cli_startup
+
+LOGIN = "06641234567"
+PASSWD = "secret"
+TO = "06501234567"
+LEVELS = (1, 2, 4, 8, 16, 32, 64)
+
+
+def summary(seconds):
+    """Return statistics in milliseconds of a list of durations."""
+    millis = sorted(s * 1000 for s in seconds)
+    return {
+        "n": len(millis),
+        "mean_ms": statistics.mean(millis),
+        "median_ms": statistics.median(millis),
+        "p95_ms": millis[min(len(millis) - 1, int(len(millis) * 0.95))],
+        "min_ms": millis[0],
+        "max_ms": millis[-1],
+    }
+
+
+def timed(func, *args, **kwargs):
+    """Return (duration, result) of func(*args, **kwargs)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def bench_cold_send(server, rounds):
+    """Latency of send(), with login and logout for every SMS."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    return summary([timed(sms.send, TO, "cold")[0] for _ in range(rounds)])
+
+
+def bench_phases(server, rounds):
+    """Latency of every phase of one SMS sent in a new session."""
+    # pylint: disable=protected-access
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    phases = {"login": [], "csrf_token": [], "send": [], "logout": []}
+    for _ in range(rounds):
+        with requests.Session() as session:
+            phases["login"].append(
+                timed(sms._login, session, follow_redirect=False)[0]
+            )
+            duration, token = timed(sms._get_csrf_token, session)
+            phases["csrf_token"].append(duration)
+            phases["send"].append(timed(sms._send, TO, "phase", session, token)[0])
+            phases["logout"].append(timed(sms._logout, session)[0])
+    return {phase: summary(durations) for phase, durations in phases.items()}
+
+
+def bench_warm_session(server, rounds):
+    """Latency of send() of a logged in session."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    with sms.session() as sess:
+        sess.send(TO, "warm up")
+        return summary([timed(sess.send, TO, "warm")[0] for _ in range(rounds)])
+
+
+def bench_csrf_parsing(rounds):
+    """CPU time of the CSRF token extraction."""
+    results = {}
+    for name, page in PAGES.items():
+        for func in (find_token, soup_token):
+            start = time.process_time()
+            for _ in range(rounds):
+                func(page)
+            usec = (time.process_time() - start) / rounds * 1e6
+            results[f"{func.__name__} {name}"] = {"cpu_us": usec}
+    return results
+
+
+def bench_spool_enqueue(rounds):
+    """Latency of Spool.enqueue(), the producer side of the spool."""
+    with tempfile.TemporaryDirectory() as directory:
+        with Spool(f"{directory}/spool.db") as spool:
+            return summary([timed(spool.enqueue, TO, "spool")[0] for _ in range(rounds)])
+
+
+def bench_import(rounds):
+    """Wall time of importing YesssSMS in a new interpreter."""
+    results = {}
+    for name, code in (
+        ("python", "pass"),
+        ("import YesssSMS", "import YesssSMS"),
+        ("import YesssSMS.CLI", "import YesssSMS.CLI"),
+    ):
+        durations = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], check=True)
+            durations.append(time.perf_counter() - start)
+        results[name] = summary(durations)
+    return results
+
+
+def bench_memory(server, in_flight):
+    """Memory allocated per concurrent send, measured with tracemalloc."""
+    provider = server.provider_urls()
+    with SharedYesssSMS(LOGIN, PASSWD, custom_provider=provider, size=in_flight) as sms:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        with ThreadPoolExecutor(max_workers=in_flight) as executor:
+            list(executor.map(lambda _: sms.send(TO, "memory"), range(in_flight)))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return {"in_flight": in_flight, "bytes_per_send": (peak - before) / in_flight}
+
+
+def throughput_sync(server, count, _):
+    """Send count SMS with send_many over one session."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    for result in sms.send_many((TO, f"sync {i}") for i in range(count)):
+        assert result.success, result.error
+
+
+def throughput_threaded(server, count, concurrency):
+    """Send count SMS from concurrency threads with SharedYesssSMS."""
+    sms = SharedYesssSMS(
+        LOGIN, PASSWD, custom_provider=server.provider_urls(), size=concurrency
+    )
+    with sms:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda i: sms.send(TO, f"threaded {i}"), range(count)))
+
+
+def throughput_async(server, count, concurrency):
+    """Send count SMS with AsyncYesssSMS and asyncio.gather."""
+    # pylint: disable=import-outside-toplevel
+    from YesssSMS.aio import AsyncYesssSMS
+
+    async def send_all():
+        async with AsyncYesssSMS(
+            LOGIN,
+            PASSWD,
+            custom_provider=server.provider_urls(),
+            concurrency=concurrency,
+        ) as sms:
+            await asyncio.gather(*(sms.send(TO, f"async {i}") for i in range(count)))
+
+    asyncio.run(send_all())
+
+
+def bench_throughput(server, levels, per_level):
+    """SMS per second of the sync, threaded and async paths."""
+    paths = {"sync": throughput_sync, "threaded": throughput_threaded}
+    if importlib.util.find_spec("aiohttp") is None:
+        print("aiohttp not installed, skipping async benchmarks")
+    else:
+        paths["async"] = throughput_async
+    results = {}
+    for name, func in paths.items():
+        for concurrency in (1,) if name == "sync" else levels:
+            count = max(per_level, 2 * concurrency)
+            server.reset()
+            duration, _ = timed(func, server, count, concurrency)
+            assert len(server.sent) == count
+            results[f"{name} c={concurrency}"] = {
+                "concurrency": concurrency,
+                "sms": count,
+                "sms_per_s": count / duration,
+            }
+    return results
+
+
+def main():
+    """Run the benchmarks, print and save the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="fewer rounds")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.005,
+        help="seconds the stand-in delays every response (default: 0.005)",
+    )
+    parser.add_argument(
+        "--levels",
+        type=lambda text: [int(level) for level in text.split(",")],
+        default=LEVELS,
+        help="concurrency levels, comma separated",
+    )
+    args = parser.parse_args()
+    rounds = 10 if args.quick else 50
+
+    results = {
+        "meta": {
+            "version": VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "latency_s": args.latency,
+        }
+    }
+    with KontomanagerServer(LOGIN, PASSWD, latency=args.latency) as server:
+        benchmarks = {
+            "cold_send": lambda: bench_cold_send(server, rounds),
+            "phases": lambda: bench_phases(server, rounds),
+            "warm_session": lambda: bench_warm_session(server, rounds),
+            "csrf_parsing": lambda: bench_csrf_parsing(rounds),
+            "spool_enqueue": lambda: bench_spool_enqueue(10 * rounds),
+            "import": lambda: bench_import(3 if args.quick else 10),
+            "cli_startup": lambda: cli_startup(
+                server.provider_urls(), 3 if args.quick else 10
+            ),
+            "memory": lambda: bench_memory(server, max(args.levels)),
+            "throughput": lambda: bench_throughput(server, args.levels, 2 * rounds),
+        }
+        for name, bench in benchmarks.items():
+            results[name] = bench()
+            print(f"{name}: {json.dumps(results[name], indent=2)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,7 @@
 # documentation root, use os.path.abspath to make it absolute, like shown here.
 #
 from datetime import datetime
-import json
+import re
 import os
 import sys
 
@@ -26,9 +26,9 @@ copyright = f"{year}, Florian Klien"
 author = "Florian Klien"
 
 # The full version, including alpha/beta/rc tags
-version_file = open("../../YesssSMS/version.json")
+version_file = open("../../YesssSMS/version.py")
 version_info = version_file.read()
-VERSION = json.loads(version_info)["version"]
+VERSION = re.search(r'^VERSION = "(.*)"$', version_info, re.M).group(1)
 
 release = VERSION
 
@@ -1,11 +1,13 @@
 """YesssSMS let's you send SMS via yesss.at's website."""
-import json
+import re
 
 from setuptools import find_packages, setup
 
 DESC = "YesssSMS let's you send SMS via yesss.at's website."
 
-VERSION = json.loads(open("YesssSMS/version.json").read())["version"]
+# not imported, YesssSMS imports its dependencies
+with open("YesssSMS/version.py") as fh:
+    VERSION = re.search(r'^VERSION = "(.*)"$', fh.read(), re.M).group(1)
 
 with open("README.md", "r") as fh:
     LONG_DESC = fh.read()
@@ -32,13 +34,16 @@ setup(
     ],
     platforms="any",
     keywords=["SMS", "Yesss", "messaging"],
-    packages=find_packages(exclude=["contrib", "docs", "tests", "logo"]),
+    packages=find_packages(
+        exclude=["contrib", "docs", "tests", "logo", "benchmarks", "benchmarks.*"]
+    ),
     # List run-time dependencies here.  These will be installed by pip
-    install_requires=["requests", "beautifulsoup4"],
+    install_requires=["requests"],
+    # BeautifulSoup is only a fallback for the CSRF token extraction
+    extras_require={"async": ["aiohttp"], "bs4": ["beautifulsoup4"]},
     python_requires=">=3.8",
     # To provide executable scripts, use entry points in preference to the
     # "scripts" keyword. Entry points provide cross-platform support and allow
     # pip to create the appropriate form of executable for the target platform.
     entry_points={"console_scripts": ["yessssms=YesssSMS.CLI:run"]},
-    package_data={"YesssSMS": ["version.json"]},
 )
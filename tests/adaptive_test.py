@@ -0,0 +1,159 @@
+"""Tests for the adaptive concurrency limit."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from YesssSMS import SharedYesssSMS, YesssSMS
+from YesssSMS.adaptive import AIMDLimit, FixedLimit, Gate, is_overload
+from YesssSMS.aio import AsyncYesssSMS
+
+import pytest
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+
+class FakeClock:
+    """Clock advanced by the test."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        """Start at 100 seconds."""
+        self.now = 100.0
+
+    def __call__(self):
+        """Return the time."""
+        return self.now
+
+
+def test_additive_increase():
+    """Test that a round of successful sends adds about one."""
+    limit = AIMDLimit(initial=2, maximum=4, clock=FakeClock())
+    for _ in range(3):
+        limit.record(limit.now(), 0.1, False)
+    assert limit.limit == 3
+    for _ in range(20):
+        limit.record(limit.now(), 0.1, False)
+    assert limit.limit == 4
+
+
+def test_multiplicative_decrease():
+    """Test that overloads of one round decrease the limit once."""
+    clock = FakeClock()
+    limit = AIMDLimit(initial=8, minimum=2, maximum=8, clock=clock)
+    started = limit.now()
+    clock.now += 1
+    limit.record(started, 1, True)
+    limit.record(started, 1, True)
+    assert limit.limit == 4
+    limit.record(clock.now, 0.1, True)
+    limit.record(clock.now, 0.1, True)
+    assert limit.limit == 2
+
+
+def test_latency_decrease():
+    """Test that slow sends decrease the limit, cold ones do not."""
+    clock = FakeClock()
+    limit = AIMDLimit(initial=4, clock=clock)
+    limit.record(clock.now, 0.1, False)
+    assert limit.baseline_latency == 0.1
+    limit.record(clock.now, 1.0, False, cold=True)
+    assert limit.limit == 4
+    assert limit.baseline_latency == 0.1
+    limit.record(clock.now, 1.0, False)
+    assert limit.limit == 2
+
+
+def test_limit_errors():
+    """Test invalid parameters."""
+    with pytest.raises(ValueError):
+        AIMDLimit(initial=5, maximum=4)
+    with pytest.raises(ValueError):
+        AIMDLimit(decrease=1)
+    with pytest.raises(ValueError):
+        FixedLimit(0)
+    with pytest.raises(ValueError):
+        SharedYesssSMS(LOGIN, PASSWD, size=2, concurrency=AIMDLimit(maximum=4))
+
+
+def test_is_overload():
+    """Test which errors show an overloaded provider."""
+    assert is_overload(YesssSMS.SMSSendingError())
+    assert is_overload(YesssSMS.ConnectionError())
+    assert not is_overload(YesssSMS.SessionExpiredError())
+    assert not is_overload(YesssSMS.EmptyMessageError())
+    assert not is_overload(YesssSMS.LoginError())
+
+
+def test_gate_records():
+    """Test that the gate records overloads and ignores other errors."""
+    clock = FakeClock()
+    gate = Gate(AIMDLimit(initial=4, clock=clock))
+    with pytest.raises(YesssSMS.EmptyMessageError):
+        with gate.slot():
+            raise YesssSMS.EmptyMessageError()
+    assert gate.limit.limit == 4
+    clock.now += 1
+    with pytest.raises(YesssSMS.SMSSendingError):
+        with gate.slot():
+            raise YesssSMS.SMSSendingError()
+    assert gate.limit.limit == 2
+    assert gate.in_flight == 0
+
+
+@pytest.mark.parametrize("server", [{"latency": 0.01, "capacity": 4}], indirect=True)
+def test_async_adapts_to_capacity(server):
+    """Test that the async limit settles around the provider's capacity."""
+    limit = AIMDLimit(initial=1, maximum=16)
+
+    async def send_all(sms):
+        async with sms:
+            return await asyncio.gather(
+                *(sms.send(TO, f"sms {i}") for i in range(60)), return_exceptions=True
+            )
+
+    sms = AsyncYesssSMS(
+        LOGIN, PASSWD, custom_provider=server.provider_urls(), concurrency=limit
+    )
+    results = asyncio.run(send_all(sms))
+    failed = [result for result in results if result is not None]
+    assert all(isinstance(err, YesssSMS.SMSSendingError) for err in failed)
+    assert len(server.sent) + len(failed) == 60
+    assert 2 <= sms.concurrency_limit() <= 8
+    assert len(failed) < 20
+
+
+@pytest.mark.parametrize("server", [{"latency": 0.01, "capacity": 3}], indirect=True)
+def test_shared_adapts_to_capacity(server):
+    """Test the adaptive limit of SharedYesssSMS."""
+    limit = AIMDLimit(initial=1, maximum=8)
+
+    def send(sms, i):
+        try:
+            sms.send(TO, f"sms {i}")
+            return True
+        except YesssSMS.SMSSendingError:
+            return False
+
+    provider = server.provider_urls()
+    with SharedYesssSMS(
+        LOGIN, PASSWD, custom_provider=provider, size=8, concurrency=limit
+    ) as sms:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            sent = list(executor.map(lambda i: send(sms, i), range(60)))
+        assert 1 <= sms.concurrency_limit() <= 6
+    assert sent.count(True) == len(server.sent)
+    assert sent.count(False) < 20
+
+
+@pytest.mark.parametrize("server", [{"latency": 0.01}], indirect=True)
+def test_fixed_concurrency(server):
+    """Test that a number as concurrency is a fixed limit."""
+    provider = server.provider_urls()
+    with SharedYesssSMS(
+        LOGIN, PASSWD, custom_provider=provider, size=4, concurrency=2
+    ) as sms:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: sms.send(TO, f"{i}"), range(8)))
+        assert sms.concurrency_limit() == 2
+    assert server.max_in_flight <= 2
+    assert len(server.sent) == 8
@@ -0,0 +1,162 @@
+"""Tests for AsyncYesssSMS."""
+import asyncio
+import fcntl
+import threading
+
+import pytest
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+aiohttp = pytest.importorskip("aiohttp")
+
+# pylint: disable=wrong-import-position
+from YesssSMS.aio import AsyncYesssSMS  # noqa: E402
+
+# the sends of a gather overlap
+pytestmark = pytest.mark.parametrize("server", [{"latency": 0.005}], indirect=True)
+
+
+def test_async_send(server):
+    """Test sending SMS with one login per concurrent session."""
+
+    async def main():
+        async with AsyncYesssSMS(
+            LOGIN, PASSWD, custom_provider=server.provider_urls(), concurrency=3
+        ) as sms:
+            await asyncio.gather(*(sms.send(TO, f"message {i}") for i in range(12)))
+
+    asyncio.run(main())
+    assert len(server.sent) == 12
+    assert server.max_in_flight == 3
+    assert server.requests["POST /index.php"] == 3
+    assert server.requests["GET /websms.php"] == 3
+
+
+def test_async_session_expired(server):
+    """Test that an expired session logs in again."""
+
+    async def main():
+        async with AsyncYesssSMS(
+            LOGIN, PASSWD, custom_provider=server.provider_urls()
+        ) as sms:
+            async with sms.session() as sess:
+                await sess.send(TO, "first")
+                server.expire_sessions()
+                await sess.send(TO, "second")
+
+    asyncio.run(main())
+    assert len(server.sent) == 2
+    assert server.requests["POST /index.php"] == 2
+
+
+def test_async_errors(server):
+    """Test that the exceptions of YesssSMS are raised."""
+    provider = server.provider_urls()
+
+    async def main():
+        async with AsyncYesssSMS(LOGIN, PASSWD, custom_provider=provider) as sms:
+            assert await sms.login_data_valid() is True
+            with pytest.raises(NotImplementedError):
+                sms.set_session_store()
+            sms.set_session_store(None)
+            with pytest.raises(sms.UnsupportedCharsError):
+                await sms.send(TO, "☃")
+            with pytest.raises(sms.EmptyMessageError):
+                await sms.send(TO, "")
+        async with AsyncYesssSMS(LOGIN, "wrong", custom_provider=provider) as sms:
+            assert await sms.login_data_valid() is False
+            with pytest.raises(sms.LoginError):
+                await sms.send(TO, "test")
+        server.stop()
+        async with AsyncYesssSMS(LOGIN, PASSWD, custom_provider=provider) as sms:
+            with pytest.raises(sms.ConnectionError) as err:
+                await sms.send(TO, "test")
+            assert (err.value.phase, err.value.connected) == ("login", False)
+
+    asyncio.run(main())
+
+
+def test_async_deadline(server):
+    """Test that a slow provider raises TimeoutError at the deadline."""
+    server.latency = 0.3
+
+    async def main():
+        async with AsyncYesssSMS(
+            LOGIN, PASSWD, custom_provider=server.provider_urls(), concurrency=1
+        ) as sms:
+            with pytest.raises(sms.TimeoutError):
+                await sms.send(TO, "slow", deadline=0.2)
+            # waiting for the busy slot counts, too
+            results = await asyncio.gather(
+                sms.send(TO, "first", deadline=2),
+                sms.send(TO, "second", deadline=0.1),
+                return_exceptions=True,
+            )
+            assert results[0] is None
+            assert isinstance(results[1], sms.TimeoutError)
+
+    asyncio.run(main())
+    assert server.sent == [(TO, "first")]
+
+
+def test_async_send_many(server):
+    """Test that send_many sends with one session and yields the results."""
+
+    async def main():
+        async with AsyncYesssSMS(
+            LOGIN, PASSWD, custom_provider=server.provider_urls()
+        ) as sms:
+            messages = [(TO, "first"), (TO, "☃😀"), (TO, "second")]
+            return [result async for result in sms.send_many(messages)]
+
+    results = asyncio.run(main())
+    assert [result.success for result in results] == [True, False, True]
+    assert server.sent == [(TO, "first"), (TO, "second")]
+    assert server.requests["POST /index.php"] == 1
+
+
+def test_async_login_breaker(server, tmp_path):
+    """Test that a failed password is tried once by all instances."""
+
+    async def main():
+        instances = [
+            AsyncYesssSMS(LOGIN, "wrong", custom_provider=server.provider_urls())
+            for _ in range(3)
+        ]
+        for sms in instances:
+            sms.set_login_breaker(lock_dir=tmp_path)
+        results = await asyncio.gather(
+            *(sms.send(TO, "test") for sms in instances), return_exceptions=True
+        )
+        await asyncio.gather(*(sms.close() for sms in instances))
+        return results
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, AsyncYesssSMS.LoginError) for result in results)
+    assert server.requests["POST /index.php"] == 1
+
+
+def test_async_file_locks(server, tmp_path, monkeypatch):
+    """Test that the lock files of breaker and bucket are not locked on the loop."""
+    flock = fcntl.flock
+    threads = []
+
+    def recording_flock(*args):
+        threads.append(threading.get_ident())
+        return flock(*args)
+
+    monkeypatch.setattr(fcntl, "flock", recording_flock)
+
+    async def main():
+        async with AsyncYesssSMS(
+            LOGIN, PASSWD, custom_provider=server.provider_urls()
+        ) as sms:
+            sms.set_login_breaker(lock_dir=tmp_path)
+            sms.set_rate_limit(100, burst=5, lock_dir=tmp_path)
+            await asyncio.gather(*(sms.send(TO, f"message {i}") for i in range(3)))
+        return threading.get_ident()
+
+    loop_thread = asyncio.run(main())
+    assert len(server.sent) == 3
+    assert threads
+    assert loop_thread not in threads
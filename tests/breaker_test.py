@@ -0,0 +1,148 @@
+"""Tests for the login circuit breaker."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from YesssSMS import YesssSMS
+from YesssSMS.breaker import FileLoginBreaker, LoginBreaker, account_breaker
+
+import pytest
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+
+class FakeClock:
+    """Clock advanced by the test."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        """Start at 100 seconds."""
+        self.now = 100.0
+
+    def __call__(self):
+        """Return the time."""
+        return self.now
+
+
+def logins(server):
+    """Return the number of logins that reached the provider."""
+    return server.requests["POST /index.php"]
+
+
+def test_breaker():
+    """Test opening, changed passwords, suspension and closing."""
+    clock = FakeClock()
+    breaker = LoginBreaker(lockout_time=3600, clock=clock)
+    assert breaker.blocked_for("wrong") == 0
+    breaker.record("wrong", failed=True)
+    assert breaker.blocked_for("wrong") == 3600
+    # a changed password may try, once
+    assert breaker.blocked_for("other") == 0
+    breaker.record("other", failed=True)
+    assert breaker.blocked_for("third") == 3600
+    clock.now += 3600
+    assert breaker.blocked_for("third") == 0
+    breaker.record("third")
+    assert breaker.blocked_for("wrong") == 0
+
+    breaker.record("right", failed=True, suspended=True)
+    assert breaker.blocked_for("other") == 3600
+
+
+def test_file_breaker(tmp_path):
+    """Test that breakers with the same file share their state."""
+    path = tmp_path / "breaker"
+    first = FileLoginBreaker(path)
+    second = FileLoginBreaker(path)
+    first.record("wrong", failed=True)
+    assert second.blocked_for("wrong") > 3590
+    assert "wrong" not in path.read_text()
+    second.record("right")
+    assert first.blocked_for("wrong") == 0
+    with first.exclusive():
+        pass
+
+
+def test_account_breaker(tmp_path):
+    """Test that accounts and providers have one breaker each."""
+    breaker = account_breaker("yesss", LOGIN)
+    assert account_breaker("yesss", LOGIN) is breaker
+    assert account_breaker("educom", LOGIN) is not breaker
+    # another lockout time keeps the breaker and its state
+    other = account_breaker("yesss", "06761111111")
+    other.record(PASSWD, failed=True)
+    assert account_breaker("yesss", "06761111111", lockout_time=60) is other
+    assert other.lockout_time == 60
+    assert other.blocked_for(PASSWD) > 60
+    file_breaker = account_breaker("yesss", LOGIN, lock_dir=tmp_path)
+    assert file_breaker.path == str(tmp_path / f"breaker-yesss_{LOGIN}")
+
+
+def test_wrong_password(server, tmp_path):
+    """Test that a wrong password reaches the provider once."""
+    sms = YesssSMS(LOGIN, "wrong", custom_provider=server.provider_urls())
+    sms.set_login_breaker(tmp_path)
+    with pytest.raises(sms.LoginError):
+        sms.send(TO, "first")
+    for _ in range(3):
+        with pytest.raises(sms.AccountSuspendedError):
+            sms.send(TO, "again")
+    assert sms.account_is_suspended() is True
+    assert logins(server) == 1
+
+    # the fixed password is let through, and closes the breaker
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    sms.set_login_breaker(tmp_path)
+    sms.send(TO, "fixed")
+    assert server.sent == [(TO, "fixed")]
+
+
+def test_concurrent_wrong_password(server):
+    """Test that concurrent workers do not get the account suspended."""
+    provider = server.provider_urls()
+
+    def send(_):
+        sms = YesssSMS(LOGIN, "rotated", custom_provider=provider)
+        sms.set_login_breaker(lockout_time=60)
+        with pytest.raises(sms.LoginError):
+            sms.send(TO, "test")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(send, range(16)))
+    assert logins(server) == 1
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=provider)
+    sms.set_login_breaker(lockout_time=60)
+    assert sms.login_data_valid() is True
+
+
+def test_provider_suspension(server):
+    """Test that a suspension of the provider blocks all passwords."""
+    server.max_failed_logins = 1
+    sms = YesssSMS(LOGIN, "wrong", custom_provider=server.provider_urls())
+    sms.set_login_breaker(lockout_time=60)
+    with pytest.raises(sms.AccountSuspendedError):
+        sms.send(TO, "test")
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    sms.set_login_breaker(lockout_time=60)
+    with pytest.raises(sms.AccountSuspendedError):
+        sms.send(TO, "test")
+    assert logins(server) == 1
+
+
+def test_async_breaker(server):
+    """Test the login breaker of AsyncYesssSMS."""
+    pytest.importorskip("aiohttp")
+    from YesssSMS.aio import AsyncYesssSMS  # pylint: disable=import-outside-toplevel
+
+    async def main():
+        async with AsyncYesssSMS(
+            LOGIN, "wrong", custom_provider=server.provider_urls()
+        ) as sms:
+            sms.set_login_breaker(lockout_time=30)
+            return await asyncio.gather(
+                *(sms.send(TO, f"{i}") for i in range(4)), return_exceptions=True
+            )
+
+    results = asyncio.run(main())
+    assert all(isinstance(err, YesssSMS.LoginError) for err in results)
+    assert logins(server) == 1
@@ -0,0 +1,163 @@
+"""Tests for the local character checks."""
+import json
+
+from YesssSMS import YesssSMS
+from YesssSMS.charset import (
+    GSM7_BASIC,
+    GSM7_EXTENSION,
+    CharCache,
+    check,
+    is_gsm7,
+    parse_unsupported_chars,
+    transliterate,
+)
+from YesssSMS.testing import UNSUPPORTED_NOTICE
+
+import pytest
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+
+def test_gsm7():
+    """Test the GSM-7 tables."""
+    assert len(GSM7_BASIC) == 128
+    assert is_gsm7(GSM7_BASIC.replace("\x1b", "") + GSM7_EXTENSION)
+    assert is_gsm7("Grüße aus Österreich, 5€ {ok}")
+    assert not is_gsm7("Straße „zu“")
+    assert not is_gsm7("\x1b")
+
+
+def test_check():
+    """Test the encoding and the positions of unsupported characters."""
+    assert check("Servus!") == check("Servus!", ucs2=False)
+    assert check("Servus!").encoding == "gsm7"
+    result = check("Schnee ☃")
+    assert result.encoding == "ucs2"
+    assert result.unsupported == []
+    # characters above U+FFFF are sent as UTF-16, lone surrogates not at all
+    assert check("a😀b😀") == check("a😀b😀", ucs2=True)
+    assert check("a😀b😀").unsupported == []
+    assert check("a\ud800").unsupported == [(1, "\ud800")]
+    assert check("a😀b😀", bmp_only=True).unsupported == [(1, "😀"), (3, "😀")]
+    assert check("☃ 😀", ucs2=False).unsupported == [(0, "☃"), (2, "😀")]
+
+
+def test_send_without_request(server):
+    """Test that unsupported characters fail before the login."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    with pytest.raises(sms.UnsupportedCharsError) as err:
+        sms.send(TO, "alles gut \ud83d")
+    assert err.value.chars == [(10, "\ud83d")]
+    sms.set_charset(bmp_only=True)
+    with pytest.raises(sms.UnsupportedCharsError) as err:
+        sms.send(TO, "alles gut 👍")
+    assert err.value.chars == [(10, "👍")]
+    sms.set_charset(ucs2=False)
+    with pytest.raises(sms.UnsupportedCharsError):
+        sms.send(TO, "„Anführungszeichen“")
+    results = list(sms.send_many([(TO, "☃"), (TO, "ok")]))
+    assert isinstance(results[0].error, sms.UnsupportedCharsError)
+    assert results[1].success
+    assert server.requests["POST /index.php"] == 1
+    assert server.sent == [(TO, "ok")]
+
+
+def test_parse_unsupported_chars():
+    """Test reading the refused characters of the error page."""
+    page = UNSUPPORTED_NOTICE.format(chars="☃ ✓")
+    assert parse_unsupported_chars(page, "Schnee ☃ ✓") == {"☃", "✓"}
+    # only characters of the message
+    assert parse_unsupported_chars(page, "☃") == {"☃"}
+    assert parse_unsupported_chars("<html></html>", "☃") == set()
+    # text around the list is not learned
+    page = UNSUPPORTED_NOTICE.format(chars='"😀" (Zeichen 5)')
+    assert parse_unsupported_chars(page, "Alarm 😀 Server 5 down") == {"😀"}
+    page = UNSUPPORTED_NOTICE.format(chars="&lt;`~ ☃")
+    assert parse_unsupported_chars(page, "<`~ ☃") == {"☃"}
+
+
+def test_char_cache(tmp_path):
+    """Test learning, sharing and forgetting refused characters."""
+    path = tmp_path / "chars.json"
+    cache = CharCache(path)
+    cache.learn("yesss", {"☃"})
+    assert CharCache(path).chars("yesss") == {"☃"}
+    assert CharCache(path).chars("educom") == set()
+    # another process learns
+    CharCache(path).learn("yesss", {"✓"})
+    assert cache.chars("yesss") == {"☃", "✓"}
+    assert CharCache(path, max_age=-1).chars("yesss") == set()
+
+    path.write_text(json.dumps({"version": 0, "providers": {"yesss": {"x": 1}}}))
+    assert CharCache(path).chars("yesss") == set()
+    memory = CharCache(None)
+    memory.learn("yesss", {"☃"})
+    assert memory.chars("yesss") == {"☃"}
+
+
+def test_learned_chars(server, tmp_path):
+    """Test that characters refused once fail before the login."""
+    path = tmp_path / "chars.json"
+    provider = server.provider_urls()
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=provider)
+    sms.set_char_cache(path)
+    with pytest.raises(sms.UnsupportedCharsError) as err:
+        sms.send(TO, "Schnee ☃")
+    assert err.value.chars == [(7, "☃")]
+    assert server.requests["POST /index.php"] == 1
+
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=provider)
+    sms.set_char_cache(path)
+    with pytest.raises(sms.UnsupportedCharsError) as err:
+        sms.send(TO, "☃☃")
+    assert err.value.chars == [(0, "☃"), (1, "☃")]
+    assert server.requests["POST /index.php"] == 1
+    assert server.requests["POST /websms_send.php"] == 1
+
+
+def test_transliterate():
+    """Test the replacements and their positions."""
+    assert transliterate("Grüße") == ("Grüße", [])
+    assert transliterate("„Łódź“ 👍") == (
+        '"Lodz" (y)',
+        [
+            (0, "„", '"'),
+            (1, "Ł", "L"),
+            (2, "ó", "o"),
+            (4, "ź", "z"),
+            (5, "“", '"'),
+            (7, "👍", "(y)"),
+        ],
+    )
+    # characters without a replacement, refused ones
+    assert transliterate("中 ☃ …", refused={"☃", "…"}) == (
+        "? ? ...",
+        [(0, "中", "?"), (2, "☃", "?"), (4, "…", "...")],
+    )
+
+
+def test_send_transliterated(server):
+    """Test that transliterated messages are sent with one request."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    assert sms.send(TO, "„Grüße“ 😀 Привет", transliterate=True) == [
+        (0, "„", '"'),
+        (6, "“", '"'),
+        (8, "😀", ":D"),
+    ] + [(position, char, "?") for position, char in enumerate("Привет", 10)]
+    assert sms.send(TO, "Servus") is None
+    with pytest.raises(sms.UnsupportedCharsError):
+        sms.send(TO, "Schnee ☃")
+    results = list(
+        sms.send_many([(TO, "Schnee ☃"), (TO, "Servus")], transliterate=True)
+    )
+    assert [result.message for result in results] == ["Schnee ?", "Servus"]
+    assert results[0].changes == [(7, "☃", "?")]
+    assert not results[1].changes
+    assert server.sent == [
+        (TO, '"Grüße" :D ??????'),
+        (TO, "Servus"),
+        (TO, "Schnee ?"),
+        (TO, "Servus"),
+    ]
+    # one request per SMS, and the one refused
+    assert server.requests["POST /websms_send.php"] == 5
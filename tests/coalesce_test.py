@@ -0,0 +1,82 @@
+"""Tests for the Coalescer."""
+import time
+
+from YesssSMS import YesssSMS, YesssSMSPool
+from YesssSMS.coalesce import Coalescer
+from YesssSMS.segments import segments
+
+import pytest
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+
+@pytest.fixture(name="sms")
+def sms_of_server(server):
+    """Return a YesssSMS of the server."""
+    return YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+
+
+def test_window(server, sms):
+    """Test that the messages of a window are sent as one SMS."""
+    coalescer = Coalescer(sms, window=0.2)
+    coalescer.send(TO, "disk full")
+    coalescer.send("+43 650 1234567", "load high")
+    coalescer.send("06641111111", "other")
+    coalescer.send(TO, "disk ok")
+    for _ in range(50):
+        if len(server.sent) == 2:
+            break
+        time.sleep(0.05)
+    assert sorted(server.sent) == [
+        ("06501234567", "disk full\nload high\ndisk ok"),
+        ("06641111111", "other"),
+    ]
+    # a new window
+    with coalescer:
+        coalescer.send(TO, "resolved")
+    assert server.sent[-1] == (TO, "resolved")
+
+
+def test_budget(server, sms):
+    """Test that at most max_segments are sent per window."""
+    first, second = "a" * 150, "b" * 150
+    with Coalescer(sms, window=60, max_segments=2) as coalescer:
+        assert coalescer.send(TO, first) is None
+        # does not fit, the full SMS is sent at once
+        result = coalescer.send(TO, second)
+        assert result.success
+        assert result.message == first
+        for i in range(5):
+            assert coalescer.send(TO, f"alert {i}") is None
+    assert server.sent == [(TO, first), (TO, second + "\n+5 more")]
+    assert sum(segments(message).count for _, message in server.sent) == 2
+
+
+def test_long_message(server, sms):
+    """Test that a message longer than the budget is shortened."""
+    with Coalescer(sms, window=60, max_segments=1) as coalescer:
+        coalescer.send(TO, "word " * 50)
+        coalescer.send(TO, "next")
+        results = coalescer.flush()
+    assert results[0].message.endswith("word...\n+1 more")
+    assert segments(results[0].message).count == 1
+    assert len(server.sent) == 1
+
+
+def test_errors(server, sms):
+    """Test that invalid messages raise at once."""
+    with pytest.raises(ValueError):
+        Coalescer(sms, max_segments=0)
+    with Coalescer(sms, window=60) as coalescer:
+        with pytest.raises(sms.EmptyMessageError):
+            coalescer.send(TO, "")
+        with pytest.raises(sms.NoRecipientError):
+            coalescer.send(None, "test")
+        coalescer.send(TO, "test")
+        server.inject_errors(2)
+        results = coalescer.flush()
+    assert not results[0].success
+    assert server.sent == []
+    with Coalescer(YesssSMSPool([sms], strategy="hash")) as coalescer:
+        with pytest.raises(sms.NoRecipientError):
+            coalescer.send(None, "test")
@@ -0,0 +1,20 @@
+"""Fixtures of the tests with the KontomanagerServer stand-in."""
+from YesssSMS.testing import KontomanagerServer
+
+import pytest
+
+LOGIN = "06641234567"
+PASSWD = "secret"
+TO = "06501234567"
+
+
+@pytest.fixture(name="server")
+def running_server(request):
+    """Run a KontomanagerServer of LOGIN.
+
+    Other arguments, e.g. latency or throttle, are passed as a dict with
+    pytest.mark.parametrize("server", [{"latency": 0.01}], indirect=True).
+    """
+    kwargs = getattr(request, "param", {})
+    with KontomanagerServer(LOGIN, PASSWD, **kwargs) as server:
+        yield server
@@ -0,0 +1,107 @@
+"""Tests for the control socket of the daemon."""
+import os
+import stat
+import sys
+import tempfile
+from unittest import mock
+
+from YesssSMS import SharedYesssSMS, YesssSMS
+from YesssSMS.CLI import CLI
+from YesssSMS.control import ControlError, ControlServer, forward
+
+import pytest
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+
+@pytest.fixture(name="socket_path")
+def short_socket_path():
+    """Return a socket path, short enough for AF_UNIX."""
+    with tempfile.TemporaryDirectory(dir="/tmp") as directory:
+        yield os.path.join(directory, "yessssms", "control.sock")
+
+
+@pytest.fixture(name="daemon")
+def running_daemon(server, socket_path):
+    """Run a ControlServer sending with the KontomanagerServer."""
+    sms = SharedYesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    with sms, ControlServer(sms, socket_path, default_recipient=LOGIN) as daemon:
+        daemon.start()
+        yield daemon
+        daemon.shutdown()
+
+
+def test_forward(server, daemon):
+    """Test that forwarded SMS share one login."""
+    for i in range(3):
+        forward(TO, f"message {i}", daemon.path)
+    forward(None, "to the default recipient", daemon.path)
+    assert server.sent == [(TO, f"message {i}") for i in range(3)] + [
+        (LOGIN, "to the default recipient")
+    ]
+    assert server.requests["POST /index.php"] == 1
+    assert stat.S_IMODE(os.stat(daemon.path).st_mode) == 0o600
+
+
+def test_forward_errors(daemon):
+    """Test that errors of the daemon are returned."""
+    with pytest.raises(ControlError) as err:
+        forward(TO, "☃", daemon.path)
+    assert err.value.error == "UnsupportedCharsError"
+    with pytest.raises(ControlError) as err:
+        forward(TO, "", daemon.path)
+    assert err.value.error == "EmptyMessageError"
+
+
+def test_forward_no_daemon(socket_path):
+    """Test that OSError is raised without a daemon."""
+    with pytest.raises(OSError):
+        forward(TO, "message", socket_path)
+
+
+def test_stale_socket(server, socket_path):
+    """Test that the socket of a killed daemon is replaced."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    daemon = ControlServer(sms, socket_path)
+    # like a killed daemon, the socket file is left over
+    daemon._server.server_close()  # pylint: disable=protected-access
+    with ControlServer(sms, socket_path) as daemon:
+        with pytest.raises(OSError):
+            ControlServer(sms, socket_path)
+        daemon.start()
+        forward(TO, "message", socket_path)
+        daemon.shutdown()
+    assert not os.path.exists(socket_path)
+
+
+def test_cli_forward(server, daemon):
+    """Test that the CLI sends with the daemon, without login data."""
+    testargs = ["yessssms", "--socket", daemon.path, "-t", TO, "-m", "hi"]
+    with mock.patch.object(sys, "argv", testargs):
+        assert CLI().exit_status == 0
+    assert server.sent == [(TO, "hi")]
+
+
+def test_cli_forward_error(daemon, capsys):
+    """Test the exit status of an SMS the daemon could not send."""
+    testargs = ["yessssms", "--socket", daemon.path, "-t", TO, "-m", "☃"]
+    with mock.patch.object(sys, "argv", testargs):
+        with pytest.raises(SystemExit) as exit_status:
+            CLI()
+    assert exit_status.value.code == 6
+    assert "unsupported character" in capsys.readouterr().out
+
+
+def test_cli_no_daemon(server, socket_path):
+    """Test that the CLI sends directly if the daemon was killed."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    # like a killed daemon, the socket file is left over
+    daemon = ControlServer(sms, socket_path)
+    daemon._server.server_close()  # pylint: disable=protected-access
+    config = (LOGIN, PASSWD, None, None, server.provider_urls())
+    testargs = ["yessssms", "--socket", socket_path, "-t", TO, "-m", "hi"]
+    with mock.patch.object(sys, "argv", testargs):
+        with mock.patch.object(CLI, "read_config_files", return_value=config):
+            assert CLI().exit_status == 0
+    assert server.sent == [(TO, "hi")]
+    assert server.requests["POST /index.php"] == 1
@@ -0,0 +1,48 @@
+"""Tests for the CSRF token extraction."""
+from YesssSMS.const import TEST_FORM_TOKEN_SAMPLE
+from YesssSMS.csrf import extract_token, find_token, soup_token
+
+import pytest
+
+TOKEN = "f2ca1bb6c7e907d06dafe4687e579fce76b37e4e93b7605022da52e6ccc26fd2"
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        TEST_FORM_TOKEN_SAMPLE,
+        f"<form id=\"smsform\"><input type='hidden' name='token' value='{TOKEN}'>",
+        f"<form id=smsform><input type=hidden name=token value={TOKEN}></form>",
+        f"<FORM ID = 'smsform' onsubmit=\"a>b\"><INPUT VALUE=\"{TOKEN}\" NAME=token>",
+        f"<p class='smsform'>smsform</p><div id='smsform'><input value='{TOKEN}'/>",
+        f"<form id='smsform'><div><input name='token' value=\"{TOKEN}\"></div>",
+    ],
+)
+def test_find_token(html):
+    """Test quoting variants of the SMS form."""
+    assert find_token(html) == TOKEN
+    assert soup_token(html) == TOKEN
+    assert extract_token(html) == TOKEN
+
+
+def test_find_token_entities():
+    """Test that character references in the token are unescaped."""
+    html = "<form id='smsform'><input value='a&amp;b'>"
+    assert find_token(html) == soup_token(html) == "a&b"
+
+
+def test_find_token_not_found():
+    """Test pages without SMS form."""
+    assert find_token("<html>login</html>") is None
+    assert find_token("<form id='smsform_not_found'><input value='x'>") is None
+    assert find_token("<form id='smsform'></form>") is None
+    with pytest.raises(AttributeError):
+        extract_token("<form id='smsform_not_found'><input value='x'>")
+
+
+def test_find_token_no_value():
+    """Test an input without value."""
+    with pytest.raises(KeyError):
+        find_token("<form id='smsform'><input name='token'>")
+    with pytest.raises(KeyError):
+        extract_token("<form id='smsform'><input name='token'>")
@@ -0,0 +1,110 @@
+"""Tests for YesssSMSPool."""
+from concurrent.futures import ThreadPoolExecutor
+
+from YesssSMS import YesssSMS, YesssSMSPool
+from YesssSMS.pool import normalize_recipient
+from YesssSMS.testing import KontomanagerServer
+
+import pytest
+
+from tests.conftest import PASSWD, TO
+
+ACCOUNTS = ("06641111111", "06762222222")
+
+
+@pytest.fixture(name="servers")
+def running_servers():
+    """Run a KontomanagerServer per account, like two providers."""
+    with KontomanagerServer(ACCOUNTS[0], PASSWD, latency=0.005) as first:
+        with KontomanagerServer(ACCOUNTS[1], PASSWD, latency=0.005) as second:
+            yield first, second
+
+
+def pool_of(servers, **kwargs):
+    """Return a YesssSMSPool of the accounts of the servers."""
+    return YesssSMSPool(
+        [
+            {
+                "login": server.login,
+                "passwd": PASSWD,
+                "custom_provider": server.provider_urls(),
+            }
+            for server in servers
+        ],
+        **kwargs,
+    )
+
+
+def test_normalize_recipient():
+    """Test the national form of numbers."""
+    assert normalize_recipient("+43 650 1234567") == TO
+    assert normalize_recipient("0043650/1234567") == TO
+    assert normalize_recipient(TO) == TO
+    with pytest.raises(YesssSMS.NoRecipientError):
+        normalize_recipient(None)
+    with pytest.raises(ValueError):
+        normalize_recipient(6501234567)
+
+
+def test_round_robin(servers):
+    """Test that the accounts take turns."""
+    with pool_of(servers) as pool:
+        for i in range(6):
+            pool.send(TO, f"message {i}")
+    assert [len(server.sent) for server in servers] == [3, 3]
+    # one login per account
+    assert [server.requests["POST /index.php"] for server in servers] == [1, 1]
+
+
+def test_hash(servers):
+    """Test that a recipient always gets SMS from the same account."""
+    recipients = [f"0650123456{i}" for i in range(10)]
+    with pool_of(servers, strategy="hash") as pool:
+        accounts = {to: pool.send(to, "first") for to in recipients}
+        for to in recipients:
+            assert pool.send(to, "second") is accounts[to]
+        assert pool.account_for("+43 " + TO[1:]) is pool.account_for(TO)
+    assert all(server.sent for server in servers)
+
+
+def test_least_loaded(servers):
+    """Test that concurrent sends use all accounts."""
+    with pool_of(servers, strategy="least_loaded") as pool:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: pool.send(TO, f"{i}"), range(20)))
+    assert sum(len(server.sent) for server in servers) == 20
+    assert all(len(server.sent) >= 5 for server in servers)
+
+
+def test_suspended_account(servers):
+    """Test that SMS of a suspended account are sent with the next one."""
+    servers[0].max_failed_logins = 1
+    suspended = YesssSMS(
+        ACCOUNTS[0], "wrong", custom_provider=servers[0].provider_urls()
+    )
+    working = YesssSMS(
+        ACCOUNTS[1], PASSWD, custom_provider=servers[1].provider_urls()
+    )
+    pool = YesssSMSPool([suspended, working])
+    results = list(pool.send_many((TO, f"{i}") for i in range(4)))
+    assert all(result.success for result in results)
+    assert len(servers[1].sent) == 4
+    # the suspended account was tried once
+    assert servers[0].requests["POST /index.php"] == 1
+
+
+def test_pool_errors(servers):
+    """Test invalid arguments and errors of all accounts."""
+    with pytest.raises(ValueError):
+        YesssSMSPool([])
+    with pytest.raises(ValueError):
+        pool_of(servers, strategy="random")
+    with pool_of(servers) as pool:
+        with pytest.raises(YesssSMS.EmptyMessageError):
+            pool.send(TO, "")
+    with pool_of(servers, strategy="hash") as pool:
+        with pytest.raises(YesssSMS.NoRecipientError):
+            pool.send(None, "test")
+        results = list(pool.send_many([(None, "test"), (TO, "test")]))
+    assert isinstance(results[0].error, YesssSMS.NoRecipientError)
+    assert results[1].success
@@ -0,0 +1,128 @@
+"""Tests for the token bucket rate limiting."""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from YesssSMS import SharedYesssSMS, YesssSMS
+from YesssSMS.ratelimit import FileTokenBucket, TokenBucket, account_bucket
+
+import pytest
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+
+class FakeClock:
+    """Clock advanced by the test."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        """Start at 100 seconds."""
+        self.now = 100.0
+
+    def __call__(self):
+        """Return the time."""
+        return self.now
+
+
+def test_token_bucket():
+    """Test burst, refill and reservations."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    assert bucket.reserve() == 0.5
+    assert bucket.reserve() == 1.0
+    # too long a wait takes no token
+    assert bucket.reserve(max_wait=1.0) is None
+    assert bucket.reserve(max_wait=1.5) == 1.5
+    clock.now += 10
+    # refilled to burst, not more
+    assert [bucket.reserve() for _ in range(4)] == [0, 0, 0, 0.5]
+
+
+def test_try_acquire():
+    """Test that try_acquire takes no token it has to wait for."""
+    clock = FakeClock()
+    bucket = TokenBucket(rate=1, burst=1, clock=clock)
+    assert bucket.try_acquire() is True
+    assert bucket.try_acquire() is False
+    clock.now += 1
+    assert bucket.try_acquire() is True
+
+
+def test_token_bucket_errors():
+    """Test invalid parameters."""
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1, burst=0)
+
+
+def test_file_token_bucket(tmp_path):
+    """Test that buckets with the same file share their tokens."""
+    path = tmp_path / "bucket"
+    first = FileTokenBucket(path, rate=0.1, burst=2)
+    second = FileTokenBucket(path, rate=0.1, burst=2)
+    assert first.reserve() == 0
+    assert second.reserve() == 0
+    assert first.reserve() == pytest.approx(10, abs=0.1)
+    assert second.try_acquire() is False
+
+
+def test_account_bucket(tmp_path):
+    """Test that accounts and providers have one bucket each."""
+    bucket = account_bucket("yesss", LOGIN, 1, 2)
+    assert account_bucket("yesss", LOGIN, 1, 2) is bucket
+    assert account_bucket("educom", LOGIN, 1, 2) is not bucket
+    assert account_bucket("yesss", "06769876543", 1, 2) is not bucket
+    # other parameters change the bucket, the tokens taken still count
+    changed = account_bucket("yesss", "06761111111", 0.01, 2)
+    assert changed.try_acquire(2)
+    assert account_bucket("yesss", "06761111111", 0.01, 3) is changed
+    assert (changed.rate, changed.burst) == (0.01, 3)
+    assert changed.try_acquire() is False
+    file_bucket = account_bucket("yesss", LOGIN, 1, 2, lock_dir=tmp_path)
+    assert file_bucket.path == str(tmp_path / f"ratelimit-yesss_{LOGIN}")
+
+
+@pytest.mark.parametrize("server", [{"throttle": (20, 2)}], indirect=True)
+def test_rate_limited_send(server):
+    """Test that a throttled provider accepts rate limited SMS."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    results = list(sms.send_many((TO, f"burst {i}") for i in range(4)))
+    assert not all(result.success for result in results)
+
+    server.reset()
+    time.sleep(0.1)
+    # a bit below the provider's limit, requests take varying time
+    sms.set_rate_limit(15, 2)
+    results = list(sms.send_many((TO, f"limited {i}") for i in range(6)))
+    assert all(result.success for result in results)
+    assert len(server.sent) == 6
+
+
+def test_rate_limit_deadline(server):
+    """Test that a rate limit wait longer than the deadline fails at once."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    sms.set_rate_limit(0.2)
+    with sms.session() as sess:
+        sess.send(TO, "first")
+        start = time.monotonic()
+        with pytest.raises(sms.TimeoutError) as err:
+            sess.send(TO, "second", deadline=0.5)
+        assert time.monotonic() - start < 0.5
+        assert (err.value.phase, err.value.connected) == ("send", False)
+    assert server.sent == [(TO, "first")]
+
+
+@pytest.mark.parametrize("server", [{"throttle": (50, 2)}], indirect=True)
+def test_rate_limit_shared_by_threads(server):
+    """Test that instances of the same account share the limit."""
+    provider = server.provider_urls()
+    with SharedYesssSMS(LOGIN, PASSWD, custom_provider=provider) as sms:
+        sms.set_rate_limit(40)
+        other = YesssSMS(LOGIN, PASSWD, custom_provider=provider)
+        other.set_rate_limit(40)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: sms.send(TO, f"{i}"), range(6)))
+            other.send(TO, "other")
+    assert len(server.sent) == 7
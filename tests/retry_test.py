@@ -0,0 +1,179 @@
+"""Tests for the retries of transient errors."""
+import asyncio
+from http import HTTPStatus
+
+from YesssSMS import SharedYesssSMS, YesssSMS
+from YesssSMS.retry import RetryBudget, RetryPolicy, is_transient
+
+import pytest
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+
+def http_error(status_code, phase=None):
+    """Return a SMSSendingError of a response with status_code."""
+    err = YesssSMS.SMSSendingError()
+    err.status_code, err.phase = status_code, phase
+    return err
+
+
+def in_phase(err, phase, connected=None):
+    """Return err, of a request of phase."""
+    err.phase = phase
+    if connected is not None:
+        err.connected = connected
+    return err
+
+
+def test_is_transient():
+    """Test the classification of errors."""
+    assert is_transient(YesssSMS.ConnectionError())
+    assert is_transient(YesssSMS.TimeoutError())
+    assert is_transient(YesssSMS.SMSSendingError())
+    assert is_transient(YesssSMS.SessionExpiredError())
+    assert is_transient(http_error(503))
+    assert is_transient(http_error(429))
+    assert not is_transient(http_error(400))
+    assert not is_transient(YesssSMS.UnsupportedCharsError())
+    assert not is_transient(YesssSMS.EmptyMessageError())
+    assert not is_transient(YesssSMS.LoginError())
+    assert not is_transient(YesssSMS.AccountSuspendedError())
+    assert not is_transient(SharedYesssSMS.PoolTimeoutError())
+    assert not is_transient(KeyError())
+
+
+def test_is_transient_after_send():
+    """Test that errors of the SMS request are retried only if it was not sent."""
+    assert is_transient(http_error(503, "login"))
+    assert is_transient(in_phase(YesssSMS.TimeoutError(), "token"))
+    assert not is_transient(http_error(503, "send"))
+    assert not is_transient(http_error(429, "send"))
+    assert not is_transient(in_phase(YesssSMS.SMSSendingError(), "send"))
+    assert not is_transient(in_phase(YesssSMS.TimeoutError(), "send"))
+    assert not is_transient(in_phase(YesssSMS.ConnectionError(), "send"))
+    # the SMS was not sent
+    assert is_transient(in_phase(YesssSMS.ConnectionError(), "send", connected=False))
+    assert is_transient(in_phase(YesssSMS.SessionExpiredError(), "send"))
+    assert is_transient(in_phase(YesssSMS.TokenRejectedError(), "send"))
+    # on request
+    assert is_transient(http_error(503, "send"), after_send=True)
+    assert is_transient(in_phase(YesssSMS.TimeoutError(), "send"), after_send=True)
+    assert not is_transient(http_error(400, "send"), after_send=True)
+
+
+def test_backoff():
+    """Test the jittered exponential backoff and max_attempts."""
+    delays = []
+    policy = RetryPolicy(
+        max_attempts=4, base_delay=1, max_delay=3, sleep=delays.append, rand=lambda: 0.5
+    )
+    calls = []
+
+    def fail():
+        calls.append(1)
+        raise YesssSMS.ConnectionError()
+
+    with pytest.raises(YesssSMS.ConnectionError) as err:
+        policy.call(fail)
+    assert err.value.attempts == 4
+    assert len(calls) == 4
+    assert delays == [0.5, 1.0, 1.5]
+
+
+def test_permanent_not_retried():
+    """Test that permanent errors are raised at once."""
+    policy = RetryPolicy(sleep=pytest.fail)
+
+    def fail():
+        raise YesssSMS.UnsupportedCharsError()
+
+    with pytest.raises(YesssSMS.UnsupportedCharsError) as err:
+        policy.call(fail)
+    assert err.value.attempts == 1
+
+
+def test_retry_budget():
+    """Test that the budget limits the retries of many failing sends."""
+    budget = RetryBudget(ratio=0.5, reserve=2)
+    policy = RetryPolicy(max_attempts=3, budget=budget, sleep=lambda _: None)
+    attempts = []
+
+    def fail():
+        raise YesssSMS.ConnectionError()
+
+    for _ in range(6):
+        with pytest.raises(YesssSMS.ConnectionError) as err:
+            policy.call(fail)
+        attempts.append(err.value.attempts)
+    # 2 retries in reserve, then one retry every other send
+    assert attempts == [3, 1, 2, 1, 2, 1]
+
+
+def test_send_many_attempts(server):
+    """Test that SendResult counts the attempts."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    sms.set_retry_policy(RetryPolicy(base_delay=0.01))
+    server.inject_errors(1, HTTPStatus.SERVICE_UNAVAILABLE)
+    results = list(sms.send_many([(TO, "first"), (TO, "snow ☃"), (TO, "third")]))
+    assert [result.attempts for result in results] == [2, 1, 1]
+    assert [result.success for result in results] == [True, False, True]
+    assert len(server.sent) == 2
+
+
+def test_send_server_error(server):
+    """Test that an error response to the SMS request is retried on request only."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    with sms.session() as sess:
+        sess.send(TO, "first")
+        # the next request sends the SMS, with the token of the last response
+        server.inject_errors(1, HTTPStatus.SERVICE_UNAVAILABLE)
+        with pytest.raises(sms.SMSSendingError) as err:
+            RetryPolicy(base_delay=0.01).call(sess.send, TO, "second")
+        assert (err.value.attempts, err.value.phase) == (1, "send")
+        sess.send(TO, "third")
+        server.inject_errors(1, HTTPStatus.SERVICE_UNAVAILABLE)
+        policy = RetryPolicy(base_delay=0.01, after_send=True)
+        assert policy.call(sess.send, TO, "fourth") == 2
+    assert server.sent == [(TO, "first"), (TO, "third"), (TO, "fourth")]
+
+
+def test_connection_refused(server):
+    """Test that a refused connection is known not to have sent the SMS."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    server.stop()
+    with pytest.raises(sms.ConnectionError) as err:
+        sms.send(TO, "test")
+    assert (err.value.phase, err.value.connected) == ("login", False)
+    assert is_transient(err.value)
+
+
+def test_login_server_error(server):
+    """Test that a failing provider is no login error, and retried."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    server.inject_errors(1, HTTPStatus.BAD_GATEWAY)
+    with pytest.raises(sms.SMSSendingError) as err:
+        sms.send(TO, "test")
+    assert not isinstance(err.value, sms.LoginError)
+    assert err.value.status_code == 502
+    assert err.value.phase == "login"
+    sms.set_retry_policy(RetryPolicy(base_delay=0.01))
+    server.inject_errors(2, HTTPStatus.BAD_GATEWAY)
+    sms.send(TO, "test")
+    assert len(server.sent) == 1
+
+
+def test_async_retry(server):
+    """Test the retries of AsyncYesssSMS."""
+    pytest.importorskip("aiohttp")
+    from YesssSMS.aio import AsyncYesssSMS  # pylint: disable=import-outside-toplevel
+
+    async def main():
+        async with AsyncYesssSMS(
+            LOGIN, PASSWD, custom_provider=server.provider_urls()
+        ) as sms:
+            sms.set_retry_policy(RetryPolicy(base_delay=0.01))
+            server.inject_errors(1)
+            await sms.send(TO, "test")
+
+    asyncio.run(main())
+    assert len(server.sent) == 1
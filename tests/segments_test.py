@@ -0,0 +1,65 @@
+"""Tests for the SMS segment calculator and the packer."""
+from YesssSMS.segments import Segments, pack, segments
+
+import pytest
+
+ALERT = (
+    "CRITICAL:   Server db01\n\n\n  Warning: disk usage at 95% on /var, "
+    "please check the database server within 10 minutes, the backup error "
+    "is still open since 3 hours. "
+)
+
+
+@pytest.mark.parametrize(
+    "message, expected",
+    [
+        ("", Segments("gsm7", 0, 0, 160)),
+        ("x" * 160, Segments("gsm7", 1, 160, 0)),
+        ("x" * 161, Segments("gsm7", 2, 161, 145)),
+        ("x" * 306, Segments("gsm7", 2, 306, 0)),
+        ("x" * 307, Segments("gsm7", 3, 307, 152)),
+        # escaped characters take two septets
+        ("€" * 80, Segments("gsm7", 1, 160, 0)),
+        ("€" * 81, Segments("gsm7", 2, 162, 143)),
+        # and are not split across segments
+        ("x" * 152 + "€" * 5, Segments("gsm7", 2, 162, 143)),
+        ("☃" * 70, Segments("ucs2", 1, 70, 0)),
+        ("☃" * 71, Segments("ucs2", 2, 71, 63)),
+        ("x" * 133 + "☃", Segments("ucs2", 2, 134, 0)),
+        ("x" * 134 + "☃", Segments("ucs2", 3, 135, 66)),
+    ],
+)
+def test_segments(message, expected):
+    """Test single and concatenated SMS of both encodings."""
+    assert segments(message) == expected
+
+
+def test_pack():
+    """Test that only as much as needed is shortened."""
+    assert pack("short  message") == "short  message"
+    assert pack(ALERT) == (
+        "CRITICAL: Server db01\nWarning: disk usage at 95% on /var, please check "
+        "the database server within 10 minutes, the backup error is still open "
+        "since 3 hours."
+    )
+    warnings = "Warning: database " * 10
+    assert pack(warnings) == " ".join(["Warn: DB"] * 10)
+    assert pack(warnings, abbreviations={}).endswith("database Warning...")
+    assert pack(warnings, abbreviations={"Warning": "W"}) == warnings.replace(
+        "Warning", "W"
+    ).strip()
+    # typographic quotes make it UCS-2
+    quoted = "„" + "x" * 100 + "“"
+    assert segments(quoted).count == 2
+    assert pack(quoted) == '"' + "x" * 100 + '"'
+
+
+def test_pack_truncate():
+    """Test cutting after a word."""
+    packed = pack(ALERT * 4)
+    assert segments(packed).count == 1
+    assert packed.endswith("\nWarn: disk...")
+    assert segments(pack(ALERT * 10, max_segments=3)).count == 3
+    assert pack("x" * 200) == "x" * 157 + "..."
+    with pytest.raises(ValueError):
+        pack(ALERT, max_segments=0)
@@ -0,0 +1,82 @@
+"""Tests for the on-disk provider sessions."""
+import json
+import os
+import stat
+
+import requests
+
+from YesssSMS import YesssSMS
+from YesssSMS.sessionstore import SessionStore
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+
+def logins(server):
+    """Return the number of logins that reached the provider."""
+    return server.requests["POST /index.php"]
+
+
+def test_store(tmp_path):
+    """Test saving, restoring and the file permissions."""
+    path = tmp_path / "sessions" / "sessions.json"
+    store = SessionStore(path)
+    jar = requests.cookies.RequestsCookieJar()
+    jar.set("PHPSESSID", "abc", domain="example.at", path="/")
+    store.save("yesss:1", jar)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+
+    restored = requests.cookies.RequestsCookieJar()
+    assert SessionStore(path).restore("yesss:1", restored) is True
+    assert restored.get("PHPSESSID", domain="example.at") == "abc"
+    assert store.restore("yesss:2", restored) is False
+    # too old
+    assert SessionStore(path, max_age=-1).restore("yesss:1", restored) is False
+    store.delete("yesss:1")
+    assert json.loads(path.read_text()) == {}
+
+
+def test_damaged_store(tmp_path):
+    """Test that a damaged file is started over."""
+    path = tmp_path / "sessions.json"
+    path.write_text("{not json")
+    store = SessionStore(path)
+    assert store.restore("yesss:1", requests.cookies.RequestsCookieJar()) is False
+
+
+def test_resume_session(server, tmp_path):
+    """Test that the next process sends without a login."""
+    path = tmp_path / "sessions.json"
+    for i in range(3):
+        # a new instance, like a new call of the CLI
+        sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+        sms.set_session_store(path)
+        sms.send(TO, f"message {i}")
+    assert len(server.sent) == 3
+    assert logins(server) == 1
+    assert server.requests["GET /index.php"] == 0
+
+
+def test_expired_session(server, tmp_path):
+    """Test that an expired session falls back to a login."""
+    path = tmp_path / "sessions.json"
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    sms.set_session_store(path)
+    sms.send(TO, "first")
+    server.expire_sessions()
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    sms.set_session_store(path)
+    sms.send(TO, "second")
+    assert len(server.sent) == 2
+    assert logins(server) == 2
+
+
+def test_logout_forgets_session(server, tmp_path):
+    """Test that a logout removes the saved session."""
+    path = tmp_path / "sessions.json"
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    sms.set_session_store(path)
+    with sms.session() as sess:
+        sess.send(TO, "test")
+        sess.logout()
+    assert json.loads(path.read_text()) == {}
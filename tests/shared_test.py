@@ -0,0 +1,86 @@
+"""Tests for SharedYesssSMS."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from YesssSMS.const import PROVIDER_URLS, TEST_FORM_TOKEN_SAMPLE
+from YesssSMS.shared import SharedYesssSMS
+
+import pytest
+
+import requests_mock
+
+PROVIDER = PROVIDER_URLS["yesss"]
+LOGIN = "06641234567"
+PASSWD = "testpasswd"
+SUCCESS = "<h1>Ihre SMS wurde erfolgreich verschickt!</h1>"
+
+
+@pytest.fixture(name="provider")
+def mocked_provider():
+    """Mock the provider, yield the mocker."""
+    with requests_mock.Mocker() as m:
+        m.post(
+            PROVIDER["LOGIN_URL"],
+            status_code=302,
+            headers={"location": PROVIDER["KONTOMANAGER_URL"]},
+        )
+        m.get(PROVIDER["WEBSMS_FORM_URL"], text=TEST_FORM_TOKEN_SAMPLE)
+        m.post(PROVIDER["SEND_SMS_URL"], text=SUCCESS + TEST_FORM_TOKEN_SAMPLE)
+        m.get(PROVIDER["LOGOUT_URL"])
+        yield m
+
+
+def calls(mocker, method, url):
+    """Return the number of requests to url."""
+    return sum(1 for r in mocker.request_history if (r.method, r.url) == (method, url))
+
+
+def test_shared_send_from_threads(provider):
+    """Test that threads share the logged in sessions."""
+    with SharedYesssSMS(LOGIN, PASSWD, size=3) as sms:
+        # pylint: disable=protected-access
+        assert sms._adapter._pool_maxsize == 3
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda i: sms.send("06501234567", f"sms {i}"), range(40)))
+    assert calls(provider, "POST", PROVIDER["SEND_SMS_URL"]) == 40
+    assert calls(provider, "POST", PROVIDER["LOGIN_URL"]) <= 3
+    assert calls(provider, "GET", PROVIDER["LOGOUT_URL"]) <= 3
+
+
+def test_shared_login_all(provider):
+    """Test logging in all sessions of the pool."""
+    sms = SharedYesssSMS(LOGIN, PASSWD, size=2)
+    sms.login()
+    assert calls(provider, "POST", PROVIDER["LOGIN_URL"]) == 2
+    sms.send("06501234567", "test")
+    sms.send_many([("06501234567", "test")] * 3)
+    assert calls(provider, "POST", PROVIDER["LOGIN_URL"]) == 2
+    sms.close()
+    assert calls(provider, "GET", PROVIDER["LOGOUT_URL"]) == 2
+
+
+def test_shared_pool_timeout(provider):
+    """Test that busy pools raise PoolTimeoutError after pool_timeout."""
+    sms = SharedYesssSMS(LOGIN, PASSWD, size=1, pool_timeout=0.01)
+    busy = threading.Event()
+    done = threading.Event()
+
+    def hold_session():
+        # pylint: disable=protected-access
+        with sms._borrow_session():
+            busy.set()
+            done.wait(1)
+
+    thread = threading.Thread(target=hold_session)
+    thread.start()
+    busy.wait(1)
+    with pytest.raises(sms.PoolTimeoutError):
+        sms.send("06501234567", "test")
+    # a deadline shorter than pool_timeout bounds the wait
+    sms._pool_timeout = 10  # pylint: disable=protected-access
+    with pytest.raises(sms.TimeoutError):
+        sms.send("06501234567", "test", deadline=0.01)
+    done.set()
+    thread.join()
+    sms.send("06501234567", "test")
+    assert calls(provider, "POST", PROVIDER["LOGIN_URL"]) == 1
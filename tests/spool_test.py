@@ -0,0 +1,146 @@
+"""Tests for the SMS spool and its worker."""
+import sys
+import threading
+from unittest import mock
+
+from YesssSMS import YesssSMS
+from YesssSMS.CLI import CLI
+from YesssSMS.spool import Spool, SpoolWorker
+
+import pytest
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+
+@pytest.fixture(name="spool")
+def spool_file(tmp_path):
+    """Open a spool in a temporary directory."""
+    with Spool(tmp_path / "spool" / "spool.db") as spool:
+        yield spool
+
+
+def test_enqueue_claim_finish(spool):
+    """Test the life cycle of queued SMS."""
+    first = spool.enqueue(TO, "first")
+    second = spool.enqueue(TO, "second")
+    spool.enqueue(TO, "later", delay=3600)
+    assert spool.stats() == {"queued": 3}
+
+    assert spool.claim(10) == [(first, TO, "first", 0), (second, TO, "second", 0)]
+    assert spool.claim(10) == []
+    assert spool.stats() == {"queued": 1, "sending": 2}
+
+    spool.finish(sent=[first], retry=[(second, "error", 0)])
+    assert spool.stats() == {"queued": 2}
+    assert spool.claim(10) == [(second, TO, "second", 1)]
+    spool.finish(failed=[(second, "error")])
+    assert spool.failed() == [(second, TO, "second", 2, "error")]
+
+
+def test_enqueue_errors(spool):
+    """Test that invalid SMS are not queued."""
+    with pytest.raises(YesssSMS.NoRecipientError):
+        spool.enqueue("", "message")
+    with pytest.raises(YesssSMS.EmptyMessageError):
+        spool.enqueue(TO, "")
+    assert not spool.stats()
+
+
+def test_recover(tmp_path):
+    """Test that SMS claimed by a stopped worker are queued again."""
+    path = tmp_path / "spool.db"
+    with Spool(path) as spool:
+        spool.enqueue(TO, "message")
+        spool.claim(10)
+    with Spool(path) as spool:
+        assert spool.recover() == 1
+        assert spool.stats() == {"queued": 1}
+
+
+def test_worker(server, spool):
+    """Test sending queued SMS with one login."""
+    for i in range(5):
+        spool.enqueue(TO, f"message {i}")
+    spool.enqueue(TO, "☃")
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    worker = SpoolWorker(sms, spool, batch_size=4)
+    with sms.session() as sess:
+        assert worker.run_once(sess) == 4
+        assert worker.run_once(sess) == 2
+        assert worker.run_once(sess) == 0
+    assert server.sent == [(TO, f"message {i}") for i in range(5)]
+    assert server.requests["POST /index.php"] == 1
+    assert [row[2] for row in spool.failed()] == ["☃"]
+
+
+def test_worker_retry(server, spool):
+    """Test that sending errors are retried with backoff."""
+    spool.enqueue(TO, "message")
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    worker = SpoolWorker(sms, spool, retry_delay=0, max_attempts=2)
+    with sms.session() as sess:
+        sess.login()
+        server.inject_errors()
+        assert worker.run_once(sess) == 1
+        assert spool.stats() == {"queued": 1}
+        sess.login()
+        server.inject_errors()
+        assert worker.run_once(sess) == 1
+    assert spool.stats() == {"failed": 1}
+    assert not server.sent
+
+
+def test_worker_send_error(server, spool):
+    """Test that errors of the request sending the SMS are not retried."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    worker = SpoolWorker(sms, spool, retry_delay=0)
+    with sms.session() as sess:
+        spool.enqueue(TO, "first")
+        assert worker.run_once(sess) == 1
+        # the next request sends the SMS, with the token of the last response
+        spool.enqueue(TO, "second")
+        server.inject_errors()
+        assert worker.run_once(sess) == 1
+    assert [row[2] for row in spool.failed()] == ["second"]
+    assert server.sent == [(TO, "first")]
+
+
+def test_worker_login_error(server, spool):
+    """Test that SMS are not tried while the login fails."""
+    spool.enqueue(TO, "message")
+    sms = YesssSMS(LOGIN, "wrong", custom_provider=server.provider_urls())
+    worker = SpoolWorker(sms, spool, login_retry_delay=3600)
+    with sms.session() as sess:
+        with pytest.raises(sms.LoginError):
+            worker.run_once(sess)
+    assert spool.stats() == {"queued": 1}
+    assert spool.claim(10) == []
+
+
+def test_worker_run(server, spool):
+    """Test the worker loop until it is stopped."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=SpoolWorker(sms, spool, poll_interval=0.01).run, args=(stop,)
+    )
+    thread.start()
+    spool.enqueue(TO, "message")
+    for _ in range(500):
+        if server.sent:
+            break
+        stop.wait(0.01)
+    stop.set()
+    thread.join()
+    assert server.sent == [(TO, "message")]
+    assert not spool.stats()
+
+
+def test_cli_spool(tmp_path):
+    """Test queueing an SMS from the command line."""
+    path = str(tmp_path / "spool.db")
+    testargs = ["yessssms", "-l", LOGIN, "-p", PASSWD, "-t", TO, "-m", "hi"]
+    with mock.patch.object(sys, "argv", testargs + ["--spool", path]):
+        assert CLI().exit_status == 0
+    with Spool(path) as spool:
+        assert spool.claim(10) == [(1, TO, "hi", 0)]
@@ -0,0 +1,108 @@
+"""Tests for YesssSMS against the local Kontomanager stand-in."""
+from concurrent.futures import ThreadPoolExecutor
+
+from YesssSMS import SharedYesssSMS, YesssSMS
+
+import pytest
+
+from tests.conftest import LOGIN, PASSWD, TO
+
+
+def test_send(server):
+    """Test sending one SMS."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    assert sms.login_data_valid() is True
+    sms.send(TO, "hello")
+    assert server.sent == [(TO, "hello")]
+    assert server.requests["POST /index.php"] == 2
+    assert server.requests["GET /kundendaten.php"] == 0
+
+
+def test_session(server):
+    """Test a session with token chaining and expiry."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    with sms.session() as sess:
+        for i in range(5):
+            sess.send(TO, f"sms {i}")
+        server.expire_sessions()
+        sess.send(TO, "after expiry")
+    assert len(server.sent) == 6
+    assert server.requests["POST /index.php"] == 2
+    assert server.requests["GET /websms.php"] == 2
+    assert server.requests["POST /websms_send.php"] == 7
+
+
+@pytest.mark.parametrize("server", [{"session_lifetime": 0}], indirect=True)
+def test_session_lifetime(server):
+    """Test sessions expiring on the server after session_lifetime."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    with sms.session() as sess:
+        with pytest.raises(sms.SessionExpiredError):
+            sess.send(TO, "expired")
+
+
+def test_errors(server):
+    """Test the error pages of the stand-in."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    with pytest.raises(sms.UnsupportedCharsError):
+        sms.send(TO, "snow ☃")
+    with sms.session() as sess:
+        sess.login()
+        server.inject_errors(2)
+        with pytest.raises(sms.SMSSendingError):
+            sess.send(TO, "error")
+    assert server.sent == []
+
+
+def test_lockout(server):
+    """Test that 3 failed logins suspend the account."""
+    sms = YesssSMS(LOGIN, "wrong", custom_provider=server.provider_urls())
+    assert sms.login_data_valid() is False
+    assert sms.login_data_valid() is False
+    with pytest.raises(sms.AccountSuspendedError):
+        sms.send(TO, "test")
+    assert sms.account_is_suspended() is True
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    with pytest.raises(sms.AccountSuspendedError):
+        sms.send(TO, "test")
+    server.reset()
+    sms.send(TO, "test")
+
+
+@pytest.mark.parametrize("server", [{"latency": 0.01}], indirect=True)
+def test_latency_concurrency(server):
+    """Test concurrent sends with latency."""
+    with SharedYesssSMS(
+        LOGIN, PASSWD, custom_provider=server.provider_urls(), size=4
+    ) as sms:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda i: sms.send(TO, f"sms {i}"), range(20)))
+    assert len(server.sent) == 20
+    assert 1 < server.max_in_flight <= 4
+
+
+@pytest.mark.parametrize("server", [{"throttle": (0.001, 2)}], indirect=True)
+def test_no_resend_after_errors(server):
+    """Test that only a rejected token sends the SMS again."""
+    sms = YesssSMS(LOGIN, PASSWD, custom_provider=server.provider_urls())
+    with sms.session() as sess:
+        sess.send(TO, "first")
+        server.inject_errors(1)
+        with pytest.raises(sms.SMSSendingError) as err:
+            sess.send(TO, "provider error")
+        assert err.value.status_code == 500
+        sess.send(TO, "second")
+        with pytest.raises(sms.SMSSendingError) as err:
+            sess.send(TO, "throttled")
+        assert err.value.status_code == 429
+    assert server.requests["POST /websms_send.php"] == 4
+
+    server.reset()
+    server.throttle = None
+    with sms.session() as sess:
+        sess.send(TO, "first")
+        # pylint: disable=protected-access
+        sess._token = "stale"
+        sess.send(TO, "fresh token")
+    assert server.sent == [(TO, "first"), (TO, "fresh token")]
+    assert server.requests["POST /websms_send.php"] == 3
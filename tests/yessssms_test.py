@@ -4,7 +4,9 @@
 #
 # pylint: disable-msg=C0103
 import os
+import subprocess
 import sys
+import time
 from unittest import mock
 
 import YesssSMS
@@ -1074,6 +1076,20 @@ def test_cli_with_version_arg(config, capsys):
         assert captured.out == "yessssms " + VERSION + "\n"
 
 
+def test_cli_version_imports():
+    """Test that yessssms --version does not import requests."""
+    code = (
+        "import sys; from YesssSMS.CLI import run; "
+        "sys.argv = ['yessssms', '--version']; run(); "
+        "assert 'requests' not in sys.modules, 'requests imported'"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=False
+    )
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout == "yessssms " + VERSION + "\n"
+
+
 def test_cli_with_no_arg(config, capsys):
     """Test handling of no arguments."""
     testargs = ["yessssms"]
@@ -1752,3 +1768,385 @@ def test_csrf_token_error_3(
         assert str(ex).startswith(
             "<ExceptionInfo SMSSendingError('YesssSMS: could not get token (3)'"
         )
+
+
+def test_session_send_multiple(config, valid_connection):
+    """Test sending multiple SMS with one login."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        m.post(sms._login_url, status_code=302, headers={"location": sms._kontomanager})
+        # pylint: disable=protected-access
+        m.get(sms._kontomanager, status_code=200)
+        # pylint: disable=protected-access
+        m.get(sms._sms_form_url, status_code=200, text=TEST_FORM_TOKEN_SAMPLE)
+        m.post(
+            # pylint: disable=protected-access
+            sms._send_sms_url,
+            status_code=200,
+            text="<h1>Ihre SMS wurde erfolgreich " + "verschickt!</h1>",
+        )
+        # pylint: disable=protected-access
+        logout = m.get(sms._logout_url, status_code=200)
+        with sms.session() as sess:
+            assert sess.is_logged_in() is False
+            sess.send(YESSS_TO, "first")
+            sess.send(YESSS_TO, "second")
+            sess.send(LOGIN, "third")
+            assert sess.is_logged_in() is True
+        assert sess.is_logged_in() is False
+        methods = [(r.method, r.url) for r in m.request_history]
+        # pylint: disable=protected-access
+        assert methods.count(("POST", sms._login_url)) == 1
+        # pylint: disable=protected-access
+        assert methods.count(("POST", sms._send_sms_url)) == 3
+        assert logout.call_count == 1
+
+
+def test_session_login_again_after_error(config, valid_connection):
+    """Test that a session logs in again after a failed send."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        login = m.post(
+            sms._login_url, status_code=302, headers={"location": sms._kontomanager}
+        )
+        # pylint: disable=protected-access
+        m.get(sms._kontomanager, status_code=200)
+        # pylint: disable=protected-access
+        m.get(sms._sms_form_url, status_code=200, text=TEST_FORM_TOKEN_SAMPLE)
+        m.post(
+            # pylint: disable=protected-access
+            sms._send_sms_url,
+            [
+                {"status_code": 200, "text": "error"},
+                {
+                    "status_code": 200,
+                    "text": "<h1>Ihre SMS wurde erfolgreich " + "verschickt!</h1>",
+                },
+            ],
+        )
+        # pylint: disable=protected-access
+        m.get(sms._logout_url, status_code=200)
+        with sms.session() as sess:
+            with pytest.raises(sms.SMSSendingError):
+                sess.send(YESSS_TO, "first")
+            assert sess.is_logged_in() is False
+            sess.send(YESSS_TO, "second")
+        assert login.call_count == 2
+
+
+def test_session_no_login_for_invalid_message(config):
+    """Test that invalid messages don't login."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m:
+        with sms.session() as sess:
+            with pytest.raises(sms.EmptyMessageError):
+                sess.send(YESSS_TO, "")
+        assert m.call_count == 0
+
+
+def test_session_expired_login_again(config):
+    """Test that an expired session logs in again and sends once more."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        login = m.post(
+            sms._login_url, status_code=302, headers={"location": sms._kontomanager}
+        )
+        # pylint: disable=protected-access
+        m.get(sms._login_url, status_code=200, text='<input name="login_rufnummer">')
+        # pylint: disable=protected-access
+        m.get(sms._kontomanager, status_code=200)
+        m.get(
+            # pylint: disable=protected-access
+            sms._sms_form_url,
+            [
+                {"status_code": 200, "text": TEST_FORM_TOKEN_SAMPLE},
+                # pylint: disable=protected-access
+                {"status_code": 302, "headers": {"location": sms._login_url}},
+                {"status_code": 200, "text": TEST_FORM_TOKEN_SAMPLE},
+            ],
+        )
+        # pylint: disable=protected-access
+        send = m.post(
+            sms._send_sms_url,
+            status_code=200,
+            text="<h1>Ihre SMS wurde erfolgreich " + "verschickt!</h1>",
+        )
+        # pylint: disable=protected-access
+        m.get(sms._logout_url, status_code=200)
+        with sms.session() as sess:
+            sess.send(YESSS_TO, "first")
+            sess.send(YESSS_TO, "second")
+        assert login.call_count == 2
+        assert send.call_count == 2
+
+
+def test_session_expired_on_send(config):
+    """Test expiry detection by login page in the send response."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        login = m.post(
+            sms._login_url, status_code=302, headers={"location": sms._kontomanager}
+        )
+        # pylint: disable=protected-access
+        m.get(sms._kontomanager, status_code=200)
+        # pylint: disable=protected-access
+        m.get(sms._sms_form_url, status_code=200, text=TEST_FORM_TOKEN_SAMPLE)
+        m.post(
+            # pylint: disable=protected-access
+            sms._send_sms_url,
+            [
+                {"status_code": 200, "text": '<input name="login_rufnummer">'},
+                {"status_code": 200, "text": '<input name="login_rufnummer">'},
+            ],
+        )
+        # pylint: disable=protected-access
+        m.get(sms._logout_url, status_code=200)
+        with sms.session() as sess:
+            # a fresh login is not replayed
+            with pytest.raises(sms.SessionExpiredError):
+                sess.send(YESSS_TO, "first")
+        assert login.call_count == 1
+        with pytest.raises(sms.SMSSendingError):
+            sms.send(YESSS_TO, "second")
+
+
+def test_login_without_redirect(config):
+    """Test that the login doesn't download the customer data page."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        m.post(sms._login_url, status_code=302, headers={"location": sms._kontomanager})
+        # pylint: disable=protected-access
+        kontomanager = m.get(sms._kontomanager, status_code=200)
+        # pylint: disable=protected-access
+        m.get(sms._logout_url, status_code=200)
+        # pylint: disable=protected-access
+        sms._login(requests.Session(), follow_redirect=False)
+        assert sms.login_data_valid() is True
+        with sms.session() as sess:
+            sess.login()
+        assert kontomanager.call_count == 0
+
+
+def test_login_without_redirect_error(config):
+    """Test failed logins without following the redirect."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        m.post(sms._login_url, status_code=302, headers={"location": sms._login_url})
+        with pytest.raises(sms.LoginError):
+            # pylint: disable=protected-access
+            sms._login(requests.Session(), follow_redirect=False)
+        # pylint: disable=protected-access
+        m.post(sms._login_url, status_code=200, text="<html>login</html>")
+        with pytest.raises(sms.LoginError):
+            # pylint: disable=protected-access
+            sms._login(requests.Session(), follow_redirect=False)
+
+
+def test_session_token_from_send_response(config):
+    """Test that the next CSRF token is taken from the send response."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        m.post(sms._login_url, status_code=302, headers={"location": sms._kontomanager})
+        # pylint: disable=protected-access
+        form = m.get(sms._sms_form_url, status_code=200, text=TEST_FORM_TOKEN_SAMPLE)
+        # pylint: disable=protected-access
+        send = m.post(
+            sms._send_sms_url,
+            status_code=200,
+            text="<h1>Ihre SMS wurde erfolgreich verschickt!</h1>"
+            + TEST_FORM_TOKEN_SAMPLE.replace("f2ca1", "00000"),
+        )
+        # pylint: disable=protected-access
+        m.get(sms._logout_url, status_code=200)
+        with sms.session() as sess:
+            for i in range(3):
+                sess.send(YESSS_TO, f"message {i}")
+        assert form.call_count == 1
+        assert send.call_count == 3
+        assert "token=f2ca1" in send.request_history[0].text
+        assert "token=00000" in send.request_history[2].text
+
+
+def test_session_token_without_form(config):
+    """Test that send responses without the SMS form are not parsed with bs4."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m, mock.patch("YesssSMS.csrf.soup_token") as soup:
+        # pylint: disable=protected-access
+        m.post(sms._login_url, status_code=302, headers={"location": sms._kontomanager})
+        # pylint: disable=protected-access
+        form = m.get(sms._sms_form_url, status_code=200, text=TEST_FORM_TOKEN_SAMPLE)
+        # pylint: disable=protected-access
+        m.post(
+            sms._send_sms_url,
+            status_code=200,
+            text="<h1>Ihre SMS wurde erfolgreich verschickt!</h1>",
+        )
+        # pylint: disable=protected-access
+        m.get(sms._logout_url, status_code=200)
+        with sms.session() as sess:
+            for i in range(3):
+                sess.send(YESSS_TO, f"message {i}")
+        assert form.call_count == 3
+        assert soup.call_count == 0
+
+
+def test_session_token_rejected(config):
+    """Test that a rejected cached token is replaced by a fresh one."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    success = "<h1>Ihre SMS wurde erfolgreich verschickt!</h1>"
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        login = m.post(
+            sms._login_url, status_code=302, headers={"location": sms._kontomanager}
+        )
+        # pylint: disable=protected-access
+        form = m.get(sms._sms_form_url, status_code=200, text=TEST_FORM_TOKEN_SAMPLE)
+        m.post(
+            # pylint: disable=protected-access
+            sms._send_sms_url,
+            [
+                {"text": success + TEST_FORM_TOKEN_SAMPLE.replace("f2ca1", "00000")},
+                # the form again, without the success message
+                {"text": "invalid token" + TEST_FORM_TOKEN_SAMPLE},
+                {"text": success},
+                {"text": success},
+            ],
+        )
+        # pylint: disable=protected-access
+        m.get(sms._logout_url, status_code=200)
+        with sms.session() as sess:
+            sess.send(YESSS_TO, "first")
+            sess.send(YESSS_TO, "second")
+            sess.send(YESSS_TO, "third")
+        assert login.call_count == 1
+        assert form.call_count == 3
+
+
+def test_send_many(config):
+    """Test sending many SMS with one login."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    success = "<h1>Ihre SMS wurde erfolgreich verschickt!</h1>"
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        login = m.post(
+            sms._login_url, status_code=302, headers={"location": sms._kontomanager}
+        )
+        # pylint: disable=protected-access
+        m.get(sms._sms_form_url, status_code=200, text=TEST_FORM_TOKEN_SAMPLE)
+        m.post(
+            # pylint: disable=protected-access
+            sms._send_sms_url,
+            [
+                {"text": success},
+                {"text": _UNSUPPORTED_CHARS_STRING},
+                {"text": "error"},
+                {"text": success},
+            ],
+        )
+        # pylint: disable=protected-access
+        logout = m.get(sms._logout_url, status_code=200)
+
+        messages = ((f"0650123456{i}", f"message {i}") for i in range(5))
+        results = sms.send_many(messages)
+        assert m.call_count == 0
+        results = list(results)
+        assert [result.success for result in results] == [
+            True,
+            False,
+            False,
+            True,
+            True,
+        ]
+        assert isinstance(results[1].error, sms.UnsupportedCharsError)
+        assert isinstance(results[2].error, sms.SMSSendingError)
+        assert results[3].recipient == "06501234563"
+        assert all(result.duration >= 0 for result in results)
+        # the session logged in again after the sending error
+        assert login.call_count == 2
+        assert logout.call_count == 1
+
+
+def test_send_many_login_error(config):
+    """Test that login errors stop send_many."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        m.post(sms._login_url, status_code=200, text="<strong>Login nicht erfolgreich")
+        results = sms.send_many([(YESSS_TO, ""), (YESSS_TO, "test")])
+        assert isinstance(next(results).error, sms.EmptyMessageError)
+        with pytest.raises(sms.LoginError):
+            next(results)
+
+
+def test_request_timeouts(config):
+    """Test that every request has a timeout."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD, timeout=10)
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        m.post(sms._login_url, status_code=302, headers={"location": sms._kontomanager})
+        # pylint: disable=protected-access
+        m.get(sms._sms_form_url, status_code=200, text=TEST_FORM_TOKEN_SAMPLE)
+        m.post(
+            # pylint: disable=protected-access
+            sms._send_sms_url,
+            text="<h1>Ihre SMS wurde erfolgreich verschickt!</h1>",
+        )
+        # pylint: disable=protected-access
+        m.get(sms._logout_url, status_code=200)
+        sms.send(YESSS_TO, "test")
+        assert len(m.request_history) == 4
+        assert all(r.timeout == (5, 10) for r in m.request_history)
+
+
+def test_read_timeout(config):
+    """Test that a provider not answering raises TimeoutError."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        m.post(sms._login_url, exc=requests.exceptions.ReadTimeout)
+        with pytest.raises(sms.TimeoutError) as err:
+            sms.send(YESSS_TO, "test")
+    assert isinstance(err.value, TimeoutError)
+    # handled like connection errors by existing code
+    assert isinstance(err.value, sms.ConnectionError)
+
+
+def test_deadline(config):
+    """Test that the phases share the deadline and late logouts are skipped."""
+    sms = YesssSMS.YesssSMS(LOGIN, YESSS_PASSWD)
+
+    def slow_send(_, context):
+        time.sleep(0.3)
+        return "<h1>Ihre SMS wurde erfolgreich verschickt!</h1>"
+
+    with requests_mock.Mocker() as m:
+        # pylint: disable=protected-access
+        m.post(sms._login_url, status_code=302, headers={"location": sms._kontomanager})
+        # pylint: disable=protected-access
+        m.get(sms._sms_form_url, status_code=200, text=TEST_FORM_TOKEN_SAMPLE)
+        # pylint: disable=protected-access
+        send = m.post(sms._send_sms_url, text=slow_send)
+        # pylint: disable=protected-access
+        logout = m.get(sms._logout_url, status_code=200)
+        sms.send(YESSS_TO, "test", deadline=2)
+        # the login may take half of the budget, the SMS what is left
+        connect, read = m.request_history[0].timeout
+        assert connect == read and 0.9 < read <= 1.0
+        assert 1.5 < send.last_request.timeout[1] <= 2.0
+        assert logout.call_count == 1
+
+        sms.send(YESSS_TO, "test", deadline=0.25)
+        # no time left for the logout
+        assert logout.call_count == 1
+
+        with pytest.raises(sms.TimeoutError):
+            sms.send(YESSS_TO, "test", deadline=0)
+        results = list(sms.send_many([(YESSS_TO, "a"), (YESSS_TO, "b")], deadline=0))
+        assert all(isinstance(result.error, sms.TimeoutError) for result in results)